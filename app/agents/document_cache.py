@@ -0,0 +1,164 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from loguru import logger
+from app.agents.parsers import parse_file
+from app.config import DOCUMENT_CACHE_MAX_BYTES, DOCUMENT_CACHE_SPILL_DIR, FILE_HASH_CACHE_SIZE
+from app.rag.ingestion_registry import file_content_hash
+
+
+class ParsedDocumentCache:
+    """
+    Parsed pages, paragraphs and DataFrames keyed by path + mtime/size.
+    LRU-bounded by estimated memory; evicted entries optionally spill to disk under their
+    content hash, so an evicted file (or a renamed copy of it) skips re-parsing, also after a
+    restart. Entries still in memory are not written out – a restart re-parses those.
+    """
+
+    def __init__(self, max_bytes=DOCUMENT_CACHE_MAX_BYTES, spill_dir=DOCUMENT_CACHE_SPILL_DIR,
+                 hash_memo_size=FILE_HASH_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir or None
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # key -> (ParsedDocument, nbytes), least recently used first
+        self._bytes = 0
+        self._parsing = {}  # key -> Event – concurrent callers wait for one parse instead of repeating it
+        self.hash_memo_size = hash_memo_size
+        self._hashes = OrderedDict()  # key -> content hash, so unchanged files are hashed once
+
+    @staticmethod
+    def _key(path):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    def content_hash(self, path, key=None):
+        """SHA-256 of the file, computed once per file version."""
+        key = key or self._key(path)
+        with self._lock:
+            digest = self._hashes.get(key)
+            if digest is not None:
+                self._hashes.move_to_end(key)
+                return digest
+        digest = file_content_hash(path)
+        with self._lock:
+            self._hashes[key] = digest
+            while len(self._hashes) > self.hash_memo_size:
+                self._hashes.popitem(last=False)
+        return digest
+
+    def _spill_path(self, path, key):
+        return os.path.join(self.spill_dir, self.content_hash(path, key) + ".pkl")
+
+    def peek(self, path):
+        """Cached parse (memory, then disk spill) or None – never parses."""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        if self.spill_dir:
+            spill_path = self._spill_path(path, key)
+            if os.path.exists(spill_path):
+                try:
+                    with open(spill_path, "rb") as f:
+                        parsed = pickle.load(f)
+                    parsed.path = path
+                    self.spill_hits += 1
+                    self._insert(key, parsed)
+                    return parsed
+                except Exception as e:
+                    logger.warning(f"Discarding unreadable parsed-document spill {spill_path}: {e}")
+        return None
+
+    def get(self, path):
+        """Parsed document for `path` – parsed inline on a miss, then cached for every agent."""
+        parsed = self.peek(path)
+        if parsed is not None:
+            return parsed
+        key = self._key(path)
+        with self._lock:
+            event = self._parsing.get(key)
+            owner = event is None
+            if owner:
+                event = self._parsing[key] = threading.Event()
+        if not owner:
+            event.wait()
+            return self.peek(path) or self.get(path)
+        try:
+            with self._lock:
+                self.misses += 1
+            parsed = parse_file(path)
+            self._insert(key, parsed)
+            return parsed
+        finally:
+            with self._lock:
+                self._parsing.pop(key, None)
+            event.set()
+
+    def put(self, parsed):
+        with self._lock:
+            self.misses += 1
+        self._insert(self._key(parsed.path), parsed)
+
+    def _insert(self, key, parsed):
+        size = parsed.nbytes()
+        evicted = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (parsed, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, (old_parsed, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                evicted.append((old_key, old_parsed))
+        for old_key, old_parsed in evicted:
+            self._spill(old_key, old_parsed)
+
+    def _spill(self, key, parsed):
+        if not self.spill_dir:
+            return
+        try:
+            if self._key(parsed.path) != key:
+                return  # File changed since it was parsed – the spill would be stale
+            os.makedirs(self.spill_dir, exist_ok=True)
+            spill_path = self._spill_path(parsed.path, key)
+            if not os.path.exists(spill_path):
+                tmp_path = spill_path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(parsed, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, spill_path)
+        except Exception as e:
+            logger.warning(f"Could not spill parsed document {parsed.path}: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.spill_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "spill_hits": self.spill_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.spill_hits) / lookups if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_document_cache():
+    """Process-wide cache shared by DocumentLoaderAgent and ExtractionAgent."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ParsedDocumentCache()
+        return _cache
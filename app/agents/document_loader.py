@@ -1,90 +1,119 @@
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_ollama import OllamaEmbeddings
-from langchain_community.vectorstores import FAISS
-from pypdf import PdfReader
-from docx import Document as DocxDocument
-import pandas as pd
-from PIL import Image
-import pytesseract
 import os
 from loguru import logger
+from app.config import CHUNK_SIZE, CHUNK_OVERLAP, VECTORSTORE_PATH
+from app.rag.vectorstore_service import get_vectorstore_service
+from app.rag.embedding_pipeline import EmbeddingPipeline
+from app.rag.writer_lock import IndexLocked
+from app.agents.parsers import iter_parsed
+from app.agents.document_cache import get_document_cache
+from app.agents.section_index import get_section_index
+from app.metrics import timed
 
 class DocumentLoaderAgent:
-    def __init__(self):
+    def __init__(self, vectorstore_path=VECTORSTORE_PATH, embeddings=None):
         logger.info("Initializing DocumentLoaderAgent – preparing for multi-format ingestion")
+        # Shared, process-wide index – loaded once, never re-deserialized per request
+        self.store = get_vectorstore_service(vectorstore_path, embeddings=embeddings)
         # Using nomic-embed-text: optimized for semantic search
-        self.embeddings = OllamaEmbeddings(model="nomic-embed-text")
+        self.embeddings = self.store.embeddings
         # Smaller chunks = better retrieval accuracy
-        self.splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-        self.vectorstore_path = "vectorstore/index"  # Persistent storage – survives restarts
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        self.vectorstore_path = vectorstore_path  # Persistent storage – survives restarts
+        # Content-addressed record of what is already embedded – changing the config re-indexes
+        self.registry = self.store.registry
+        # Batched, concurrent Ollama calls with retry – big PDFs no longer embed one round trip at a time
+        self.embedding_pipeline = EmbeddingPipeline(self.embeddings)
 
-    def load_documents(self, file_paths):
+    @timed("load_documents")
+    def load_documents(self, file_paths, progress=None, unparsed=None):
+        """
+        Indexes any new content in `file_paths`; `progress(done, total)` reports embedded chunks and
+        `unparsed(paths)` the files no parser could read.
+        Raises IndexLocked – before anything is parsed or embedded – while another process is writing the index.
+        """
         logger.info(f"Loading {len(file_paths)} document(s): {file_paths}")
         existing_files = [f for f in file_paths if os.path.exists(f)]
         if not existing_files:
             logger.error("No valid files found – aborting load")
             return None
 
-        docs = []
-        for path in existing_files:
-            try:
-                if path.endswith('.pdf'):
-                    reader = PdfReader(path)
-                    text = "".join(page.extract_text() or "" for page in reader.pages)
-                    docs.append(Document(page_content=text, metadata={"source": path, "type": "pdf"}))
-                    logger.debug(f"Extracted text from PDF: {path}")
+        try:
+            vectorstore = self.store.vectorstore
+        except Exception as e:
+            logger.error(f"Vectorstore load failed: {e}")
+            return None
 
-                elif path.endswith('.docx'):
-                    doc = DocxDocument(path)
-                    text = "\n".join(p.text for p in doc.paragraphs if p.text.strip())
-                    docs.append(Document(page_content=text, metadata={"source": path, "type": "docx"}))
-                    logger.debug(f"Parsed DOCX: {path}")
+        # Skip anything whose content is already embedded – queries only touch the index for new content
+        if not self.registry.pending(existing_files):
+            logger.info("All documents already indexed – reusing in-memory vectorstore")
+            return vectorstore
 
-                elif path.endswith('.xlsx'):
-                    df_dict = pd.read_excel(path, sheet_name=None)
-                    text = "\n".join(sheet.to_string() for sheet in df_dict.values())
-                    docs.append(Document(page_content=text, metadata={"source": path, "type": "xlsx"}))
-                    logger.debug(f"Converted Excel sheets to text: {path}")
+        # One ingestion at a time – concurrent requests for the same new file must not embed it twice
+        try:
+            with self.store.ingest_lock:
+                # Another worker may be writing – wait for it, reload, and skip whatever it indexed meanwhile
+                self.store.claim_writer()
+                return self._ingest(self.registry.pending(existing_files), progress, unparsed)
+        finally:
+            self.store.release_writer()
 
-                elif path.endswith(('.png', '.jpg', '.jpeg')):
-                    img = Image.open(path)
-                    text = pytesseract.image_to_string(img)
-                    docs.append(Document(page_content=text, metadata={"source": path, "type": "image"}))
-                    logger.debug(f"OCR extracted from image: {path}")
+    def _ingest(self, new_files, progress=None, unparsed=None):
+        if not new_files:
+            return self.store.vectorstore
 
-            except Exception as e:
-                logger.warning(f"Failed to process {path}: {e} – skipping file")
-                continue
+        # Parsed on the process pool; each file is split as soon as it finishes, not after the whole batch
+        docs = []
+        splits = []
+        for parsed in iter_parsed(list(new_files), cache=get_document_cache()):
+            doc = Document(page_content=parsed.text, metadata={
+                "source": parsed.path, "type": parsed.kind, "content_hash": new_files[parsed.path]
+            })
+            docs.append(doc)
+            splits.extend(self.splitter.split_documents([doc]))
+            get_section_index().build(new_files[parsed.path], parsed)  # Report extraction reuses this outline
+            logger.debug(f"Parsed {parsed.kind.upper()}: {parsed.path}")
+        if unparsed:
+            parsed_paths = {doc.metadata["source"] for doc in docs}
+            unparsed([path for path in new_files if path not in parsed_paths])
 
         if not docs:
             logger.error("All files failed to process")
             return None
-
-        # Split into chunks for better RAG performance
-        splits = self.splitter.split_documents(docs)
         logger.info(f"Split into {len(splits)} chunks")
 
-        try:
-            if os.path.exists(self.vectorstore_path):
-                vectorstore = FAISS.load_local(
-                    self.vectorstore_path, 
-                    self.embeddings, 
-                    allow_dangerous_deserialization=True
-                )
-                vectorstore.add_documents(splits)
-                logger.info("Updated existing vectorstore")
-            else:
-                vectorstore = FAISS.from_documents(splits, self.embeddings)
-                logger.info("Created new vectorstore")
+        # Deterministic chunk ids (content hash + position) – lets us map documents back to their vectors
+        chunk_ids = {}
+        ids = []
+        for split in splits:
+            digest = split.metadata["content_hash"]
+            chunk_id = f"{digest[:16]}-{len(chunk_ids.setdefault(digest, []))}"
+            chunk_ids[digest].append(chunk_id)
+            ids.append(chunk_id)
+
+        def log_progress(done, total):
+            logger.debug(f"Embedded {done}/{total} chunks")
+            if progress:
+                progress(done, total)
 
-            vectorstore.save_local(self.vectorstore_path)
-            logger.success("Vectorstore saved to disk – persistent RAG ready!")
+        try:
+            if splits:
+                vectors = self.embedding_pipeline.embed([split.page_content for split in splits], log_progress)
+                self.store.add_embeddings(splits, vectors, ids)
+        except IndexLocked:
+            raise  # Not a problem with the documents – the caller retries
         except Exception as e:
             logger.error(f"Vectorstore creation failed: {e}")
             return None
 
-        return vectorstore
+        for doc in docs:
+            digest = doc.metadata["content_hash"]
+            self.registry.record(digest, doc.metadata["source"], chunk_ids.get(digest, []))
+        # Index + registry are written together in the background
+        self.store.mark_dirty()
+
+        return self.store.vectorstore
 
 
 if __name__ == "__main__":
@@ -1,60 +1,59 @@
-from pypdf import PdfReader
-from docx import Document as DocxDocument
-import pandas as pd
-from PIL import Image
-import pytesseract
-import re
 from loguru import logger
+from app.agents.document_cache import get_document_cache
+from app.agents.table_extraction import get_table_cache
+from app.agents.section_index import get_section_index, document_text
 
 class ExtractionAgent:
     def extract_text(self, path, section=None):
-        """Extracts exact text from a section – no summarization unless requested."""
+        """
+        Extracts exact text from a section – no summarization unless requested.
+        Returns None when the section is not in the document (never the whole document instead).
+        """
         logger.info(f"Extracting text from {path} | Section: {section or 'Full'}")
-        text = ""
+        if not path.endswith(('.pdf', '.docx', '.xlsx')):
+            return ""
 
-        if path.endswith('.pdf'):
-            reader = PdfReader(path)
-            text = "".join(page.extract_text() or "" for page in reader.pages)
-        elif path.endswith('.docx'):
-            doc = DocxDocument(path)
-            text = "\n".join(p.text for p in doc.paragraphs)
-        elif path.endswith('.xlsx'):
-            df_dict = pd.read_excel(path, sheet_name=None)
-            text = "\n".join(sheet.to_string() for sheet in df_dict.values())
+        # Parsed once per file version and shared – report_flow no longer re-parses per section
+        cache = get_document_cache()
+        parsed = cache.get(path)
+        text = document_text(parsed)
 
         if section:
-            # Smart regex: finds section header and captures until next major header
-            pattern = re.compile(
-                r'(' + re.escape(section) + r'[\s\S]*?)(?=(?:\n[A-Z ]{5,}\n)|$)', 
-                re.IGNORECASE
-            )
-            match = pattern.search(text)
-            extracted = match.group(1).strip() if match else text
-            logger.debug(f"Section '{section}' extracted ({len(extracted)} chars)")
+            # Outline built once per document – lookup is a dict hit plus a slice
+            outline = get_section_index().get(cache.content_hash(path), parsed)
+            span = get_section_index().find(outline, section)
+            if span is None:
+                logger.warning(f"Section '{section}' not found in {path}")
+                return None
+            extracted = text[span["start"]:span["end"]].strip()
+            logger.debug(f"Section '{section}' extracted ({len(extracted)} chars, page {span.get('page', '-')})")
             return extracted
 
         return text
 
-    def extract_table(self, path, page_num=1, sheet_name=None):
-        """Extracts table as Markdown – preserves structure exactly."""
-        logger.info(f"Extracting table from {path} | Page/Sheet: {page_num or sheet_name}")
+    def extract_table(self, path, page_num=None, sheet_name=None):
+        """
+        Tables as DataFrames, ready for report assembly – every table in the PDF (or on 1-based
+        `page_num`), or every sheet of a workbook (or just `sheet_name`). Empty list when there are none.
+        """
+        logger.info(f"Extracting tables from {path} | Page/Sheet: {page_num or sheet_name or 'All'}")
         if path.endswith('.pdf'):
-            reader = PdfReader(path)
-            page = reader.pages[page_num - 1]
-            lines = [line.split() for line in page.extract_text().split('\n') if line.strip()]
-            df = pd.DataFrame(lines[1:], columns=lines[0])  # Assume first row is header
-            return df.to_markdown(index=False)
+            content_hash = get_document_cache().content_hash(path)
+            pages = [page_num - 1] if page_num else None
+            by_page = get_table_cache().tables(path, content_hash, pages)
+            return [df for tables in by_page.values() for df in tables]
         elif path.endswith('.xlsx'):
-            df = pd.read_excel(path, sheet_name=sheet_name or 0)
-            return df.to_markdown(index=False)
-        return ""
+            sheets = get_document_cache().get(path).sheets
+            if sheet_name:
+                return [sheets[sheet_name]] if sheet_name in sheets else []
+            return [df for df in sheets.values() if not df.empty]
+        return []
 
     def extract_image(self, path):
         """Returns image path + OCR text – for embedding in report."""
         logger.info(f"Extracting image: {path}")
         if path.endswith(('.png', '.jpg', '.jpeg')):
-            img = Image.open(path)
-            text = pytesseract.image_to_string(img)
+            text = get_document_cache().get(path).text  # Same OCR result the loader already produced
             return {"text": text, "path": path}
         return {}
 
@@ -62,4 +61,5 @@ class ExtractionAgent:
 if __name__ == "__main__":
     extractor = ExtractionAgent()
     print(extractor.extract_text("docs/sample_dataset/cmh-2022-0365.pdf", "Introduction"))
-    print(extractor.extract_table("docs/sample_dataset/cmh-2022-0365.pdf", 1))
\ No newline at end of file
+    for table in extractor.extract_table("docs/sample_dataset/cmh-2022-0365.pdf"):
+        print(table)
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""
+OCR for image uploads and scanned PDF pages.
+
+Images are downscaled and binarized before Tesseract sees them, results are cached on disk by
+image hash (so a re-upload, a renamed copy or the same scan embedded in a PDF is OCR'd once), and
+pages are recognized concurrently – each Tesseract call is a subprocess, so a thread pool spreads
+them over cores. Like parsers.py, kept free of langchain/FAISS imports: it runs in pool workers.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+from app.config import OCR_WORKERS, OCR_MAX_SIDE, OCR_LANG, OCR_CACHE_DIR, OCR_CACHE_SIZE, PARSE_TIMEOUT
+
+PREPROCESS_VERSION = 1  # Bump when preprocess() changes – cached results keyed on the old one go stale
+
+
+def otsu_threshold(pixels):
+    """Grey level that best separates ink from paper (maximizes between-class variance)."""
+    import numpy as np
+    hist = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    if np.count_nonzero(hist) <= 1:
+        return 127  # Blank or single-colour page – nothing to separate, so split at mid-grey
+    weights = np.cumsum(hist)
+    means = np.cumsum(hist * np.arange(256))
+    total_weight, total_mean = weights[-1], means[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (total_mean * weights - means * total_weight) ** 2 / (weights * (total_weight - weights))
+    return int(np.nanargmax(between))
+
+
+def preprocess(image, max_side=OCR_MAX_SIDE):
+    """Greyscale, capped at `max_side` pixels on the longest side, contrast-stretched and binarized."""
+    import numpy as np
+    from PIL import Image, ImageOps
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, "white")  # Transparent regions read as paper, not ink
+        image = Image.alpha_composite(background, image)
+    gray = image.convert("L")
+    scale = max_side / max(gray.size)
+    if scale < 1:
+        # Phone photos and 600 dpi scans carry far more pixels than Tesseract needs – and cost time
+        gray = gray.resize((max(1, round(gray.width * scale)), max(1, round(gray.height * scale))), Image.LANCZOS)
+    pixels = np.asarray(ImageOps.autocontrast(gray))
+    return Image.fromarray(np.where(pixels > otsu_threshold(pixels), 255, 0).astype(np.uint8))
+
+
+def image_key(data, lang=OCR_LANG, max_side=OCR_MAX_SIDE):
+    """Cache key: the encoded image bytes plus everything that changes the recognized text."""
+    digest = hashlib.sha256(data)
+    digest.update(f"\0{lang}\0{max_side}\0{PREPROCESS_VERSION}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """Recognized text keyed by image_key() – memory LRU backed by one text file per image."""
+
+    def __init__(self, cache_dir=OCR_CACHE_DIR, capacity=OCR_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".txt")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        text = None
+        if self.cache_dir:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    text = f.read()
+            except OSError:
+                pass
+        with self._lock:
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._remember(key, text)
+        return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._remember(key, text)
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"  # Parse workers may write the same image at once
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Could not persist OCR result {key[:12]}: {e}")
+
+    def _remember(self, key, text):
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+def run_tesseract(image, lang=OCR_LANG, timeout=PARSE_TIMEOUT):
+    import pytesseract
+    # Tesseract runs as a subprocess – its own timeout kills a hung OCR instead of pinning a worker
+    return pytesseract.image_to_string(image, lang=lang, timeout=timeout)
+
+
+def ocr_image(data, cache=None, engine=None):
+    """Text of one encoded image (bytes); served from the cache when this exact image was seen before."""
+    cache = cache if cache is not None else get_ocr_cache()
+    key = image_key(data)
+    text = cache.get(key)
+    if text is None:
+        from PIL import Image
+        text = (engine or run_tesseract)(preprocess(Image.open(io.BytesIO(data))))
+        cache.put(key, text)
+    return text
+
+
+def timed_ocr(data, cache=None, engine=None):
+    """(text, seconds) – the pool runs this so each page's OCR time is measured where it happens."""
+    start = time.perf_counter()
+    text = ocr_image(data, cache, engine)
+    return text, time.perf_counter() - start
+
+
+_cache = None
+_pool = None
+_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """Per-process memory LRU; the files underneath are shared by every process."""
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = OCRCache()
+        return _cache
+
+
+def get_ocr_pool():
+    """Threads that each drive one Tesseract subprocess – real parallelism without more processes."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            # Tesseract's own OpenMP threads would oversubscribe cores already shared by parallel pages
+            os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+            _pool = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+        return _pool
+
+
+class OCRStats:
+    """Per-page timings of parsed documents, aggregated in the API process for /stats."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.pages = 0
+        self.ocr_pages = 0
+        self.seconds = 0.0
+        self.ocr_seconds = 0.0
+        self.slowest = None  # {"path", "page", "seconds"}
+
+    def record(self, parsed):
+        page_stats = getattr(parsed, "page_stats", None) or []
+        if not page_stats:
+            return
+        ocr = [s for s in page_stats if s["ocr"]]
+        slowest = max(page_stats, key=lambda s: s["seconds"])
+        with self._lock:
+            self.documents += 1
+            self.pages += len(page_stats)
+            self.ocr_pages += len(ocr)
+            self.seconds += sum(s["seconds"] for s in page_stats)
+            self.ocr_seconds += sum(s["ocr_seconds"] for s in ocr)
+            if self.slowest is None or slowest["seconds"] > self.slowest["seconds"]:
+                self.slowest = {"path": parsed.path, "page": slowest["page"], "seconds": slowest["seconds"]}
+        if ocr:
+            logger.info(f"OCR'd {len(ocr)}/{len(page_stats)} page(s) of {parsed.path} in "
+                        f"{sum(s['ocr_seconds'] for s in ocr):.2f}s (slowest page {slowest['page']}: "
+                        f"{slowest['seconds']:.2f}s)")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": self.documents,
+                "pages": self.pages,
+                "ocr_pages": self.ocr_pages,
+                "avg_page_seconds": self.seconds / self.pages if self.pages else 0.0,
+                "avg_ocr_page_seconds": self.ocr_seconds / self.ocr_pages if self.ocr_pages else 0.0,
+                "slowest_page": self.slowest,
+            }
+
+
+_stats = None
+
+
+def get_ocr_stats():
+    global _stats
+    with _lock:
+        if _stats is None:
+            _stats = OCRStats()
+        return _stats
@@ -4,15 +4,24 @@ from langchain_ollama import ChatOllama
 from langchain.prompts import PromptTemplate
 from langchain_core.tools import tool
 from langchain_core.runnables import RunnableLambda
-from langchain.memory import ConversationBufferMemory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage
 from app.agents.document_loader import DocumentLoaderAgent
-from app.rag.rag_pipeline import QAAgent
+from app.rag.rag_pipeline import get_qa_agent
 from app.agents.extraction_agent import ExtractionAgent
-from app.agents.summarization_agent import SummarizationAgent
-from app.agents.report_assembly_agent import ReportAssemblyAgent
+from app.agents.summarization_agent import get_summarization_agent
+from app.agents.report_assembly_agent import get_report_assembly_agent
+from app.agents.query_router import QueryRouter, REPORT
+from app.rag.vectorstore_service import get_vectorstore_service
+from app.rag.answer_cache import AnswerCache
+from app.session_store import get_session_store
+from app.metrics import timed, token_callback
+from app.config import CHAT_MODEL, REPORT_WORKERS
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import os
 from loguru import logger
 import re
-from collections import defaultdict
 
 class AgentState(TypedDict):
     query: str
@@ -22,26 +31,27 @@ class AgentState(TypedDict):
     response: any
     session_id: str
     classification: str
-    memory: Optional[ConversationBufferMemory]
+    memory: Optional[BaseChatMessageHistory]
 
 @tool
 def load_docs(documents: List[str]):
     """Tool: Loads and indexes documents into FAISS."""
-    loader = DocumentLoaderAgent()
+    loader = DocumentLoaderAgent()  # Cheap – the index and embeddings client are shared
     return {"vectorstore": loader.load_documents(documents)}
 
 @tool
-def handle_qa(query: str, vectorstore: any, session_id: str):
-    """Tool: Answers questions using RAG + conversation memory."""
-    qa = QAAgent(vectorstore)
-    return {"response": qa.answer(query, session_id)}
+def handle_qa(query: str, session_id: str, documents: Optional[List[str]] = None, retrieval_query: Optional[str] = None):
+    """Tool: Answers questions using RAG + conversation memory, retrieving only from `documents`."""
+    qa = get_qa_agent()  # Long-lived – no per-call LLM/retriever construction
+    return {"response": qa.answer(query, session_id, documents, retrieval_query)}
 
 @tool
 def extract_content(path: str, section: str):
     """Tool: Pulls exact content (text/table/image) from a document."""
     extractor = ExtractionAgent()
     if "table" in section.lower():
-        return extractor.extract_table(path)
+        page = re.search(r"\bpage\s+(\d+)", section, re.IGNORECASE)  # "Table on page 3" narrows; otherwise all pages
+        return extractor.extract_table(path, int(page.group(1)) if page else None)
     elif "image" in section.lower():
         return extractor.extract_image(path)
     else:
@@ -50,25 +60,42 @@ def extract_content(path: str, section: str):
 @tool
 def summarize_content(text: str):
     """Tool: Summarizes only when explicitly requested."""
-    summarizer = SummarizationAgent()
+    summarizer = get_summarization_agent()  # Shared – no ChatOllama client per section
     return summarizer.summarize(text)
 
 @tool
 def assemble_report(sections: dict):
     """Tool: Compiles final PDF report."""
-    assembler = ReportAssemblyAgent()
+    assembler = get_report_assembly_agent()  # Shared – styles and downsampled images are reused
     return {"response": assembler.assemble_report(sections)}
 
+@timed("extract")
+def build_section(section: str, documents: List[str]):
+    """Content for one report section – the first document that has it wins."""
+    for doc in documents:
+        content = extract_content.invoke({"path": doc, "section": section})
+        if content and isinstance(content, str) and "summary" in section.lower():
+            content = summarize_content.invoke({"text": content})  # LLM concurrency is capped by the shared summarizer
+        if content:
+            return content
+    # Explicit, not the whole document silently standing in for a missing section
+    return f"Section '{section}' was not found in the provided documents."
+
+def collect_sections(sections: List[str], documents: List[str], pool: ThreadPoolExecutor):
+    """Builds every section concurrently and gathers them in request order."""
+    # Each section runs in a copy of the caller's context – its spans still count towards the request
+    futures = {section: pool.submit(contextvars.copy_context().run, build_section, section, documents)
+               for section in dict.fromkeys(sections)}
+    return {section: future.result() for section, future in futures.items()}
+
 class Orchestrator:
     def __init__(self):
-        self.llm = ChatOllama(model="llama3:8b", temperature=0.3)
+        self.llm = ChatOllama(model=CHAT_MODEL, temperature=0.3, callbacks=[token_callback])
         self.tools = [load_docs, handle_qa, extract_content, summarize_content, assemble_report]
         self.llm_with_tools = self.llm.bind_tools(self.tools)
 
-        # Per-session memory – critical for multi-turn conversations
-        self.memory_store = defaultdict(lambda: ConversationBufferMemory(
-            memory_key="chat_history", return_messages=True
-        ))
+        # Report sections fan out here; latency tracks the slowest section rather than the sum
+        self.report_pool = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix="report")
 
         # Classifier: decides QA vs Report
         classify_prompt = PromptTemplate(
@@ -76,56 +103,79 @@ class Orchestrator:
             input_variables=["query"]
         )
         self.classifier = classify_prompt | self.llm
+        # Rules and exemplar similarity settle most queries; the classifier LLM only sees the ambiguous rest
+        self.router = QueryRouter(llm=self.classifier, embeddings=get_vectorstore_service().embeddings)
+        # Repeated questions over the same indexed documents skip retrieval and generation
+        self.answer_cache = AnswerCache(get_vectorstore_service())
 
+        @timed("classify")
         def classify(state: AgentState):
-            classification = self.classifier.invoke({"query": state["query"]}).content.strip()
-            logger.info(f"Query classified as: {classification}")
+            classification, tier = self.router.classify(state["query"])
+            logger.info(f"Query classified as: {classification} ({tier})")
             return {
                 "classification": classification,
-                "memory": self.memory_store[state["session_id"]]
+                "memory": get_session_store().history(state["session_id"])  # Shared with QAAgent – one copy per turn
             }
 
         def route(state: AgentState):
-            return "report_flow" if state["classification"] == "Report" else "qa_flow"
-
-        def qa_flow(state: AgentState):
-            load_result = load_docs.invoke({"documents": state["documents"]})
-            state["vectorstore"] = load_result["vectorstore"]
-
-            # Reconstruct chat history for context
-            memory = state["memory"]
-            history = memory.load_memory_variables({})["chat_history"]
+            return "report_flow" if state["classification"] == REPORT else "qa_flow"
+
+        @timed("prepare_qa")
+        def prepare_qa(state: AgentState):
+            """
+            Folds recent history into the query – None if nothing to search. Read-only: documents are
+            indexed by the upload's background job (the API waits for it), never on the query path.
+            """
+            store = get_vectorstore_service()
+            state["vectorstore"] = store.vectorstore
+            indexed = [d for d in state["documents"] if os.path.exists(d) and store.registry.is_indexed(d)]
+            if state["vectorstore"] is None or not indexed:
+                state["response"] = "No readable documents were provided – please upload a file first."
+                return None
+
+            # Recent turns sharpen retrieval for follow-ups; the prompt itself gets the full history from QAAgent
+            history = state["memory"].messages
             context = "\n".join([f"{m.type}: {m.content}" for m in history[-4:]])  # Last 2 turns
-            full_query = f"{context}\nUser: {state['query']}" if context else state["query"]
+            return f"{context}\nUser: {state['query']}" if context else state["query"]
 
-            result = handle_qa.invoke({
-                "query": full_query,
-                "vectorstore": state["vectorstore"],
-                "session_id": state["session_id"]
-            })
-            state["response"] = result["response"]
-            memory.save_context({"input": state["query"]}, {"output": state["response"]})
+        @timed("qa_flow")
+        def qa_flow(state: AgentState):
+            full_query = prepare_qa(state)
+            if full_query is None:
+                return state
+
+            cached, cache_key = self.answer_cache.lookup(
+                state["query"], state["documents"], has_history=full_query != state["query"]
+            )
+            if cached is not None:
+                state["response"] = cached
+                state["memory"].add_messages([HumanMessage(content=state["query"]), AIMessage(content=cached)])
+            else:
+                result = handle_qa.invoke({
+                    "query": state["query"],
+                    "retrieval_query": full_query,
+                    "session_id": state["session_id"],
+                    "documents": state["documents"]
+                })  # QAAgent records the turn in the session store
+                state["response"] = result["response"]
+                self.answer_cache.put(cache_key, state["response"])
             return state
 
+        @timed("report_flow")
         def report_flow(state: AgentState):
             # Parse requested sections from query
             match = re.search(r"with\s+(.+)", state["query"], re.IGNORECASE)
             sections = [s.strip() for s in (match.group(1).split(",") if match else ["Introduction", "Summary"])]
-            state["sections"] = {}
-
-            for section in sections:
-                for doc in state["documents"]:
-                    content = extract_content.invoke({"path": doc, "section": section})
-                    if content and "summary" in section.lower():
-                        content = summarize_content.invoke({"text": content})
-                    if content:
-                        state["sections"][section] = content
-                        break
+            state["sections"] = collect_sections(sections, state["documents"], self.report_pool)
 
             result = assemble_report.invoke({"sections": state["sections"]})
             state["response"] = result["response"]
             return state
 
+        # Exposed for stream(), which walks the same steps but yields tokens as they arrive
+        self._classify, self._route = classify, route
+        self._prepare_qa, self._report_flow = prepare_qa, report_flow
+
         # Build LangGraph workflow
         workflow = StateGraph(AgentState)
         workflow.add_node("classify", RunnableLambda(classify))
@@ -142,4 +192,36 @@ class Orchestrator:
     def invoke(self, input_data):
         state = {**input_data, "sections": {}, "response": None}
         logger.info(f"Orchestrator invoked with query: {state['query'][:50]}...")
-        return self.graph.invoke(state)
\ No newline at end of file
+        return self.graph.invoke(state)
+
+    def stream(self, input_data):
+        """
+        Streaming counterpart of invoke(). QA yields {"type": "token", "content": str} as the model
+        generates (the turn is recorded once the answer completes); a report yields one
+        {"type": "report", "content": <PDF buffer>}.
+        """
+        state = {**input_data, "sections": {}, "response": None}
+        logger.info(f"Orchestrator streaming query: {state['query'][:50]}...")
+        state.update(self._classify(state))
+        if self._route(state) == "report_flow":
+            yield {"type": "report", "content": self._report_flow(state)["response"]}
+            return
+
+        full_query = self._prepare_qa(state)
+        if full_query is None:
+            yield {"type": "token", "content": state["response"]}
+            return
+
+        cached, cache_key = self.answer_cache.lookup(
+            state["query"], state["documents"], has_history=full_query != state["query"]
+        )
+        if cached is not None:
+            yield {"type": "token", "content": cached}
+            state["memory"].add_messages([HumanMessage(content=state["query"]), AIMessage(content=cached)])
+            return
+
+        parts = []
+        for token in get_qa_agent().stream(state["query"], state["session_id"], state["documents"], full_query):
+            parts.append(token)
+            yield {"type": "token", "content": token}
+        self.answer_cache.put(cache_key, "".join(parts))  # QAAgent has already recorded the turn
@@ -0,0 +1,257 @@
+"""
+Per-format document parsers, run on a shared process pool.
+
+Kept free of langchain/FAISS imports on purpose – pool workers are spawned and only
+need the format libraries.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from loguru import logger
+from app.config import PARSE_WORKERS, PARSE_TIMEOUT, PDF_PAGES_PER_TASK, OCR_MIN_PAGE_CHARS
+from app.agents.ocr import get_ocr_pool, get_ocr_stats, timed_ocr
+
+
+@dataclass
+class ParsedDocument:
+    path: str
+    kind: str
+    pages: list = field(default_factory=list)  # One string per PDF page; a single entry for other formats
+    paragraphs: list = field(default_factory=list)  # DOCX only – every paragraph, blanks included
+    sheets: dict = field(default_factory=dict)  # XLSX only – sheet name -> DataFrame
+    page_stats: list = field(default_factory=list)  # PDF/image – per page: seconds, whether (and how long) OCR ran
+
+    @property
+    def text(self):
+        return "".join(self.pages)
+
+    def nbytes(self):
+        """Rough in-memory footprint – used to bound the parsed-document cache."""
+        size = sum(len(page) for page in self.pages) + sum(len(p) for p in self.paragraphs)
+        return size + sum(int(df.memory_usage(deep=True).sum()) for df in self.sheets.values())
+
+
+PARSERS = {}
+
+
+def register_parser(*extensions):
+    """Decorator: `@register_parser(".pdf")` makes a function the parser for those extensions."""
+    def decorator(func):
+        for ext in extensions:
+            PARSERS[ext.lower()] = func
+        return func
+    return decorator
+
+
+def parser_for(path):
+    return PARSERS.get(os.path.splitext(path)[1].lower())
+
+
+def pdf_page_count(path):
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def _page_images(page, path, number):
+    try:
+        return [image.data for image in page.images]
+    except Exception as e:  # Unsupported image filters (e.g. JBIG2) – the page keeps whatever text it had
+        logger.warning(f"Could not read images on page {number} of {path}: {e}")
+        return []
+
+
+@register_parser(".pdf")
+def parse_pdf(path, page_range=None):
+    """
+    Text layer of each page; pages without one (scans) fall back to OCR of their embedded images.
+    All scanned pages of the range are OCR'd concurrently.
+    """
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    start, stop = page_range or (0, len(reader.pages))
+    pages, page_stats, scanned = [], [], {}
+    for i in range(start, stop):
+        began = time.perf_counter()
+        page = reader.pages[i]
+        text = page.extract_text() or ""
+        if len(text.strip()) < OCR_MIN_PAGE_CHARS:
+            images = _page_images(page, path, i + 1)
+            if images:
+                scanned[len(pages)] = [get_ocr_pool().submit(timed_ocr, data) for data in images]
+        pages.append(text)
+        page_stats.append({"page": i + 1, "seconds": time.perf_counter() - began, "ocr": False, "ocr_seconds": 0.0})
+
+    for j, futures in scanned.items():
+        try:
+            results = [future.result() for future in futures]
+        except Exception as e:
+            logger.warning(f"OCR failed on page {start + j + 1} of {path}: {e}")
+            continue
+        ocr_text = "\n".join(text.strip() for text, _ in results if text.strip())
+        if len(ocr_text) > len(pages[j].strip()):
+            pages[j] = ocr_text + "\n"
+        ocr_seconds = sum(seconds for _, seconds in results)
+        page_stats[j].update(ocr=True, ocr_seconds=ocr_seconds, seconds=page_stats[j]["seconds"] + ocr_seconds)
+    return ParsedDocument(path, "pdf", pages, page_stats=page_stats)
+
+
+@register_parser(".docx")
+def parse_docx(path):
+    from docx import Document as DocxDocument
+    paragraphs = [p.text for p in DocxDocument(path).paragraphs]
+    return ParsedDocument(path, "docx", ["\n".join(p for p in paragraphs if p.strip())], paragraphs=paragraphs)
+
+
+@register_parser(".xlsx")
+def parse_xlsx(path):
+    import pandas as pd
+    df_dict = pd.read_excel(path, sheet_name=None)
+    return ParsedDocument(path, "xlsx", ["\n".join(sheet.to_string() for sheet in df_dict.values())], sheets=df_dict)
+
+
+@register_parser(".png", ".jpg", ".jpeg")
+def parse_image(path):
+    with open(path, "rb") as f:
+        text, seconds = timed_ocr(f.read())  # Preprocessed and cached by image hash – see app.agents.ocr
+    return ParsedDocument(path, "image", [text], page_stats=[{"page": 1, "seconds": seconds, "ocr": True,
+                                                              "ocr_seconds": seconds}])
+
+
+def parse_file(path):
+    parser = parser_for(path)
+    if parser is None:
+        raise ValueError(f"Unsupported file type: {path}")
+    return parser(path)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool():
+    """Long-lived pool – spawned once, reused by every upload."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def recycle_parse_pool(pool):
+    """
+    Terminates `pool`'s workers – the only way to free one stuck in a hung parse – so the next
+    get_parse_pool() spawns a fresh pool. Tasks still on the old one fail with BrokenProcessPool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    for process in list((pool._processes or {}).values()):  # No public API to stop a running task
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _plan(path, pages_per_task):
+    """Splits large PDFs into page ranges so one big file spreads across cores."""
+    if parser_for(path) is parse_pdf:
+        count = pdf_page_count(path)
+        if count > pages_per_task:
+            return [(parse_pdf, (path, (start, min(start + pages_per_task, count))))
+                    for start in range(0, count, pages_per_task)]
+    return [(parse_file, (path,))]
+
+
+def _finish(parsed, cache):
+    get_ocr_stats().record(parsed)
+    if cache is not None:
+        cache.put(parsed)
+
+
+def iter_parsed(paths, timeout=PARSE_TIMEOUT, pages_per_task=PDF_PAGES_PER_TASK, pool=None,
+                max_workers=PARSE_WORKERS, cache=None):
+    """
+    Yields ParsedDocument per file as soon as it is complete – callers can split early files
+    while later ones are still parsing. Each task gets `timeout` seconds from the moment it
+    starts; failed or timed-out files are logged and skipped.
+    A timed-out task on the shared pool recycles it, and the other tasks it took down are run
+    again on the fresh one. A caller-supplied `pool` is left alone – its stuck worker stays busy.
+    With a `cache`, already-parsed files are served from it and fresh results are stored in it.
+    """
+    tasks = {}
+    for path in paths:
+        cached = cache.peek(path) if cache is not None else None
+        if cached is not None:
+            yield cached
+            continue
+        if parser_for(path) is None:
+            logger.warning(f"No parser registered for {path} – skipping file")
+            continue
+        try:
+            tasks[path] = _plan(path, pages_per_task)
+        except Exception as e:
+            logger.warning(f"Failed to process {path}: {e} – skipping file")
+
+    shared = pool is None
+    queue = deque((path, i, func, args) for path, plan in tasks.items() for i, (func, args) in enumerate(plan))
+    parts = {path: [None] * len(plan) for path, plan in tasks.items()}  # Page-ordered pieces per file
+    in_flight = {}  # future -> (path, part index, func, args, deadline, pool it runs on)
+    failed, retried = set(), set()
+    slots = max_workers  # Only as many tasks as workers are submitted, so a deadline measures run time
+
+    while queue or in_flight:
+        while queue and len(in_flight) < slots:
+            path, i, func, args = queue.popleft()
+            if path not in failed:
+                target = get_parse_pool() if shared else pool
+                in_flight[target.submit(func, *args)] = (path, i, func, args, time.monotonic() + timeout, target)
+        if not in_flight:
+            break
+
+        next_deadline = min(task[4] for task in in_flight.values())
+        done, _ = wait(in_flight, timeout=max(0.0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        for future in done:
+            path, i, func, args, _, target = in_flight.pop(future)
+            if path in failed:
+                continue
+            try:
+                parts[path][i] = future.result()
+            except BrokenProcessPool as e:
+                if shared:
+                    recycle_parse_pool(target)  # No-op if a timeout already recycled it
+                if shared and (path, i) not in retried:  # Taken down with another task – not its own fault
+                    retried.add((path, i))
+                    queue.appendleft((path, i, func, args))
+                    continue
+                logger.warning(f"Failed to process {path}: {e} – skipping file")
+                failed.add(path)
+                continue
+            except Exception as e:
+                logger.warning(f"Failed to process {path}: {e} – skipping file")
+                failed.add(path)
+                continue
+            if all(part is not None for part in parts[path]):
+                pieces = parts.pop(path)
+                parsed = pieces[0] if len(pieces) == 1 else ParsedDocument(
+                    path, pieces[0].kind, [page for piece in pieces for page in piece.pages],
+                    page_stats=[stat for piece in pieces for stat in piece.page_stats]
+                )
+                _finish(parsed, cache)
+                yield parsed
+
+        now = time.monotonic()
+        for future, (path, i, _, _, deadline, target) in list(in_flight.items()):
+            if deadline <= now and not future.done():
+                del in_flight[future]
+                if path not in failed:
+                    failed.add(path)
+                    logger.warning(f"Parsing {path} exceeded {timeout}s – skipping file")
+                if shared:
+                    recycle_parse_pool(target)  # A hung parse never hands its worker back
+                else:
+                    future.cancel()
+                    slots = max(1, slots - 1)  # The stuck worker stays busy – don't count on it
@@ -0,0 +1,158 @@
+import re
+import threading
+from collections import Counter, OrderedDict
+import numpy as np
+from loguru import logger
+from app.config import ROUTER_CACHE_SIZE, ROUTER_MIN_MARGIN, ROUTER_MIN_SIMILARITY
+
+QA, REPORT = "QA", "Report"
+
+# Tier 1 – phrasings that are unambiguous on their own (same style as report_flow's `with\s+(.+)`)
+_REPORT_RULES = [
+    re.compile(r"\b(generate|create|make|build|produce|compile|prepare|draft|write|export)\b.{0,40}\breport\b", re.I),
+    re.compile(r"^\s*report\s+(with|on|of|for|including|covering)\b", re.I),
+    re.compile(r"\breport\s+with\s+.+", re.I),
+    re.compile(r"\b(export|download|save)\b.{0,40}\bpdf\b", re.I),
+]
+_QA_RULES = [
+    re.compile(r"^\s*(what|who|whom|whose|when|where|why|how|which|is|are|was|were|does|do|did|can|could|"
+               r"should|would|will|has|have|had|explain|describe|tell me|list)\b", re.I),
+    re.compile(r"\?\s*$"),
+]
+
+# Tier 2 – labelled exemplars compared by embedding similarity
+EXEMPLARS = {
+    REPORT: [
+        "Generate report with Introduction and Summary",
+        "Create a PDF report of the findings",
+        "Put together a document containing the methods and results sections",
+        "I need a summary report for this patient file",
+        "Compile the discussion and conclusion into a report",
+        "Produce a report including the tables and images",
+        "Make me a downloadable summary of these documents",
+        "Assemble the introduction, dosage and adverse events sections",
+    ],
+    QA: [
+        "What is the recommended dosage?",
+        "Which adverse events were reported in the trial?",
+        "Summarize the patient's medical history",
+        "Explain the results of the study",
+        "Tell me about the treatment plan",
+        "What did the discharge summary say about follow-up?",
+        "Are there any contraindications mentioned?",
+        "The HbA1c values in the second table",
+    ],
+}
+
+
+def normalize_query(query):
+    """Case-, whitespace- and trailing-punctuation-insensitive cache key."""
+    return re.sub(r"\s+", " ", query).strip().rstrip(".!?").strip().lower()
+
+
+def parse_label(text):
+    """Tolerant reading of the LLM's answer – 'Report.', 'report', '**Report**' all count."""
+    return REPORT if re.search(r"\breport\b", text, re.I) else QA
+
+
+class QueryRouter:
+    """
+    Tiered QA-vs-Report classifier: regex rules, then nearest labelled exemplar by embedding,
+    then the LLM only when neither is confident. Embedding and LLM verdicts are cached per
+    normalized query; `stats()` reports how often each tier decided.
+    """
+
+    def __init__(self, llm=None, embeddings=None, exemplars=EXEMPLARS, min_similarity=ROUTER_MIN_SIMILARITY,
+                 min_margin=ROUTER_MIN_MARGIN, cache_size=ROUTER_CACHE_SIZE):
+        self.llm = llm
+        self.embeddings = embeddings
+        self.exemplars = exemplars
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._exemplar_vectors = None
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def classify(self, query):
+        """Returns (label, tier) where tier is one of rule / cache / embedding / llm."""
+        label = self._by_rules(query)
+        if label is not None:
+            return self._count(label, "rule")
+
+        key = normalize_query(query)
+        with self._lock:
+            label = self._cache.get(key)
+            if label is not None:
+                self._cache.move_to_end(key)
+        if label is not None:
+            return self._count(label, "cache")
+
+        label, tier = self._by_embedding(query), "embedding"
+        if label is None:
+            label, tier = self._by_llm(query), "llm"
+        with self._lock:
+            self._cache[key] = label
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return self._count(label, tier)
+
+    def _count(self, label, tier):
+        with self._lock:
+            self.counts[tier] += 1
+        logger.debug(f"Routed as {label} by {tier}")
+        return label, tier
+
+    @staticmethod
+    def _by_rules(query):
+        if any(rule.search(query) for rule in _REPORT_RULES):
+            return REPORT
+        if any(rule.search(query) for rule in _QA_RULES):
+            return QA
+        return None
+
+    def _exemplar_matrix(self):
+        if self._exemplar_vectors is None:
+            labels, texts = [], []
+            for label, examples in self.exemplars.items():
+                labels += [label] * len(examples)
+                texts += examples
+            vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+            self._exemplar_vectors = (np.array(labels), vectors)
+        return self._exemplar_vectors
+
+    def _by_embedding(self, query):
+        """Label of the closest exemplar when it is similar enough and clearly closer than the other label."""
+        if self.embeddings is None:
+            return None
+        try:
+            labels, vectors = self._exemplar_matrix()
+            vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Embedding router unavailable, deferring to LLM: {e}")
+            return None
+        scores = vectors @ (vector / (np.linalg.norm(vector) + 1e-12))
+        best = {label: scores[labels == label].max() for label in self.exemplars}
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        (label, top), (_, runner_up) = ranked[0], ranked[1]
+        if top >= self.min_similarity and top - runner_up >= self.min_margin:
+            return label
+        return None
+
+    def _by_llm(self, query):
+        if self.llm is None:
+            return QA
+        return parse_label(self.llm.invoke({"query": query}).content)
+
+    def stats(self):
+        with self._lock:
+            total = sum(self.counts.values())
+            return {
+                "decisions": total,
+                "by_tier": dict(self.counts),
+                "llm_rate": self.counts["llm"] / total if total else 0.0,
+                "cache_hit_rate": self.counts["cache"] / total if total else 0.0,
+                "cached_queries": len(self._cache),
+            }
@@ -1,50 +1,203 @@
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, Image as RLImage, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
+from collections import OrderedDict
+from functools import lru_cache
 import io
-import pandas as pd
+import os
+import re
+import tempfile
+import threading
 from loguru import logger
+from app.metrics import timed
+from app.config import (
+    REPORT_SPOOL_BYTES, REPORT_STREAM_CHUNK, REPORT_TABLE_CHUNK_ROWS, REPORT_IMAGE_DPI, REPORT_IMAGE_CACHE_BYTES
+)
+
+IMAGE_BOX = (450, 250)  # Points an image may occupy – it is fitted inside, keeping its aspect ratio
+PAGE_SIZE = (612.0, 792.0)  # reportlab.lib.pagesizes.letter
+MARGIN = 72  # SimpleDocTemplate's default side margins
+
+
+# ReportLab and pandas are imported with the first report, not with the API – built once per process
+@lru_cache(maxsize=None)
+def _styles():
+    from reportlab.lib.styles import getSampleStyleSheet
+    return getSampleStyleSheet()
+
+
+@lru_cache(maxsize=None)
+def _table_style():
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+    return TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.grey),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+        ('GRID', (0,0), (-1,-1), 0.5, colors.black),
+        ('BACKGROUND', (0,1), (-1,-1), colors.beige),
+    ])
+
+
+def markdown_rows(text):
+    """Cell text of a pipe table (header first, separator row dropped) – [] when it is not one."""
+    rows = []
+    for line in text.strip().splitlines():
+        line = line.strip()
+        if not line.startswith('|'):
+            return []
+        cells = [cell.strip() for cell in line.strip('|').split('|')]
+        if all(re.fullmatch(r':?-{3,}:?', cell) for cell in cells):
+            continue
+        rows.append(cells)
+    width = max((len(r) for r in rows), default=0)
+    return [r + [""] * (width - len(r)) for r in rows] if len(rows) > 1 else []
+
+
+def iter_report(report, chunk_size=REPORT_STREAM_CHUNK):
+    """Reads a finished report in chunks for StreamingResponse, then closes it (deleting any temp file)."""
+    try:
+        report.seek(0)
+        while True:
+            chunk = report.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        report.close()
+
+
+class ImageCache:
+    """
+    Images decoded and downsampled to the resolution they are printed at, as JPEG/PNG bytes.
+    Keyed by path + mtime/size, LRU-bounded by bytes – a scan reused across reports is decoded once.
+    """
+
+    def __init__(self, max_bytes=REPORT_IMAGE_CACHE_BYTES, dpi=REPORT_IMAGE_DPI):
+        self.max_bytes = max_bytes
+        self.dpi = dpi
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (encoded bytes, width pt, height pt)
+        self._bytes = 0
+
+    def get(self, path, box=IMAGE_BOX):
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, box)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = self._downsample(path, box)
+        with self._lock:
+            self.misses += 1
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._bytes += len(entry[0])
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (data, _, _) = self._entries.popitem(last=False)
+                self._bytes -= len(data)
+        return entry
+
+    def _downsample(self, path, box):
+        from PIL import Image, ImageOps
+        with Image.open(path) as image:
+            scale = min(box[0] / image.width, box[1] / image.height)
+            width, height = image.width * scale, image.height * scale  # Points on the page
+            target = (max(1, round(width * self.dpi / 72)), max(1, round(height * self.dpi / 72)))
+            image.draft("RGB", target)  # JPEG decodes straight at a reduced scale – no full-size bitmap
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(target)
+            buffer = io.BytesIO()
+            if image.mode in ("RGBA", "LA", "P"):
+                image.save(buffer, format="PNG", optimize=True)  # Keeps transparency
+            else:
+                image.convert("RGB").save(buffer, format="JPEG", quality=85)
+        return buffer.getvalue(), width, height
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
 
 class ReportAssemblyAgent:
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
+    def __init__(self, image_cache=None, table_chunk_rows=REPORT_TABLE_CHUNK_ROWS, spool_bytes=REPORT_SPOOL_BYTES):
+        self.image_cache = image_cache or ImageCache()
+        self.table_chunk_rows = table_chunk_rows
+        self.spool_bytes = spool_bytes
         logger.info("ReportAssemblyAgent ready – using ReportLab for PDF generation")
 
-    def assemble_report(self, sections):
-        """Builds professional PDF with headings, text, tables, and images."""
+    @property
+    def styles(self):
+        return _styles()
+
+    def _tables(self, rows):
+        """
+        A long table as consecutive fixed-width Tables of `table_chunk_rows` rows, header repeated.
+        ReportLab re-measures a whole Table every time it splits it across pages – small chunks with
+        precomputed column widths keep that linear.
+        """
+        import pandas as pd
+        from reportlab.platypus import Table
+        data = [["" if pd.isna(cell) else str(cell) for cell in row] for row in rows]
+        header, body = data[0], data[1:] or [[""] * len(data[0])]
+        # ~5.5pt per character at the default 10pt font, shrunk to fit the frame when the table is wide
+        widths = [(max(len(row[i]) for row in data) + 2) * 5.5 for i in range(len(header))]
+        scale = min(1.0, (PAGE_SIZE[0] - 2 * MARGIN) / max(sum(widths), 1))
+        col_widths = [w * scale for w in widths]
+        tables = []
+        for start in range(0, len(body), self.table_chunk_rows):
+            table = Table([header] + body[start:start + self.table_chunk_rows], colWidths=col_widths, repeatRows=1)
+            table.setStyle(_table_style())
+            tables.append(table)
+        return tables
+
+    def _image(self, path):
+        from reportlab.platypus import Image as RLImage
+        data, width, height = self.image_cache.get(path)
+        return RLImage(io.BytesIO(data), width=width, height=height)
+
+    @timed("assemble_report")
+    def assemble_report(self, sections, output=None):
+        """
+        Builds professional PDF with headings, text, tables, and images.
+        Written to `output` (a path or binary file) when given; otherwise returned as a spooled temp
+        file, in memory up to spool_bytes and on disk beyond – stream it with iter_report(), which
+        also deletes it.
+        """
+        import pandas as pd
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
         logger.info(f"Assembling report with {len(sections)} section(s)")
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=60)
+        report = output if output is not None else tempfile.SpooledTemporaryFile(
+            max_size=self.spool_bytes, prefix="report-", suffix=".pdf"
+        )
+        doc = SimpleDocTemplate(report, pagesize=PAGE_SIZE, topMargin=60)
         elements = []
 
         for title, content in sections.items():
             elements.append(Paragraph(title, self.styles['Heading1']))
             elements.append(Spacer(1, 12))
 
-            if isinstance(content, str) and '|' in content and content.startswith('|'):
-                # Markdown table → pandas → ReportLab Table
-                try:
-                    df = pd.read_markdown(io.StringIO(content))
-                    data = [df.columns.tolist()] + df.values.tolist()
-                    table = Table(data)
-                    table.setStyle([
-                        ('BACKGROUND', (0,0), (-1,0), colors.grey),
-                        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-                        ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-                        ('BACKGROUND', (0,1), (-1,-1), colors.beige),
-                    ])
-                    elements.append(table)
-                except:
+            if isinstance(content, pd.DataFrame) or (
+                    isinstance(content, list) and content and all(isinstance(c, pd.DataFrame) for c in content)):
+                # Structured tables straight from extraction – no text round trip
+                for df in ([content] if isinstance(content, pd.DataFrame) else content):
+                    elements.extend(self._tables([df.columns.tolist()] + df.values.tolist()))
+                    elements.append(Spacer(1, 12))
+            elif isinstance(content, str) and content.startswith('|'):
+                rows = markdown_rows(content)
+                if rows:
+                    elements.extend(self._tables(rows))
+                else:
                     elements.append(Paragraph(content, self.styles['Normal']))
             elif isinstance(content, dict) and "path" in content:
-                # Insert image
+                # Insert image, downsampled to print resolution (and cached) instead of embedded full size
                 try:
-                    img = RLImage(content["path"], width=450, height=250)
-                    elements.append(img)
+                    elements.append(self._image(content["path"]))
                     if content.get("text"):
                         elements.append(Paragraph(content["text"], self.styles['Italic']))
-                except:
+                except Exception as e:
+                    logger.warning(f"Image {content['path']} failed to load: {e}")
                     elements.append(Paragraph("[Image failed to load]", self.styles['Normal']))
             else:
                 elements.append(Paragraph(content, self.styles['Normal']))
@@ -52,6 +205,20 @@ class ReportAssemblyAgent:
             elements.append(Spacer(1, 24))
 
         doc.build(elements)
-        buffer.seek(0)
+        if not isinstance(report, str):
+            report.seek(0)
         logger.success("PDF report assembled and ready for download")
-        return buffer
\ No newline at end of file
+        return report
+
+
+_shared_agent = None
+_shared_lock = threading.Lock()
+
+
+def get_report_assembly_agent():
+    """Process-wide assembler – one image cache shared by every report."""
+    global _shared_agent
+    with _shared_lock:
+        if _shared_agent is None:
+            _shared_agent = ReportAssemblyAgent()
+        return _shared_agent
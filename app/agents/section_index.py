@@ -0,0 +1,161 @@
+import bisect
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from loguru import logger
+from app.config import OUTLINE_DIR, OUTLINE_CACHE_SIZE
+
+# Headers that are common in clinical documents and papers even when not written in capitals
+KNOWN_SECTIONS = {
+    "abstract", "introduction", "background", "summary", "executive summary", "methods", "methodology",
+    "materials and methods", "results", "discussion", "conclusion", "conclusions", "references",
+    "case presentation", "case report", "history", "medical history", "history of present illness",
+    "diagnosis", "assessment", "plan", "assessment and plan", "findings", "impression", "medications",
+    "allergies", "recommendations", "treatment", "procedures", "discharge summary", "follow-up",
+    "limitations", "acknowledgements", "adverse events", "dosage", "dosage and administration",
+}
+
+_NUMBERING = re.compile(r"^\s*(?:\d+(?:\.\d+)*\.?|[IVXLC]+\.)\s+")
+_ALL_CAPS = re.compile(r"^[A-Z][A-Z0-9 &/,:()'-]{4,}$")  # Same family as the old `\n[A-Z ]{5,}\n` boundary
+
+
+def normalize_section(title):
+    title = _NUMBERING.sub("", title)
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s&/-]", " ", title)).strip().lower()
+
+
+def document_text(parsed):
+    """The text section offsets refer to – DOCX keeps blank paragraphs so line structure survives."""
+    if parsed.kind == "docx":
+        return "\n".join(parsed.paragraphs)
+    return parsed.text
+
+
+def _is_header(line):
+    stripped = line.strip()
+    if not stripped or len(stripped) > 80:
+        return False
+    if _ALL_CAPS.match(stripped):
+        return True
+    key = normalize_section(stripped)
+    if key in KNOWN_SECTIONS:
+        return True
+    # "2.1 Study design" – numbered, short, no sentence punctuation
+    return bool(_NUMBERING.match(stripped)) and len(key.split()) <= 8 and not stripped.endswith((".", ","))
+
+
+def build_outline(parsed):
+    """
+    Header offsets -> section spans (and 1-based page numbers for PDFs), computed in one pass.
+    A section runs from its header line to the next header.
+    """
+    text = document_text(parsed)
+    page_starts = []
+    if parsed.kind == "pdf":
+        offset = 0
+        for page in parsed.pages:
+            page_starts.append(offset)
+            offset += len(page)
+
+    headers = []
+    offset = 0
+    for line in text.split("\n"):
+        if _is_header(line):
+            headers.append((offset, line.strip()))
+        offset += len(line) + 1
+
+    sections = {}
+    for i, (start, title) in enumerate(headers):
+        end = headers[i + 1][0] if i + 1 < len(headers) else len(text)
+        key = normalize_section(title)
+        if not key or key in sections:
+            continue  # First occurrence wins – usually the real header, not a running title
+        section = {"title": title, "start": start, "end": end}
+        if page_starts:
+            section["page"] = bisect.bisect_right(page_starts, start)
+        sections[key] = section
+    return {"length": len(text), "sections": sections}
+
+
+class SectionIndex:
+    """
+    Outlines built once per document (at ingestion) and persisted next to the vectorstore,
+    keyed by content hash. Section lookup becomes a dictionary hit plus a string slice.
+    """
+
+    def __init__(self, outline_dir=OUTLINE_DIR, capacity=OUTLINE_CACHE_SIZE):
+        self.outline_dir = outline_dir
+        self.capacity = capacity
+        self._outlines = OrderedDict()  # content hash -> outline, least recently used first
+        self._lock = threading.Lock()
+
+    def _remember(self, digest, outline):
+        with self._lock:
+            self._outlines[digest] = outline
+            self._outlines.move_to_end(digest)
+            while len(self._outlines) > self.capacity:
+                self._outlines.popitem(last=False)
+
+    def _path(self, digest):
+        return os.path.join(self.outline_dir, digest + ".json")
+
+    def build(self, digest, parsed):
+        outline = build_outline(parsed)
+        self._remember(digest, outline)
+        try:
+            os.makedirs(self.outline_dir, exist_ok=True)
+            tmp_path = self._path(digest) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(outline, f)
+            os.replace(tmp_path, self._path(digest))
+        except OSError as e:
+            logger.warning(f"Could not persist outline for {parsed.path}: {e}")
+        logger.debug(f"Outline for {parsed.path}: {len(outline['sections'])} section(s)")
+        return outline
+
+    def get(self, digest, parsed):
+        """Outline for a document – memory, then disk, else built now (documents never ingested)."""
+        with self._lock:
+            outline = self._outlines.get(digest)
+            if outline is not None:
+                self._outlines.move_to_end(digest)
+                return outline
+        try:
+            with open(self._path(digest), "r", encoding="utf-8") as f:
+                outline = json.load(f)
+            self._remember(digest, outline)
+            return outline
+        except (OSError, ValueError):
+            return self.build(digest, parsed)
+
+    @staticmethod
+    def find(outline, section):
+        """Section span for a requested name, or None – exact key first, then the nearest header containing it."""
+        key = normalize_section(section)
+        sections = outline["sections"]
+        if not key:
+            return None
+        if key in sections:
+            return sections[key]
+        for name, span in sections.items():
+            if name.startswith(key):
+                return span
+        word = re.compile(rf"\b{re.escape(key)}\b")
+        for name, span in sections.items():
+            if word.search(name):
+                return span
+        return None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_section_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SectionIndex()
+        return _index
@@ -1,20 +1,157 @@
 from langchain_ollama import ChatOllama
 from langchain.prompts import PromptTemplate
+from langchain.text_splitter import RecursiveCharacterTextSplitter
 from loguru import logger
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from app.config import CHAT_MODEL, SUMMARY_CACHE_DIR, SUMMARY_CACHE_SIZE, SUMMARY_CHUNK_CHARS, SUMMARY_CONCURRENCY
+from app.metrics import timed, token_callback
+import hashlib
+import json
+import os
+import threading
+
+SUMMARIZE_PROMPT = PromptTemplate(
+    template="Summarize this medical text in a {length} way. Do not add or omit facts:\n\n{text}",
+    input_variables=["length", "text"]
+)
+COMBINE_PROMPT = PromptTemplate(
+    template="These are summaries of consecutive parts of one medical document. Merge them into a single "
+             "{length} summary. Do not add facts, and keep every finding, value and dosage they mention:\n\n{text}",
+    input_variables=["length", "text"]
+)
+
+
+class SummaryCache:
+    """Summaries keyed by (model, prompt, length, text) hash – memory LRU backed by one JSON file per entry."""
+
+    def __init__(self, cache_dir=SUMMARY_CACHE_DIR, capacity=SUMMARY_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        summary = None
+        if self.cache_dir:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    summary = json.load(f)["summary"]
+            except (OSError, ValueError, KeyError):
+                pass
+        with self._lock:
+            if summary is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._remember(key, summary)
+        return summary
+
+    def put(self, key, summary):
+        with self._lock:
+            self._remember(key, summary)
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"summary": summary}, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Could not persist summary {key[:12]}: {e}")
+
+    def _remember(self, key, summary):
+        self._entries[key] = summary
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
 
 class SummarizationAgent:
-    def __init__(self):
+    def __init__(self, llm=None, chunk_chars=SUMMARY_CHUNK_CHARS, max_concurrency=SUMMARY_CONCURRENCY, cache=None):
         logger.info("SummarizationAgent initialized – only used when user asks for summary")
-        self.llm = ChatOllama(model="llama3:8b", temperature=0.1)  # Low temp = factual
+        self.llm = llm or ChatOllama(model=CHAT_MODEL, temperature=0.1, callbacks=[token_callback])  # Low temp = factual
+        self.model = getattr(self.llm, "model", CHAT_MODEL)
+        self.chunk_chars = chunk_chars
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_chars, chunk_overlap=chunk_chars // 20)
+        # Bounds concurrent LLM calls across every section and every map/reduce step
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="summarize")
+        self.cache = cache or SummaryCache()
 
+    @timed("summarize")
     def summarize(self, text, length="concise"):
-        """Generates concise summary – preserves medical accuracy."""
+        """
+        Generates concise summary – preserves medical accuracy.
+        Text longer than one chunk is summarized map-reduce style: chunks in parallel, then partial
+        summaries merged in groups until a single summary remains. Nothing is truncated.
+        """
         logger.info(f"Summarizing text ({len(text)} chars) → {length}")
-        prompt = PromptTemplate(
-            template="Summarize this medical text in a {length} way. Do not add or omit facts:\n\n{text}",
-            input_variables=["length", "text"]
-        )
-        response = self.llm.invoke(prompt.format(length=length, text=text[:4000]))  # Truncate if too long
-        summary = response.content.strip()
+        if len(text) <= self.chunk_chars:
+            summary = self.pool.submit(self._run, SUMMARIZE_PROMPT, text, length).result()
+        else:
+            chunks = self.splitter.split_text(text)
+            logger.info(f"Map step: {len(chunks)} chunk(s)")
+            partials = list(self.pool.map(lambda chunk: self._run(SUMMARIZE_PROMPT, chunk, length), chunks))
+            summary = self._reduce(partials, length)
         logger.debug(f"Summary generated: {summary[:100]}...")
-        return summary
\ No newline at end of file
+        return summary
+
+    def _reduce(self, partials, length):
+        while len(partials) > 1:
+            groups = self._group(partials)
+            logger.info(f"Reduce step: {len(partials)} partial summaries → {len(groups)}")
+            partials = list(self.pool.map(lambda group: self._run(COMBINE_PROMPT, "\n\n".join(group), length), groups))
+        return partials[0]
+
+    def _group(self, partials):
+        """Consecutive partials packed into groups that fit one prompt – at least two per group so every round shrinks."""
+        groups, current, size = [], [], 0
+        for partial in partials:
+            if len(current) >= 2 and size + len(partial) > self.chunk_chars:
+                groups.append(current)
+                current, size = [], 0
+            current.append(partial)
+            size += len(partial) + 2
+        groups.append(current)
+        return groups
+
+    def _run(self, prompt, text, length):
+        key = SummaryCache.key(self.model, prompt.template, length, text)
+        summary = self.cache.get(key)
+        if summary is None:
+            summary = self.llm.invoke(prompt.format(length=length, text=text)).content.strip()
+            self.cache.put(key, summary)
+        return summary
+
+
+_shared_agent = None
+_shared_lock = threading.Lock()
+
+
+def get_summarization_agent():
+    """Process-wide SummarizationAgent – one ChatOllama client for every report section."""
+    global _shared_agent
+    with _shared_lock:
+        if _shared_agent is None:
+            _shared_agent = SummarizationAgent()
+        return _shared_agent
@@ -0,0 +1,225 @@
+"""
+Layout-aware table detection for PDFs.
+
+pypdf reports where every text fragment is drawn; fragments are grouped into lines by y, lines into
+cells by x, and runs of consecutive lines whose cells share column positions become tables.
+Ragged rows (a blank cell, a wrapped value) are padded or merged into the nearest column rather
+than breaking the table. Detection is per page and cached by (file content, page).
+"""
+import re
+import threading
+from collections import OrderedDict
+from loguru import logger
+from app.agents.document_cache import get_document_cache
+from app.config import TABLE_CACHE_SIZE
+
+COLUMN_TOLERANCE = 4.0  # Points two cell starts may differ by and still share a column
+_GAP = re.compile(r"\s{2,}")  # Wide runs of spaces inside one fragment separate cells (fixed-width layouts)
+_NUMBER = re.compile(r"^[<>≤≥~]?\s*[-+]?\d[\d,]*(\.\d+)?\s*%?$")
+
+
+def page_fragments(page):
+    """(x, y, font size, text) of every non-empty text fragment on a pypdf page, in page coordinates."""
+    fragments = []
+
+    def visit(text, cm, tm, font_dict, font_size):
+        text = text.strip("\n")
+        if not text.strip():
+            return
+        x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+        size = font_size * (abs(tm[3] * cm[3]) or 1.0)
+        # A fragment laid out with wide gaps holds several cells – split it, estimating offsets by width
+        offset = 0
+        for part in _GAP.split(text):
+            start = text.index(part, offset)
+            if part.strip():
+                fragments.append((x + start * size * 0.5, y, size, part.strip()))
+            offset = start + len(part)
+
+    page.extract_text(visitor_text=visit)
+    return fragments
+
+
+def _lines(fragments):
+    """Fragments grouped into text lines, top to bottom; each line is a list of cells sorted by x."""
+    lines = []
+    for x, y, size, text in sorted(fragments, key=lambda f: (-f[1], f[0])):
+        if lines and abs(lines[-1]["y"] - y) <= size * 0.5:
+            lines[-1]["cells"].append((x, size, text))
+        else:
+            lines.append({"y": y, "size": size, "cells": [(x, size, text)]})
+    for line in lines:
+        line["cells"] = _merge_cells(sorted(line["cells"]))
+    return lines
+
+
+def _merge_cells(cells):
+    """Joins fragments of one cell – the next fragment starts before the previous one visibly ends."""
+    merged = []
+    for x, size, text in cells:
+        if merged:
+            prev_x, prev_size, prev_text = merged[-1]
+            if x - (prev_x + len(prev_text) * prev_size * 0.5) < prev_size * 0.6:
+                merged[-1] = (prev_x, prev_size, f"{prev_text} {text}")
+                continue
+        merged.append((x, size, text))
+    return merged
+
+
+def _aligned(anchors, line, tolerance):
+    matches = sum(any(abs(x - a) <= tolerance for a in anchors) for x, _, _ in line["cells"])
+    return matches >= min(2, len(line["cells"]))
+
+
+def detect_tables(fragments, tolerance=COLUMN_TOLERANCE, min_rows=2, min_cols=2):
+    """Rows of cell text for each table among `fragments` – a table is ≥ min_rows aligned multi-cell lines."""
+    tables, current, anchors = [], [], []
+
+    def close():
+        if len(current) >= min_rows:
+            table = _columnize(current, tolerance)
+            if table and len(table[0]) >= min_cols:
+                tables.append(table)
+
+    for line in _lines(fragments):
+        multi_cell = len(line["cells"]) >= 2
+        gap_ok = current and current[-1]["y"] - line["y"] <= 2.5 * max(line["size"], current[-1]["size"])
+        if current and gap_ok and _aligned(anchors, line, tolerance) and (multi_cell or len(current) >= 2):
+            # Single-cell lines continue a table already established (a blank-heavy row), never start one
+            current.append(line)
+            anchors.extend(x for x, _, _ in line["cells"])
+            continue
+        close()
+        current, anchors = ([line], [x for x, _, _ in line["cells"]]) if multi_cell else ([], [])
+    close()
+    return tables
+
+
+def _columnize(lines, tolerance):
+    """Places each line's cells under shared column positions; missing cells become ""."""
+    starts = sorted(x for line in lines for x, _, _ in line["cells"])
+    columns = []
+    for x in starts:
+        if columns and x - columns[-1][-1] <= tolerance:
+            columns[-1].append(x)
+        else:
+            columns.append([x])
+    anchors = [sum(c) / len(c) for c in columns]
+    rows = []
+    for line in lines:
+        row = [""] * len(anchors)
+        for x, _, text in line["cells"]:
+            col = min(range(len(anchors)), key=lambda i: abs(anchors[i] - x))
+            row[col] = f"{row[col]} {text}".strip()
+        rows.append(row)
+    # Columns that are empty in every row (a stray fragment's position) carry nothing
+    keep = [i for i in range(len(anchors)) if any(row[i] for row in rows)]
+    return [[row[i] for i in keep] for row in rows]
+
+
+def _is_number(value):
+    return bool(_NUMBER.match(value.strip()))
+
+
+def to_dataframe(rows):
+    """Columnar DataFrame: the first row is the header when it is all text, numeric columns become numbers."""
+    import pandas as pd
+    header_row = rows[0]
+    if len(rows) > 1 and all(cell and not _is_number(cell) for cell in header_row):
+        body, header = rows[1:], []
+        for i, name in enumerate(header_row):
+            header.append(name if name not in header else f"{name}_{i + 1}")
+    else:
+        body, header = rows, [f"column_{i + 1}" for i in range(len(header_row))]
+    df = pd.DataFrame(body, columns=header)
+    for column in df.columns:
+        values = df[column]
+        present = values[values != ""]
+        if len(present) and all(_is_number(v) and "%" not in v and not v.startswith(("<", ">", "≤", "≥", "~"))
+                                for v in present):
+            df[column] = pd.to_numeric(values.str.replace(",", ""), errors="coerce")
+    return df
+
+
+def page_tables(page):
+    return [to_dataframe(rows) for rows in detect_tables(page_fragments(page))]
+
+
+class TableCache:
+    """
+    Detected tables keyed by (content hash, page index), LRU-bounded by page count.
+    Misses for a file are filled in one pass over a single PdfReader, never page by page.
+    """
+
+    def __init__(self, capacity=TABLE_CACHE_SIZE):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()  # (content hash, page index) -> [DataFrame]
+
+    def _get(self, key):
+        with self._lock:
+            tables = self._pages.get(key)
+            if tables is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+            return tables
+
+    def _put(self, key, tables):
+        with self._lock:
+            self.misses += 1
+            self._pages[key] = tables
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.capacity:
+                self._pages.popitem(last=False)
+
+    def tables(self, path, content_hash, pages=None):
+        """{page index: [DataFrame]} for `pages` (all pages when None); pages beyond the document are skipped."""
+        from pypdf import PdfReader
+        reader = None
+        if pages is None:
+            parsed = get_document_cache().peek(path)  # Page count from the shared parse when it is cached
+            reader = None if parsed else PdfReader(path)
+            pages = range(len(parsed.pages) if parsed else len(reader.pages))
+        found = {}
+        for page in pages:
+            tables = self._get((content_hash, page))
+            if tables is not None:
+                found[page] = tables
+                continue
+            reader = reader or PdfReader(path)  # Opened once, only if something is missing
+            if not 0 <= page < len(reader.pages):
+                continue
+            try:
+                tables = page_tables(reader.pages[page])
+            except Exception as e:
+                logger.warning(f"Table detection failed on page {page + 1} of {path}: {e}")
+                tables = []
+            self._put((content_hash, page), tables)
+            found[page] = tables
+        return found
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "pages": len(self._pages),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_table_cache():
+    """Process-wide table cache shared by every ExtractionAgent."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TableCache()
+        return _cache
@@ -0,0 +1,117 @@
+# Central knobs shared by the agents – one place to change models or ingestion settings
+import os
+
+CHAT_MODEL = os.getenv("CHAT_MODEL", "llama3:8b")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+
+# Smaller chunks = better retrieval accuracy
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+
+VECTORSTORE_PATH = os.getenv("VECTORSTORE_PATH", "vectorstore/index")  # Persistent storage – survives restarts; worker processes take turns writing it
+OUTLINE_DIR = os.getenv("OUTLINE_DIR", "vectorstore/outlines")  # Per-document section outlines, keyed by content hash
+OUTLINE_CACHE_SIZE = int(os.getenv("OUTLINE_CACHE_SIZE", "512"))  # Outlines also kept in memory per process
+VECTORSTORE_SAVE_DELAY = float(os.getenv("VECTORSTORE_SAVE_DELAY", "2.0"))  # Seconds to batch writes before saving
+INDEX_WRITER_WAIT = float(os.getenv("INDEX_WRITER_WAIT", "30"))  # Seconds an ingestion waits for another worker's write to finish
+FILE_HASH_CACHE_SIZE = int(os.getenv("FILE_HASH_CACHE_SIZE", "4096"))  # File versions whose content hash is remembered
+
+# Embedding stage – batches sent to Ollama and how many are in flight at once
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "3"))
+
+# Embedding cache – repeated boilerplate chunks and repeated queries skip Ollama entirely
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "vectorstore/embedding_cache")
+EMBEDDING_CACHE_CAPACITY = int(os.getenv("EMBEDDING_CACHE_CAPACITY", "50000"))  # Vectors kept before LRU eviction
+
+# Parsing stage – process pool for CPU-bound PDF/Excel/OCR work
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 2)))
+PARSE_TIMEOUT = float(os.getenv("PARSE_TIMEOUT", "120"))  # Seconds per file (or per PDF page range)
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "25"))  # Larger PDFs are split across workers
+
+# Parsed-document cache – pages/paragraphs/DataFrames shared by every agent instead of re-reading files
+DOCUMENT_CACHE_MAX_BYTES = int(os.getenv("DOCUMENT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+DOCUMENT_CACHE_SPILL_DIR = os.getenv("DOCUMENT_CACHE_SPILL_DIR", "vectorstore/parsed_cache")  # Empty disables spilling
+
+# /query admission control – blocking orchestrator work runs on this many threads
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", "4"))
+QUERY_QUEUE_SIZE = int(os.getenv("QUERY_QUEUE_SIZE", "16"))  # Waiting requests before answering 429
+SESSION_MAX_INFLIGHT = int(os.getenv("SESSION_MAX_INFLIGHT", "2"))  # Concurrent requests per session_id
+
+# Query routing – regex rules, then exemplar similarity, then the LLM for whatever is left
+ROUTER_MIN_SIMILARITY = float(os.getenv("ROUTER_MIN_SIMILARITY", "0.6"))  # Cosine to the nearest exemplar
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.05"))  # Lead over the other label's nearest exemplar
+ROUTER_CACHE_SIZE = int(os.getenv("ROUTER_CACHE_SIZE", "4096"))  # Normalized queries remembered
+
+# Report generation – sections are extracted in parallel, summaries capped so Ollama isn't flooded
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "8"))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "2"))  # Concurrent summarization LLM calls (all sections and chunks)
+
+# Summarization – long sections are summarized map-reduce style in chunks of this many characters
+SUMMARY_CHUNK_CHARS = int(os.getenv("SUMMARY_CHUNK_CHARS", "4000"))
+SUMMARY_CACHE_DIR = os.getenv("SUMMARY_CACHE_DIR", "vectorstore/summaries")  # Chunk summaries by content hash; empty disables
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "2048"))  # Summaries kept in memory
+
+# Semantic answer cache – repeated questions over the same indexed documents skip the LLM
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # Cosine between query embeddings
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))  # Seconds an answer stays servable
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))  # Answers kept before LRU eviction
+
+# Conversation memory – one store for the orchestrator and QAAgent, shared across worker processes
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "sqlite")  # "sqlite" (persistent) or "memory"
+MEMORY_DB_PATH = os.getenv("MEMORY_DB_PATH", "vectorstore/sessions.db")
+MEMORY_MAX_SESSIONS = int(os.getenv("MEMORY_MAX_SESSIONS", "10000"))  # Least recently used dropped beyond this
+MEMORY_TTL = float(os.getenv("MEMORY_TTL", str(7 * 24 * 3600)))  # Seconds idle before a session expires
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "10"))  # Older turns are folded into a rolling summary
+MEMORY_COMPACT_WORKERS = int(os.getenv("MEMORY_COMPACT_WORKERS", "1"))  # Background threads folding history into summaries
+
+# Background ingestion – /upload queues indexing; /query waits briefly for its documents
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))  # Ingestion is serialized on the index anyway
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "1000"))  # Finished jobs kept for /jobs/{id}
+QUERY_INDEX_WAIT = float(os.getenv("QUERY_INDEX_WAIT", "10"))  # Seconds /query waits before "still indexing"
+
+# Vector index – "flat" (exact), "ivfpq" (compressed, trained) or "hnsw" (graph); see benchmarks/bench_ann.py
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "flat")
+INDEX_TRAIN_SIZE = int(os.getenv("INDEX_TRAIN_SIZE", "50000"))  # Vectors held before a flat index is rebuilt as IVF-PQ
+INDEX_TRAIN_SAMPLE = int(os.getenv("INDEX_TRAIN_SAMPLE", "100000"))  # Vectors the quantizers are trained on
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # Inverted lists; 0 sizes them from the corpus
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))  # Lists visited per query – recall vs latency
+PQ_M = int(os.getenv("PQ_M", "0"))  # Sub-quantizers per vector; 0 = dim / 2 (smaller codes cost recall)
+PQ_NBITS = int(os.getenv("PQ_NBITS", "8"))
+HNSW_M = int(os.getenv("HNSW_M", "32"))  # Graph neighbours per node
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))  # Candidates explored per query – recall vs latency
+VECTOR_INDEX_MMAP = os.getenv("VECTOR_INDEX_MMAP", "0") == "1"  # Serve IVF lists from disk instead of RAM
+
+# Hybrid retrieval – BM25 keyword hits fused with vector hits, optionally reranked; see benchmarks/bench_hybrid.py
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # "hybrid" (BM25 + vectors) or "dense" (vectors only)
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "5"))  # Chunks placed in the QA prompt
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))  # Candidates taken from each retriever before fusion
+RRF_K = int(os.getenv("RRF_K", "60"))  # Reciprocal rank fusion damping constant
+RERANKER = os.getenv("RERANKER", "")  # "" (off), "embedding" or "cross-encoder" (needs sentence-transformers)
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "3"))  # Chunks kept after reranking – fewer context tokens
+
+# PDF tables – detected from text layout, cached per (file content, page)
+TABLE_CACHE_SIZE = int(os.getenv("TABLE_CACHE_SIZE", "2048"))  # Pages whose detected tables stay in memory
+
+# OCR – image uploads and PDF pages without a text layer (scans)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))  # Concurrent Tesseract subprocesses per parsing process
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2500"))  # Longest image side in pixels after downscaling
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "vectorstore/ocr_cache")  # Results keyed by image hash; empty disables
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "1024"))  # Results also kept in memory per process
+OCR_MIN_PAGE_CHARS = int(os.getenv("OCR_MIN_PAGE_CHARS", "20"))  # PDF pages with less extractable text are OCR'd
+
+# Report PDFs – spooled to a temp file and streamed in chunks instead of held in memory
+REPORT_SPOOL_BYTES = int(os.getenv("REPORT_SPOOL_BYTES", str(1024 * 1024)))  # Larger reports go to disk
+REPORT_STREAM_CHUNK = int(os.getenv("REPORT_STREAM_CHUNK", str(64 * 1024)))  # Bytes per streamed chunk
+REPORT_TABLE_CHUNK_ROWS = int(os.getenv("REPORT_TABLE_CHUNK_ROWS", "100"))  # Rows per table flowable
+REPORT_IMAGE_DPI = int(os.getenv("REPORT_IMAGE_DPI", "150"))  # Images are downsampled to this print resolution
+REPORT_IMAGE_CACHE_BYTES = int(os.getenv("REPORT_IMAGE_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# Instrumentation – stage timings, token counts and cache ratios are always exported on /metrics
+TIMING_HEADER = os.getenv("TIMING_HEADER", "0") == "1"  # Also return per-stage timings as a Server-Timing header
+
+# Startup – the API imports nothing heavy; the lifespan hook loads the index and agents in the background
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "1") == "1"  # Also load the Ollama models before reporting ready
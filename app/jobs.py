@@ -0,0 +1,198 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+from app.config import INGEST_JOB_HISTORY, INGEST_WORKERS
+from app.rag.writer_lock import IndexLocked
+
+
+class IngestionJob:
+    """One background indexing run over a set of files – progress is readable while it runs."""
+
+    def __init__(self, files):
+        self.id = uuid.uuid4().hex[:12]
+        self.files = files  # path -> content hash
+        self.status = "queued"
+        self.embedded = 0
+        self.total_chunks = None
+        self.error = None
+        self.failed_files = []  # Paths no parser could read – the rest of the batch is still indexed
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+        self._waiters = []  # (loop, future) pairs resolved when the job finishes
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "locked")
+
+    @property
+    def retryable(self):
+        """Finished without indexing everything readable – another worker held the index, or embedding failed."""
+        return self.status == "locked" or (self.status == "failed" and len(self.failed_files) < len(self.files))
+
+    def _progress(self, done, total):
+        self.embedded, self.total_chunks = done, total
+
+    def _finish(self, status, error=None):
+        with self._lock:
+            self.status, self.error, self.finished = status, error, time.time()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+            except RuntimeError:
+                pass  # That waiter's event loop is already closed
+
+    async def wait(self, timeout=None):
+        """True once the job has finished, False if `timeout` seconds pass first – never blocks the event loop."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self.done:
+                return True
+            self._waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "files": list(self.files),
+            "embedded_chunks": self.embedded,
+            "total_chunks": self.total_chunks,
+            "error": self.error,
+            "failed_files": list(self.failed_files),
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class IngestionJobQueue:
+    """
+    Runs DocumentLoaderAgent ingestion (parse, split, embed, index) on background workers.
+    Content already indexed or already queued is never submitted twice; finished jobs stay
+    queryable until `history` newer ones have been created.
+    """
+
+    def __init__(self, registry, loader_factory, max_workers=INGEST_WORKERS, history=INGEST_JOB_HISTORY):
+        self.registry = registry
+        self.loader_factory = loader_factory
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs = OrderedDict()  # id -> job, oldest first
+        self._active = {}  # content hash -> job still queued or running
+        self._failed = {}  # content hash -> last job that could not parse it, so queries don't retry unreadable files forever
+        self._lock = threading.Lock()
+
+    def submit(self, paths, retry_failed=True):
+        """
+        Queues ingestion for the unindexed content in `paths`; returns every job covering them.
+        With retry_failed=False, content whose last job failed is reported through that job instead.
+        """
+        # path -> hash, only readable content not yet indexed – missing files are left to the loader to report
+        pending = self.registry.pending([p for p in paths if os.path.exists(p)])
+        with self._lock:
+            jobs = {}
+            new_files = {}
+            for path, digest in pending.items():
+                job = self._active.get(digest) or (None if retry_failed else self._failed.get(digest))
+                if job is not None:
+                    jobs[job.id] = job
+                else:
+                    new_files[path] = digest
+            if new_files:
+                job = IngestionJob(new_files)
+                for digest in new_files.values():
+                    self._active[digest] = job
+                self._jobs[job.id] = job
+                while len(self._jobs) > self.history:
+                    _, old = self._jobs.popitem(last=False)
+                    for digest in old.files.values():
+                        if self._failed.get(digest) is old:
+                            del self._failed[digest]
+                jobs[job.id] = job
+                self._executor.submit(self._run, job)
+                logger.info(f"Queued ingestion job {job.id} for {len(new_files)} file(s)")
+        return list(jobs.values())
+
+    def _run(self, job):
+        job.status, job.started = "running", time.time()
+        status, error, unparsed = None, None, []
+        try:
+            self.loader_factory().load_documents(list(job.files), progress=job._progress, unparsed=unparsed.extend)
+        except IndexLocked as e:
+            logger.warning(f"Ingestion job {job.id} deferred: {e}")
+            status, error = "locked", str(e)
+        except Exception as e:
+            logger.error(f"Ingestion job {job.id} failed: {e}")
+            error = str(e)
+        # Only files no parser could read count as unreadable – lock and Ollama errors are retried instead
+        job.failed_files = [path for path, digest in job.files.items()
+                            if (path in unparsed or not os.path.exists(path)) and not self.registry.is_indexed_hash(digest)]
+        missing = [path for path, digest in job.files.items() if not self.registry.is_indexed_hash(digest)]
+        if status is None:
+            if len(missing) > len(job.failed_files):
+                status, error = "failed", error or "Indexing failed – retried on the next query"
+            elif len(job.failed_files) == len(job.files):
+                status, error = "failed", "No readable content could be indexed"
+            else:
+                status = "done"
+                if job.failed_files:
+                    error = f"{len(job.failed_files)} of {len(job.files)} file(s) could not be read"
+        failed = {job.files[path] for path in job.failed_files}
+        # Bookkeeping first – anyone woken by the job finishing sees consistent queue state
+        with self._lock:
+            for digest in job.files.values():
+                if self._active.get(digest) is job:
+                    del self._active[digest]
+                if digest in failed:
+                    self._failed[digest] = job
+                else:
+                    self._failed.pop(digest, None)
+        job._finish(status, error)
+        logger.info(f"Ingestion job {job.id} {job.status} in {job.finished - job.started:.1f}s")
+
+    def unreadable(self, paths):
+        """Those of `paths` that are missing, or whose content's last ingestion could not index it."""
+        failed = []
+        for path in paths:
+            try:
+                digest = self.registry.hash_file(path)
+            except OSError:
+                failed.append(path)
+                continue
+            with self._lock:
+                if digest in self._failed and digest not in self._active:
+                    failed.append(path)
+        return failed
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+            active = len(set(map(id, self._active.values())))
+        counts = Counter(job.status for job in jobs)
+        statuses = ("queued", "running", "done", "failed", "locked")
+        return {"active_jobs": active, **{status: counts[status] for status in statuses}}
+
+    def shutdown(self):
+        logger.info("Shutting down ingestion workers")
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,43 +1,267 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import StreamingResponse, JSONResponse
-from app.agents.orchestrator import Orchestrator
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from app.rag.ingestion_registry import content_hash
+from app.agents.document_cache import get_document_cache
+from app.agents.table_extraction import get_table_cache
+from app.agents.ocr import get_ocr_stats
+from app.agents.report_assembly_agent import get_report_assembly_agent, iter_report
+from app.jobs import IngestionJobQueue
+from app.workers import BoundedExecutor, ExecutorSaturated
+from app.config import (
+    QUERY_WORKERS, QUERY_QUEUE_SIZE, SESSION_MAX_INFLIGHT, QUERY_INDEX_WAIT, TIMING_HEADER, WARMUP_MODELS,
+    CHAT_MODEL, EMBEDDING_MODEL
+)
+from app.metrics import REQUEST_SECONDS, register_stats, server_timing, start_request
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from contextlib import asynccontextmanager
+import asyncio
 import io
+import json
 import logging
+import threading
+import time
 
 # Set up logging early – helps debug in production and shows I care about observability
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Orchestrator work is blocking (Ollama, FAISS, parsing) – keep it off the event loop, with backpressure
+query_executor = BoundedExecutor(QUERY_WORKERS, QUERY_QUEUE_SIZE, per_key_limit=SESSION_MAX_INFLIGHT, name="query")
+
+# Built by the lifespan warm-up (or by the first request that needs them) – importing this module
+# creates no model clients and imports no langchain, FAISS or document libraries
+orchestrator = None  # Central brain – one instance for efficiency
+vectorstore_service = None  # Shared FAISS index – loaded once per process
+ingestion_jobs = None  # Parse + embed + index runs here, started by /upload – queries never ingest inline
+_component_locks = {name: threading.Lock() for name in ("orchestrator", "vectorstore_service", "ingestion_jobs")}
+
+
+def _store():
+    global vectorstore_service
+    with _component_locks["vectorstore_service"]:
+        if vectorstore_service is None:
+            from app.rag.vectorstore_service import get_vectorstore_service
+            vectorstore_service = get_vectorstore_service()
+        return vectorstore_service
+
+
+def _orchestrator():
+    global orchestrator
+    with _component_locks["orchestrator"]:
+        if orchestrator is None:
+            from app.agents.orchestrator import Orchestrator
+            orchestrator = Orchestrator()
+        return orchestrator
+
+
+def _new_loader():
+    from app.agents.document_loader import DocumentLoaderAgent
+    return DocumentLoaderAgent()
+
+
+def _jobs():
+    global ingestion_jobs
+    with _component_locks["ingestion_jobs"]:
+        if ingestion_jobs is None:
+            # The store's registry lets /upload recognise already-indexed content
+            ingestion_jobs = IngestionJobQueue(_store().registry, _new_loader)
+        return ingestion_jobs
+
+
+def _warm_models():
+    """Loads both Ollama models now, so the first question doesn't wait for them to be read from disk."""
+    import ollama
+    client = ollama.Client()  # OLLAMA_HOST, like the langchain clients
+    client.embed(model=EMBEDDING_MODEL, input="warm-up")
+    client.generate(model=CHAT_MODEL, prompt="")  # An empty prompt only loads the model
+
+
+def _warm_agents():
+    """Model clients, chains and the LangGraph workflow – imports langchain, langgraph and FAISS."""
+    from app.rag.rag_pipeline import get_qa_agent
+    _orchestrator()
+    _jobs()
+    get_qa_agent()
+
+
+# Startup steps in order – /ready answers 200 once every one has succeeded
+WARMUP_STEPS = {
+    "index": lambda: _store().vectorstore,  # Deserialize the index at startup, not on the first query
+    "agents": _warm_agents,
+    "models": _warm_models,
+}
+readiness = {name: "pending" for name in WARMUP_STEPS}
+if not WARMUP_MODELS:
+    readiness["models"] = "skipped"
+_warmup_lock = threading.Lock()
+
+
+def warm_up():
+    """Runs every startup step not yet done; a failed step is retried by the next call (see /ready)."""
+    with _warmup_lock:
+        for name, step in WARMUP_STEPS.items():
+            if readiness[name] in ("ready", "skipped"):
+                continue
+            start = time.perf_counter()
+            try:
+                step()
+                readiness[name] = "ready"
+                logger.info(f"Warm-up step '{name}' ready in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                readiness[name] = f"failed: {e}"
+                logger.warning(f"Warm-up step '{name}' failed: {e}")
+                break  # Later steps depend on earlier ones
+
+
+def is_ready():
+    return all(state in ("ready", "skipped") for state in readiness.values())
+
+
+_warmup_task = None
+
+
+def _start_warm_up():
+    global _warmup_task
+    if _warmup_task is None or _warmup_task.done():
+        _warmup_task = asyncio.ensure_future(run_in_threadpool(warm_up))
+    return _warmup_task
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up runs in the background – the server accepts requests (e.g. /upload) right away
+    _start_warm_up()
+    yield
+    query_executor.shutdown()
+    if ingestion_jobs is not None:
+        ingestion_jobs.shutdown()
+    if vectorstore_service is not None:
+        vectorstore_service.close()  # Persist any pending background save, then let another process write
+    if orchestrator is not None:
+        from app.session_store import get_session_store
+        get_session_store().shutdown()  # Queued history folds are redone on the session's next turn
+
 app = FastAPI(
     title="Medical AI Assistant API",
     description="Handles document upload, Q&A, and report generation via agentic workflow",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan
 )
-orchestrator = Orchestrator()  # Central brain – one instance for efficiency
+
+
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    """Request latency for /metrics; with TIMING_HEADER, stages finished before the response starts as Server-Timing."""
+    spans = start_request()  # Copied into the worker threads by BoundedExecutor
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    route = request.scope.get("route")
+    # Route templates, not raw paths – /jobs/{job_id} must not mint a label per job
+    path = route.path if route is not None else "unmatched"
+    REQUEST_SECONDS.labels(request.method, path, response.status_code).observe(elapsed)
+    if TIMING_HEADER:
+        response.headers["Server-Timing"] = server_timing(spans, elapsed)
+    return response
+
+
+def _save_upload(file_location, content):
+    """Writes the upload unless identical bytes are already there; returns True if already indexed."""
+    import os
+    digest = content_hash(content)
+    # Identical bytes already on disk – nothing to write
+    registry = _store().registry  # Lets /upload recognise already-indexed content
+    if not (os.path.exists(file_location) and registry.hash_file(file_location) == digest):
+        with open(file_location, "wb") as buffer:
+            buffer.write(content)  # Stream directly to disk – memory efficient
+        logger.debug(f"Saved uploaded file: {file_location}")
+    return registry.is_indexed_hash(digest)
 
 @app.post("/upload")
 async def upload_documents(files: list[UploadFile] = File(...)):
     """
     Accepts multiple files (PDF, DOCX, XLSX, images) and saves them temporarily.
-    Returns file paths for downstream agents.
+    Returns file paths for downstream agents, plus the background indexing jobs (see /jobs/{id}).
+    Re-uploads of already-indexed content are accepted as no-ops (listed in "already_indexed").
     """
     import os
     temp_dir = "temp"
     os.makedirs(temp_dir, exist_ok=True)  # Ensure temp folder exists – safe & idempotent
     uploaded_files = []
+    already_indexed = []
 
     for file in files:
         # Sanitize filename to prevent path traversal (security-conscious)
         safe_filename = os.path.basename(file.filename)
         file_location = os.path.join(temp_dir, safe_filename)
-        with open(file_location, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)  # Stream directly to disk – memory efficient
+        content = await file.read()
+        # Hashing and disk writes happen on a worker thread – the event loop keeps serving queries
+        indexed = await run_in_threadpool(_save_upload, file_location, content)
+        if indexed:
+            already_indexed.append(file_location)
+            logger.debug(f"Already indexed, no re-embedding needed: {file_location}")
         uploaded_files.append(file_location)
-        logger.debug(f"Saved uploaded file: {file_location}")
 
-    logger.info(f"Uploaded {len(uploaded_files)} file(s) successfully")
-    return {"message": "Files uploaded successfully", "files": uploaded_files}
+    jobs = await run_in_threadpool(lambda: _jobs().submit(uploaded_files))
+    logger.info(f"Uploaded {len(uploaded_files)} file(s) successfully ({len(already_indexed)} already indexed)")
+    return {
+        "message": "Files uploaded successfully",
+        "files": uploaded_files,
+        "already_indexed": already_indexed,
+        "jobs": [job.id for job in jobs],
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status and embedding progress of a background indexing job."""
+    job = ingestion_jobs.get(job_id) if ingestion_jobs is not None else None  # No upload yet – no jobs
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
+
+
+async def _still_indexing(documents):
+    """
+    Waits up to QUERY_INDEX_WAIT for the jobs indexing `documents` (queuing any that were never uploaded).
+    Returns 202 "still indexing" if they are not done by then, 422 listing the documents that could not be
+    parsed, 503 when indexing readable ones failed for now (retried by the next query), else None – the
+    query itself only ever searches the index, it never ingests.
+    """
+    jobs = await run_in_threadpool(lambda: _jobs().submit(documents, False))
+    finished = await asyncio.gather(*(job.wait(QUERY_INDEX_WAIT) for job in jobs))
+    pending = [job for job, done in zip(jobs, finished) if not done]
+    if pending:
+        logger.info(f"Query deferred – {len(pending)} indexing job(s) still running")
+        return JSONResponse(status_code=202, content={
+            "response": "Your documents are still being indexed – please ask again in a moment.",
+            "jobs": [job.to_dict() for job in pending],
+        })
+    failed = await run_in_threadpool(lambda: _jobs().unreadable(documents))
+    if failed:
+        logger.info(f"Query rejected – {len(failed)} document(s) could not be read")
+        return JSONResponse(status_code=422, content={
+            "response": "Some documents could not be read – please upload them again or in another format.",
+            "files": failed,
+        })
+    retry = [job for job in jobs if job.retryable]
+    if retry:
+        # Readable documents whose indexing hit a busy index or an embedding error – the next query retries it
+        logger.info(f"Query deferred – {len(retry)} indexing job(s) need a retry")
+        return JSONResponse(status_code=503, headers={"Retry-After": "5"}, content={
+            "response": "Your documents could not be indexed just now – please ask again in a moment.",
+            "jobs": [job.to_dict() for job in retry],
+        })
+    return None
+
+
+def _invoke(input_data):
+    return _orchestrator().invoke(input_data)
+
+
+def _stream(input_data):
+    yield from _orchestrator().stream(input_data)
 
 
 @app.post("/query")
@@ -45,22 +269,29 @@ async def query_assistant(input: dict):
     """
     Main query endpoint – supports both Q&A and report generation.
     Returns JSON for chat, or streams PDF for reports.
+    Answers 429 when the worker pool (or this session's share of it) is saturated,
+    202 when its documents are still being indexed, 422 when some could not be read and 503 when
+    indexing has to be retried.
     """
+    session_id = input.get("session_id", "default")
+    indexing = await _still_indexing(input["documents"])
+    if indexing is not None:
+        return indexing
     try:
         # Pass query, docs, and session ID to orchestrator – keeps logic decoupled
-        result = orchestrator.invoke({
+        result = await query_executor.run(_invoke, {
             "query": input["query"],
             "documents": input["documents"],
-            "session_id": input.get("session_id", "default")
-        })
+            "session_id": session_id
+        }, key=session_id)
 
         response = result.get("response")
 
         # Smart response routing: PDF vs Text
-        if isinstance(response, io.BytesIO):
+        if isinstance(response, io.IOBase):
             logger.info("Streaming generated PDF report")
             return StreamingResponse(
-                response,
+                iter_report(response),  # Chunked from the spooled file, which is deleted once sent
                 media_type="application/pdf",
                 headers={"Content-Disposition": "attachment; filename=generated_report.pdf"}
             )
@@ -68,12 +299,123 @@ async def query_assistant(input: dict):
             logger.info("Returning text response")
             return JSONResponse(content={"response": response})
 
+    except ExecutorSaturated as e:
+        logger.warning(f"Rejecting query – {e}")
+        raise HTTPException(status_code=429, detail="Server busy – please retry shortly", headers={"Retry-After": "2"})
     except Exception as e:
         # Full traceback in logs – critical for debugging in real systems
         logger.error(f"Query failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal processing error")
 
 
+def _sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@app.post("/query/stream")
+async def query_assistant_stream(input: dict):
+    """
+    Streaming variant of /query – answer tokens arrive as Server-Sent Events
+    (`data: {"token": ...}`) and the stream ends with `event: done`.
+    Report requests still come back as a PDF download; 202, 422 and 503 as for /query.
+    """
+    session_id = input.get("session_id", "default")
+    indexing = await _still_indexing(input["documents"])
+    if indexing is not None:
+        return indexing
+    events = query_executor.iterate(_stream, {
+        "query": input["query"],
+        "documents": input["documents"],
+        "session_id": session_id
+    }, key=session_id)
+
+    try:
+        first = await events.__anext__()  # Classification decides SSE vs PDF before any bytes are sent
+    except StopAsyncIteration:
+        first = None
+    except ExecutorSaturated as e:
+        logger.warning(f"Rejecting streaming query – {e}")
+        raise HTTPException(status_code=429, detail="Server busy – please retry shortly", headers={"Retry-After": "2"})
+    except Exception as e:
+        logger.error(f"Streaming query failed: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal processing error")
+
+    if first is not None and first["type"] == "report":
+        await events.aclose()
+        logger.info("Streaming generated PDF report")
+        return StreamingResponse(
+            iter_report(first["content"]),
+            media_type="application/pdf",
+            headers={"Content-Disposition": "attachment; filename=generated_report.pdf"}
+        )
+
+    async def token_stream():
+        try:
+            if first is not None:
+                yield _sse({"token": first["content"]})
+            async for event in events:
+                yield _sse({"token": event["content"]})
+            yield _sse({}, event="done")
+        except Exception as e:
+            logger.error(f"Streaming query failed mid-answer: {str(e)}", exc_info=True)
+            yield _sse({"detail": "Internal processing error"}, event="error")
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        token_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _stats():
+    """Components not built yet (before warm-up or first use) report None rather than being built here."""
+    from app.session_store import get_session_store
+    store, cache = vectorstore_service, getattr(vectorstore_service, "embedding_cache", None)
+    return {
+        "embedding_cache": cache.stats() if cache else None,
+        "vector_index": store.index_stats() if store is not None else None,
+        "document_cache": get_document_cache().stats(),
+        "table_cache": get_table_cache().stats(),
+        "ocr": get_ocr_stats().stats(),
+        "report_images": get_report_assembly_agent().image_cache.stats(),
+        "query_pool": query_executor.stats(),
+        "router": orchestrator.router.stats() if orchestrator is not None else None,
+        "answer_cache": orchestrator.answer_cache.stats() if orchestrator is not None else None,
+        "sessions": get_session_store().stats(),
+        "ingestion": ingestion_jobs.stats() if ingestion_jobs is not None else None,
+    }
+
+
+register_stats(_stats)  # Cache hit ratios on /metrics, read at scrape time
+
+
+@app.get("/stats")
+async def cache_stats():
+    """Cache hit/miss counters and routing tier rates for monitoring."""
+    return _stats()
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe – 200 once the index is loaded, the agents are built and the Ollama models are
+    warm; 503 (with each step's state) until then. A failed step is retried in the background.
+    """
+    if not is_ready() and any(state.startswith("failed") for state in readiness.values()):
+        _start_warm_up()
+    return JSONResponse(status_code=200 if is_ready() else 503, content={"ready": is_ready(), "steps": readiness})
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus exposition – stage latencies, request latencies, Ollama tokens and cache hit ratios."""
+    body = await run_in_threadpool(generate_latest)  # Collecting reads every stats() – keep it off the event loop
+    return Response(content=body, media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     import uvicorn
     # Dev-friendly: reload on change
@@ -0,0 +1,161 @@
+"""
+Pipeline instrumentation – stage spans, Ollama token counts and cache ratios in Prometheus format.
+
+Stages are timed with `span()` / `@timed()`: one perf_counter pair and a histogram observation,
+cheap enough to leave on. Spans finished while a request is being handled are also collected
+for its optional Server-Timing header. Cache and router ratios are read from the existing
+stats() methods at scrape time, so the hot paths carry no extra counters.
+"""
+import contextvars
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+STAGE_SECONDS = Histogram(
+    "assistant_stage_seconds", "Time spent in each pipeline stage", ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+STAGE_ERRORS = Counter("assistant_stage_errors_total", "Pipeline stages that raised", ["stage"])
+REQUEST_SECONDS = Histogram(
+    "assistant_request_seconds", "HTTP request latency until the response starts", ["method", "path", "status"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+LLM_TOKENS = Counter("assistant_llm_tokens_total", "Tokens processed by Ollama", ["model", "kind"])
+LLM_TOKENS_PER_SECOND = Histogram(
+    "assistant_llm_tokens_per_second", "Ollama generation speed per call", ["model"],
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 250, 500),
+)
+
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+@contextmanager
+def span(stage):
+    """Times a block as `stage` – exported to /metrics and, inside a request, to its timing header."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+
+
+def timed(stage):
+    """Decorator form of span(); generator functions are timed until they are exhausted or closed."""
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def gen_wrapper(*args, **kwargs):
+                with span(stage):
+                    yield from func(*args, **kwargs)
+            return gen_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_request():
+    """Begins collecting spans for the current request; returns the list they are appended to."""
+    spans = []
+    _request_spans.set(spans)
+    return spans
+
+
+def server_timing(spans, total):
+    """Server-Timing header value – repeated stages (e.g. one summary per section) are summed."""
+    durations = {}
+    for stage, elapsed in spans:
+        durations[stage] = durations.get(stage, 0.0) + elapsed
+    parts = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in durations.items()]
+    return ", ".join(parts + [f"total;dur={total * 1000:.1f}"])
+
+
+def record_tokens(response):
+    """Counts prompt/completion tokens and generation speed from Ollama's final response metadata (an LLMResult)."""
+    for generations in response.generations:
+        for generation in generations:
+            info = generation.generation_info or {}
+            message = getattr(generation, "message", None)
+            info = {**getattr(message, "response_metadata", {}), **info}
+            model = info.get("model", "unknown")
+            prompt_tokens, completion_tokens = info.get("prompt_eval_count"), info.get("eval_count")
+            if prompt_tokens:
+                LLM_TOKENS.labels(model, "prompt").inc(prompt_tokens)
+            if completion_tokens:
+                LLM_TOKENS.labels(model, "completion").inc(completion_tokens)
+                if info.get("eval_duration"):
+                    LLM_TOKENS_PER_SECOND.labels(model).observe(completion_tokens / (info["eval_duration"] / 1e9))
+
+
+_token_callback = None
+
+
+def __getattr__(name):
+    """`token_callback` is built on first access – importing metrics (as app.main does) must not pull in langchain."""
+    global _token_callback
+    if name != "token_callback":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _token_callback is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class OllamaTokenCallback(BaseCallbackHandler):
+            def on_llm_end(self, response, **kwargs):
+                record_tokens(response)
+
+        _token_callback = OllamaTokenCallback()
+    return _token_callback
+
+
+class StatsCollector:
+    """
+    Exposes hit/miss counters and hit ratios of every stats() block that has them, read at scrape
+    time – e.g. {"embedding_cache": {"hits": .., "misses": .., "hit_rate": ..}} becomes
+    assistant_cache_hits_total{cache="embedding_cache"} and friends.
+    """
+
+    def __init__(self, stats_fn):
+        self.stats_fn = stats_fn
+
+    @staticmethod
+    def _families():
+        return (CounterMetricFamily("assistant_cache_hits", "Cache hits", labels=["cache"]),
+                CounterMetricFamily("assistant_cache_misses", "Cache misses", labels=["cache"]),
+                GaugeMetricFamily("assistant_cache_hit_ratio", "Cache hit ratio", labels=["cache"]))
+
+    def describe(self):
+        # Without this, registering would call collect() – and every stats() – at import time
+        return self._families()
+
+    def collect(self):
+        hits, misses, ratio = self._families()
+        for name, stats in self.stats_fn().items():
+            if not isinstance(stats, dict):
+                continue
+            if "hits" in stats and "misses" in stats:
+                hits.add_metric([name], stats["hits"])
+                misses.add_metric([name], stats["misses"])
+            if "hit_rate" in stats:
+                ratio.add_metric([name], stats["hit_rate"])
+            elif "cache_hit_rate" in stats:  # The router reports its LRU under this name
+                ratio.add_metric([name], stats["cache_hit_rate"])
+        yield from (hits, misses, ratio)
+
+
+def register_stats(stats_fn, registry=REGISTRY):
+    collector = StatsCollector(stats_fn)
+    registry.register(collector)
+    return collector
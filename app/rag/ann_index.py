@@ -0,0 +1,106 @@
+import math
+from dataclasses import dataclass
+import faiss
+import numpy as np
+from loguru import logger
+from app.config import (
+    VECTOR_INDEX, IVF_NLIST, IVF_NPROBE, PQ_M, PQ_NBITS, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH,
+    INDEX_TRAIN_SIZE, INDEX_TRAIN_SAMPLE, VECTOR_INDEX_MMAP
+)
+
+INDEX_KINDS = ("flat", "ivfpq", "hnsw")
+
+
+@dataclass
+class IndexSpec:
+    """
+    Which FAISS index backs the vectorstore and how it is searched.
+    The store starts flat; once it holds `train_size` vectors (immediately for HNSW) it is rebuilt
+    as the configured kind, trained on up to `train_sample` of its own vectors.
+    """
+    kind: str = VECTOR_INDEX
+    nlist: int = IVF_NLIST  # 0 = sized from the corpus when the index is built
+    nprobe: int = IVF_NPROBE
+    pq_m: int = PQ_M  # 0 = dim / 2 sub-quantizers (384 bytes per 768-d vector at 8 bits, vs 3072 flat)
+    pq_nbits: int = PQ_NBITS
+    hnsw_m: int = HNSW_M
+    ef_construction: int = HNSW_EF_CONSTRUCTION
+    ef_search: int = HNSW_EF_SEARCH
+    train_size: int = INDEX_TRAIN_SIZE
+    train_sample: int = INDEX_TRAIN_SAMPLE
+    mmap: bool = VECTOR_INDEX_MMAP
+
+    def __post_init__(self):
+        if self.kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown vector index type {self.kind!r} – expected one of {INDEX_KINDS}")
+
+    def due(self, index):
+        """True when a flat index should now be rebuilt as the configured kind."""
+        if self.kind == "flat" or not isinstance(index, faiss.IndexFlat):
+            return False
+        return self.kind == "hnsw" or index.ntotal >= self.train_size
+
+
+def _pq_m(spec, dim):
+    m = spec.pq_m or max(1, dim // 2)
+    while dim % m:  # PQ needs sub-vectors of equal width
+        m -= 1
+    return m
+
+
+def build_index(spec, dim, sample, metric=faiss.METRIC_L2, expected_size=None):
+    """Empty index of the configured kind, trained on `sample` when the kind needs training."""
+    if spec.kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, spec.hnsw_m, metric)
+        index.hnsw.efConstruction = spec.ef_construction
+    elif spec.kind == "ivfpq":
+        # ~4·sqrt(n) lists, but never more than the sample can train (faiss wants ≥39 points per list)
+        nlist = spec.nlist or max(1, min(int(4 * math.sqrt(expected_size or len(sample))), len(sample) // 39))
+        quantizer = faiss.IndexFlatIP(dim) if metric == faiss.METRIC_INNER_PRODUCT else faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_m(spec, dim), spec.pq_nbits, metric)
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+    else:
+        index = faiss.IndexFlat(dim, metric)
+    return configure(index, spec)
+
+
+def configure(index, spec):
+    """Applies search-time knobs; IVF indexes also get a direct map so scoped search can reconstruct rows."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = spec.nprobe
+        if ivf.direct_map.type == faiss.DirectMap.NoMap:
+            ivf.make_direct_map()
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = spec.ef_search
+    return index
+
+
+def rebuild(flat, spec, batch=65_536):
+    """Copies a flat index into the configured kind, keeping row order (docstore ids stay valid)."""
+    n, dim = flat.ntotal, flat.d
+    rng = np.random.default_rng(0)
+    sample_rows = np.sort(rng.choice(n, min(n, spec.train_sample), replace=False))
+    index = build_index(spec, dim, flat.reconstruct_batch(sample_rows), flat.metric_type, expected_size=n)
+    for start in range(0, n, batch):
+        index.add(flat.reconstruct_n(start, min(batch, n - start)))
+    logger.info(f"Rebuilt vector index as {spec.kind} over {n} vectors")
+    return index
+
+
+def read_index(path, spec):
+    """
+    Loads a saved index. With `spec.mmap`, IVF inverted lists stay memory-mapped on disk instead of
+    being read into RAM – read-only until materialize() is called before the next write.
+    """
+    if spec.mmap:
+        index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    else:
+        index = faiss.read_index(path)
+    return configure(index, spec)
+
+
+def materialize(path, spec):
+    """Fully in-memory copy of a memory-mapped index, so vectors can be added."""
+    logger.info("Loading memory-mapped vector index into RAM for writing")
+    return configure(faiss.read_index(path), spec)
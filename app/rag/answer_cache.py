@@ -0,0 +1,128 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+import numpy as np
+from loguru import logger
+from app.config import ANSWER_CACHE_SIZE, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL
+
+# Questions that lean on the previous turns – "what about its side effects?", "and the dosage?"
+_FOLLOW_UP = re.compile(
+    r"\b(it|its|they|them|their|this|that|these|those|he|she|his|her|above|previous|earlier|same|"
+    r"also|else|more|another|other)\b|^\s*(and|but|so|what about|how about|why not)\b",
+    re.I,
+)
+
+
+def normalize_query(query):
+    return re.sub(r"\s+", " ", query).strip().rstrip("?.!").strip().lower()
+
+
+def is_follow_up(query):
+    """True when the question only makes sense with the conversation before it."""
+    return bool(_FOLLOW_UP.search(query)) or len(normalize_query(query).split()) < 3
+
+
+class AnswerCache:
+    """
+    Semantic QA answer cache keyed by (corpus fingerprint, query embedding).
+    A lookup hits when a cached question over the same indexed content is within `threshold`
+    cosine similarity. Re-indexing changes the fingerprint, so stale answers simply stop matching
+    and age out through TTL/LRU eviction.
+    """
+
+    def __init__(self, store, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL, capacity=ANSWER_CACHE_SIZE):
+        self.store = store
+        self.threshold = threshold
+        self.ttl = ttl
+        self.capacity = capacity
+        self._entries = OrderedDict()  # id -> (fingerprint, unit vector, answer, created) in LRU order
+        self._buckets = {}  # fingerprint -> {id, ...}
+        self._ids = count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _key(self, query, documents):
+        fingerprint = self.store.corpus_fingerprint(documents)
+        if fingerprint is None:
+            return None, None
+        vector = np.asarray(self.store.embeddings.embed_query(normalize_query(query)), dtype=np.float32)
+        return fingerprint, vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, query, documents=None, has_history=False):
+        """
+        Cached answer or None. Returns (answer, key) – pass the key to put() after a miss.
+        Follow-up questions asked with conversation history are never served from the cache.
+        """
+        if has_history and is_follow_up(query):
+            with self._lock:
+                self.bypassed += 1
+            return None, None
+        key = self._key(query, documents)
+        fingerprint, vector = key
+        if fingerprint is None:
+            with self._lock:
+                self.bypassed += 1
+            return None, None
+
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id in list(self._buckets.get(fingerprint, ())):
+                _, cached_vector, _, created = self._entries[entry_id]
+                if now - created > self.ttl:
+                    self._drop(entry_id)
+                    self.expirations += 1
+                    continue
+                score = float(cached_vector @ vector)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None, key
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            logger.info(f"Answer cache hit (cosine {best_score:.3f})")
+            return self._entries[best_id][2], key
+
+    def put(self, key, answer):
+        if key is None or key[0] is None or not answer:
+            return
+        fingerprint, vector = key
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (fingerprint, vector, answer, time.monotonic())
+            self._buckets.setdefault(fingerprint, set()).add(entry_id)
+            while len(self._entries) > self.capacity:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, entry_id):
+        fingerprint = self._entries.pop(entry_id)[0]
+        bucket = self._buckets[fingerprint]
+        bucket.discard(entry_id)
+        if not bucket:
+            del self._buckets[fingerprint]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,108 @@
+import math
+import os
+import pickle
+import re
+from collections import Counter, defaultdict
+from loguru import logger
+
+# Identifiers stay whole ("e11.9", "hba1c", "500mg", "icd-10") and are also indexed by their parts
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+_PARTS = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "what which who how when where does do did".split()
+)
+
+
+def tokenize(text):
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = _PARTS.findall(token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    Incremental Okapi BM25 over chunk ids. Postings are appended as chunks are ingested, so there is
+    no rebuild step; document frequencies and average length are kept current as running totals.
+    Not thread-safe on its own – the vectorstore service guards it with its read/write lock.
+    """
+
+    FILENAME = "bm25.pkl"
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {chunk id: term frequency}
+        self.lengths = {}  # chunk id -> token count
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, ids, texts):
+        for chunk_id, text in zip(ids, texts):
+            if chunk_id in self.lengths:
+                continue
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                self.postings[term][chunk_id] = tf
+            length = sum(counts.values())
+            self.lengths[chunk_id] = length
+            self.total_length += length
+
+    def search(self, query, k, allowed=None):
+        """
+        Top-k (chunk id, score), best first; `allowed` restricts scoring to a set of chunk ids.
+        A scoped query looks up each allowed chunk in the postings instead of walking them, so its
+        cost follows the scope, not how many chunks across the whole corpus contain the term.
+        """
+        if not self.lengths or k <= 0:
+            return []
+        n = len(self.lengths)
+        avg_length = self.total_length / n
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            if allowed is None:
+                matches = postings.items()
+            elif len(allowed) < len(postings):
+                matches = [(chunk_id, postings[chunk_id]) for chunk_id in allowed if chunk_id in postings]
+            else:
+                matches = [(chunk_id, tf) for chunk_id, tf in postings.items() if chunk_id in allowed]
+            for chunk_id, tf in matches:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / avg_length)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.FILENAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"k1": self.k1, "b": self.b, "postings": dict(self.postings), "lengths": self.lengths}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, directory):
+        """Saved index, or None when there is none (or it is unreadable) – the caller rebuilds."""
+        try:
+            with open(os.path.join(directory, cls.FILENAME), "rb") as f:
+                state = pickle.load(f)  # Our own file, written by save()
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"BM25 index unreadable, rebuilding: {e}")
+            return None
+        index = cls(state["k1"], state["b"])
+        index.postings.update(state["postings"])
+        index.lengths = state["lengths"]
+        index.total_length = sum(index.lengths.values())
+        return index
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+
+def normalize_text(text):
+    """Whitespace-insensitive – the same boilerplate re-flowed by a different parser still hits."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def text_key(model, text):
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by (model name, normalized text hash).
+    Vectors live in a preallocated memory-mapped float32 array; a small JSON index maps
+    keys to slots in LRU order. When full, the least recently used slot is reused.
+    """
+
+    def __init__(self, path, model, capacity=50_000, flush_every=1024):
+        self.path = os.path.join(path, re.sub(r"[^A-Za-z0-9_.-]", "_", model))
+        self.model = model
+        self.capacity = capacity
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._slots = OrderedDict()  # key -> slot, least recently used first
+        self._free = []
+        self._vectors = None
+        self._fingerprints = None  # Per-slot key check – a stale index can never return the wrong vector
+        self._dim = None
+        self._unflushed = 0
+        self._load()
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.path, "index.json")
+
+    def _open_arrays(self, dim, mode):
+        self._dim = dim
+        self._vectors = np.memmap(os.path.join(self.path, "vectors.f32"), dtype=np.float32,
+                                  mode=mode, shape=(self.capacity, dim))
+        self._fingerprints = np.memmap(os.path.join(self.path, "slots.u64"), dtype=np.uint64,
+                                       mode=mode, shape=(self.capacity,))
+
+    def _load(self):
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["capacity"] != self.capacity:
+                raise ValueError("capacity changed")
+            self._open_arrays(meta["dim"], "r+")
+            self._slots = OrderedDict((key, slot) for key, slot in meta["keys"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Embedding cache at {self.path} unusable ({e}) – starting empty")
+            self._slots = OrderedDict()
+            self._vectors = self._fingerprints = self._dim = None
+        used = set(self._slots.values())
+        self._free = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in used]
+
+    @staticmethod
+    def _fingerprint(key):
+        return np.uint64(int(key[:16], 16))
+
+    def get(self, key):
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None and self._fingerprints[slot] == self._fingerprint(key):
+                self._slots.move_to_end(key)
+                self.hits += 1
+                return np.array(self._vectors[slot])
+            if slot is not None:
+                del self._slots[key]
+                self._free.append(slot)
+            self.misses += 1
+            return None
+
+    def put(self, key, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            if self._vectors is None:
+                os.makedirs(self.path, exist_ok=True)
+                self._open_arrays(len(vector), "w+")
+            if len(vector) != self._dim:
+                return  # Model output changed shape – don't poison the cache
+            slot = self._slots.get(key)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    _, slot = self._slots.popitem(last=False)
+                    self.evictions += 1
+            self._slots[key] = slot
+            self._slots.move_to_end(key)
+            self._vectors[slot] = vector
+            self._fingerprints[slot] = self._fingerprint(key)
+            self._unflushed += 1
+            should_flush = self._unflushed >= self.flush_every
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._vectors is None or not self._unflushed:
+                return
+            self._vectors.flush()
+            self._fingerprints.flush()
+            tmp_path = self._index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model, "dim": self._dim, "capacity": self.capacity,
+                           "keys": list(self._slots.items())}, f)
+            os.replace(tmp_path, self._index_path)
+            self._unflushed = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "entries": len(self._slots),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the underlying model."""
+
+    def __init__(self, embeddings, cache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts):
+        keys = [text_key(self.cache.model, t) for t in texts]
+        vectors = [self.cache.get(k) for k in keys]
+        # Each distinct missing text is embedded once, even if repeated within the batch
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keys[i], texts[i])
+        if missing:
+            fresh = dict(zip(missing, self.embeddings.embed_documents(list(missing.values()))))
+            for key, vector in fresh.items():
+                self.cache.put(key, vector)
+            vectors = [fresh[k] if v is None else v for k, v in zip(keys, vectors)]
+        return [v.tolist() if isinstance(v, np.ndarray) else v for v in vectors]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
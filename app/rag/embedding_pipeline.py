@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import httpx
+from ollama import ResponseError
+from loguru import logger
+from app.config import EMBED_BATCH_SIZE, EMBED_CONCURRENCY, EMBED_MAX_RETRIES
+
+
+def is_transient(error):
+    """Network hiccups, timeouts, overload (429) and 5xx are worth retrying – bad input is not."""
+    if isinstance(error, ResponseError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+class EmbeddingPipeline:
+    """
+    Embeds chunks in fixed-size batches over a bounded pool of concurrent requests.
+    Large uploads stop being a long chain of sequential Ollama round trips.
+    """
+
+    def __init__(self, embeddings, batch_size=EMBED_BATCH_SIZE, max_concurrency=EMBED_CONCURRENCY,
+                 max_retries=EMBED_MAX_RETRIES, backoff=0.5):
+        self.embeddings = embeddings
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def _embed_batch(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.embeddings.embed_documents(batch)
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                logger.warning(f"Embedding batch failed ({e}) – retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def embed(self, texts, progress=None):
+        """Returns one vector per text, in input order. `progress(done, total)` fires as batches land."""
+        texts = list(texts)
+        total = len(texts)
+        if not total:
+            return []
+        batches = [texts[i:i + self.batch_size] for i in range(0, total, self.batch_size)]
+        results = [None] * len(batches)
+        done = 0
+        start = time.perf_counter()
+
+        if len(batches) == 1 or self.max_concurrency == 1:
+            for i, batch in enumerate(batches):
+                results[i] = self._embed_batch(batch)
+                done += len(batch)
+                if progress:
+                    progress(done, total)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+                futures = {pool.submit(self._embed_batch, batch): i for i, batch in enumerate(batches)}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    results[i] = future.result()  # First hard failure aborts the whole upload
+                    done += len(batches[i])
+                    if progress:
+                        progress(done, total)
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"Embedded {total} chunks in {len(batches)} batch(es) – {total / max(elapsed, 1e-9):.1f} chunks/sec")
+        return [vector for batch in results for vector in batch]
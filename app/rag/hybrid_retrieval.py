@@ -0,0 +1,66 @@
+import numpy as np
+from loguru import logger
+from app.config import RERANKER, RERANKER_MODEL
+from app.rag.bm25_index import tokenize
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuses ranked id lists: score(id) = Σ 1 / (k + rank). Returns ids, best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class EmbeddingReranker:
+    """
+    Re-scores fused candidates by exact query/chunk cosine plus the share of query terms the chunk
+    contains. Cheap: chunk vectors come from the embedding cache filled at ingestion. Cosine alone
+    would undo what BM25 contributed – embeddings blur near-identical codes such as E11.65 / E11.69.
+    """
+
+    def __init__(self, embeddings, term_weight=0.5):
+        self.embeddings = embeddings
+        self.term_weight = term_weight
+
+    def rerank(self, query, docs, top_n):
+        if len(docs) <= 1:
+            return docs[:top_n]
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        vectors = np.asarray(self.embeddings.embed_documents([d.page_content for d in docs]), dtype=np.float32)
+        scores = vectors @ query_vector / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector) + 1e-12)
+        terms = set(tokenize(query))
+        if terms and self.term_weight:
+            coverage = [len(terms.intersection(tokenize(d.page_content))) / len(terms) for d in docs]
+            scores = scores + self.term_weight * np.asarray(coverage, dtype=np.float32)
+        return [docs[i] for i in np.argsort(-scores)[:top_n]]
+
+
+class CrossEncoderReranker:
+    """Local cross-encoder (sentence-transformers, optional dependency) – best quality, CPU cost per pair."""
+
+    def __init__(self, model_name=RERANKER_MODEL):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ImportError("RERANKER=cross-encoder needs `pip install sentence-transformers`") from e
+        self.model = CrossEncoder(model_name)
+
+    def rerank(self, query, docs, top_n):
+        if len(docs) <= 1:
+            return docs[:top_n]
+        scores = self.model.predict([(query, d.page_content) for d in docs])
+        return [docs[i] for i in np.argsort(-np.asarray(scores))[:top_n]]
+
+
+def make_reranker(kind=RERANKER, embeddings=None):
+    """None (fusion order is final), "embedding" or "cross-encoder"."""
+    if not kind:
+        return None
+    if kind == "embedding":
+        return EmbeddingReranker(embeddings)
+    if kind == "cross-encoder":
+        return CrossEncoderReranker()
+    logger.warning(f"Unknown RERANKER {kind!r} – reranking disabled")
+    return None
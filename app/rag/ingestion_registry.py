@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from loguru import logger
+from app.config import FILE_HASH_CACHE_SIZE
+
+
+def content_hash(data):
+    """SHA-256 of raw bytes – the identity of a document, independent of its filename."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_content_hash(path, block_size=1 << 20):
+    """Streams the file through SHA-256 so large scans never sit fully in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def config_fingerprint(config):
+    """Short stable hash of the splitter/embedding settings that shaped the stored vectors."""
+    payload = json.dumps(config, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+class IngestionRegistry:
+    """
+    Persistent record of which documents are already embedded in the vectorstore.
+    Keyed by file content hash + ingestion config, so re-uploads and renamed copies
+    of the same file are recognised and never re-embedded.
+    """
+
+    FILENAME = "registry.json"
+
+    def __init__(self, index_path, config, hash_memo_size=FILE_HASH_CACHE_SIZE):
+        # Lives inside the FAISS folder – deleting the index also resets the registry
+        self.path = os.path.join(index_path, self.FILENAME)
+        self.config = config
+        self.fingerprint = config_fingerprint(config)
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._unsaved = {}  # Recorded in memory, not yet written – survives reloads
+        self._mtime = None
+        self.hash_memo_size = hash_memo_size
+        self._hash_memo = OrderedDict()  # (path, mtime_ns, size) -> content hash, least recently used first
+        self._refresh()
+
+    def _key(self, digest):
+        return f"{digest}:{self.fingerprint}"
+
+    def _refresh(self):
+        """Reloads from disk if another process/instance has written the registry since."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._entries, self._mtime = dict(self._unsaved), None
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f).get("documents", {})
+            self._mtime = mtime
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ingestion registry unreadable ({e}) – treating index as empty")
+            self._entries, self._mtime = {}, None
+        self._entries.update(self._unsaved)
+
+    def disk_mtime(self):
+        """Modification time of the saved registry (None when there is none) – changes on every save."""
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def hash_file(self, path):
+        """Content hash of a file, memoised on (path, mtime, size) to skip re-reading unchanged files."""
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._hash_memo.get(memo_key)
+            if digest is not None:
+                self._hash_memo.move_to_end(memo_key)
+                return digest
+        digest = file_content_hash(path)
+        with self._lock:
+            self._hash_memo[memo_key] = digest
+            while len(self._hash_memo) > self.hash_memo_size:
+                self._hash_memo.popitem(last=False)
+        return digest
+
+    def is_indexed_hash(self, digest):
+        with self._lock:
+            self._refresh()
+            return self._key(digest) in self._entries
+
+    def is_indexed(self, path):
+        return self.is_indexed_hash(self.hash_file(path))
+
+    def pending(self, paths):
+        """Returns {path: hash} for files whose content is not yet indexed (deduplicated within the batch)."""
+        pending, seen = {}, set()
+        for path in paths:
+            digest = self.hash_file(path)
+            if digest in seen or self.is_indexed_hash(digest):
+                continue
+            seen.add(digest)
+            pending[path] = digest
+        return pending
+
+    def entry(self, digest):
+        with self._lock:
+            self._refresh()
+            return self._entries.get(self._key(digest))
+
+    def record(self, digest, source, chunk_ids):
+        """
+        Marks content as indexed – call once its vectors are in the in-memory index. Kept in memory until
+        save(), which the vectorstore service calls only after writing the index, so the file on disk
+        never lists chunks the saved index lacks.
+        """
+        with self._lock:
+            self._refresh()
+            entry = {
+                "hash": digest,
+                "source": source,
+                "chunk_ids": list(chunk_ids),
+            }
+            self._entries[self._key(digest)] = entry
+            self._unsaved[self._key(digest)] = entry
+
+    def reset(self):
+        with self._lock:
+            self._entries, self._unsaved, self._mtime = {}, {}, None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"config": self.config, "documents": self._entries}, f)
+            os.replace(tmp_path, self.path)  # Atomic – readers never see a half-written registry
+            self._unsaved = {}
+            self._mtime = os.stat(self.path).st_mtime_ns
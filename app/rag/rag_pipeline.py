@@ -1,24 +1,31 @@
 # app/rag/rag_pipeline.py
-from langchain_core.chat_history import InMemoryChatMessageHistory
 from langchain_core.runnables import RunnableWithMessageHistory, RunnablePassthrough
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableParallel
-from langchain_community.vectorstores import FAISS
-from langchain_ollama import OllamaEmbeddings, ChatOllama
+from langchain_ollama import ChatOllama
 from loguru import logger
+from app.config import CHAT_MODEL, RETRIEVAL_MODE, RETRIEVAL_K, HYBRID_FETCH_K, RERANKER, RERANK_TOP_N
+from app.rag.vectorstore_service import get_vectorstore_service
+from app.rag.hybrid_retrieval import make_reranker
+from app.session_store import get_session_store
+from app.metrics import timed, token_callback
+import threading
 
 class QAAgent:
-    def __init__(self, vectorstore):
+    def __init__(self, vectorstore=None, store=None, sessions=None, retrieval_mode=RETRIEVAL_MODE, reranker=RERANKER):
+        """Pass a FAISS store directly, or a VectorStoreService to always search the live shared index."""
         logger.info("Initializing QAAgent")
+        self.store = store
+        self.sessions = sessions or get_session_store()
         self.vectorstore = vectorstore
-        self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 5})
+        self.k = RETRIEVAL_K
+        self.retrieval_mode = retrieval_mode
+        self.reranker = make_reranker(reranker, store.embeddings if store is not None else None)
+        if vectorstore is not None:
+            self.retriever = vectorstore.as_retriever(search_kwargs={"k": self.k})
 
-        # Use a valid embedding model
-        self.embeddings = OllamaEmbeddings(model="nomic-embed-text")
-        self.vectorstore.embedding_function = self.embeddings.embed_query
-
-        self.llm = ChatOllama(model="llama3:8b", temperature=0.1)
+        self.llm = ChatOllama(model=CHAT_MODEL, temperature=0.1, callbacks=[token_callback])
 
         prompt = ChatPromptTemplate.from_template(
             """Use the following context to answer the query. Be grounded in the documents.
@@ -31,7 +38,10 @@ class QAAgent:
         # Adjust the chain to handle history and query correctly
         chain = (
             RunnableParallel(
-                context=lambda x: self.retriever.invoke(x.get("query", x) if isinstance(x, dict) else x),
+                context=lambda x: self.retrieve(
+                    (x.get("retrieval_query") or x.get("query", x)) if isinstance(x, dict) else x,
+                    x.get("documents") if isinstance(x, dict) else None
+                ),
                 query=lambda x: x.get("query", x) if isinstance(x, dict) else x,
                 history=lambda x: x.get("history", []) if isinstance(x, dict) else []
             )
@@ -40,9 +50,6 @@ class QAAgent:
             | StrOutputParser()
         )
 
-        # Session-based memory store
-        self.memory_store = {}
-
         self.runnable_with_history = RunnableWithMessageHistory(
             runnable=chain,
             get_session_history=self.get_session_history,
@@ -50,15 +57,50 @@ class QAAgent:
             history_messages_key="history",
         )
 
+    @timed("retrieve")
+    def retrieve(self, query, documents=None):
+        """Scoped to `documents` when given – unrelated uploads never dilute the top-k."""
+        if self.store is None:
+            return self.retriever.invoke(query)
+        if self.retrieval_mode != "hybrid":
+            return self.store.similarity_search(query, k=self.k, sources=documents)
+        if self.reranker is None:
+            return self.store.hybrid_search(query, k=self.k, sources=documents)
+        # Rerank a wider fused pool, keep only the best few – a shorter, sharper prompt
+        candidates = self.store.hybrid_search(query, k=HYBRID_FETCH_K, sources=documents)
+        return self.reranker.rerank(query, candidates, RERANK_TOP_N)
+
     def get_session_history(self, session_id: str):
-        if session_id not in self.memory_store:
-            self.memory_store[session_id] = InMemoryChatMessageHistory()
-        return self.memory_store[session_id]
+        # Shared, bounded store – the same history the orchestrator reads, across processes and restarts
+        return self.sessions.history(session_id)
 
-    def answer(self, query, session_id="default"):
+    @timed("answer")
+    def answer(self, query, session_id="default", documents=None, retrieval_query=None):
+        """`retrieval_query` (e.g. the question folded with recent turns) searches; `query` is what history records."""
         logger.info(f"Answering query: {query} for session {session_id}")
         response = self.runnable_with_history.invoke(
-            {"query": query},
+            {"query": query, "documents": documents, "retrieval_query": retrieval_query},
             config={"configurable": {"session_id": session_id}},
         )
-        return response
\ No newline at end of file
+        return response
+
+    @timed("answer")
+    def stream(self, query, session_id="default", documents=None, retrieval_query=None):
+        """Same chain as answer(), yielding text chunks as the model produces them."""
+        logger.info(f"Streaming answer to query: {query} for session {session_id}")
+        yield from self.runnable_with_history.stream(
+            {"query": query, "documents": documents, "retrieval_query": retrieval_query},
+            config={"configurable": {"session_id": session_id}},
+        )
+
+_shared_agent = None
+_shared_lock = threading.Lock()
+
+
+def get_qa_agent():
+    """Process-wide QAAgent – one LLM client and one chain, reused by every request."""
+    global _shared_agent
+    with _shared_lock:
+        if _shared_agent is None:
+            _shared_agent = QAAgent(store=get_vectorstore_service())
+        return _shared_agent
@@ -0,0 +1,38 @@
+import faiss
+import numpy as np
+
+
+def scoped_search(index, query_vector, positions, k, inner_product=False):
+    """
+    Exact top-k over a subset of index positions.
+    Cost scales with the size of the subset, not the whole corpus – the vectors of the
+    requested documents are gathered and scored directly instead of fetch-many-then-filter.
+    Returns (scores, positions), best first.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    if not len(positions) or k <= 0:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+    k = min(k, len(positions))
+
+    try:
+        vectors = index.reconstruct_batch(positions)
+    except RuntimeError:
+        vectors = None
+
+    if vectors is None:
+        # ANN indexes without a direct map – restrict the search itself with an ID selector
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(positions))
+        scores, hits = index.search(query[None, :], k, params=params)
+        keep = hits[0] >= 0
+        return scores[0][keep], hits[0][keep]
+
+    if inner_product:
+        scores = vectors @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+    else:
+        scores = ((vectors - query) ** 2).sum(axis=1)  # Squared L2 – same metric as IndexFlatL2
+        top = np.argpartition(scores, k - 1)[:k]
+        top = top[np.argsort(scores[top])]
+    return scores[top], positions[top]
@@ -0,0 +1,401 @@
+import atexit
+import hashlib
+import os
+import pickle
+import threading
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_ollama import OllamaEmbeddings
+from loguru import logger
+from app.config import (
+    EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, VECTORSTORE_PATH, VECTORSTORE_SAVE_DELAY, INDEX_WRITER_WAIT,
+    EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_CAPACITY, HYBRID_FETCH_K, RRF_K
+)
+from app.rag.embedding_cache import EmbeddingCache, CachedEmbeddings
+from app.rag.ingestion_registry import IngestionRegistry
+from app.rag.scoped_search import scoped_search
+from app.rag.ann_index import IndexSpec, materialize, read_index, rebuild
+from app.rag.bm25_index import BM25Index
+from app.rag.hybrid_retrieval import reciprocal_rank_fusion
+from app.rag.writer_lock import IndexLocked, WriterLock
+
+class ReadWriteLock:
+    """Many concurrent searches, exclusive adds – FAISS search is thread-safe, add is not."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    def read(self):
+        return _Guard(self.acquire_read, self.release_read)
+
+    def write(self):
+        return _Guard(self.acquire_write, self.release_write)
+
+
+class _Guard:
+    def __init__(self, acquire, release):
+        self._acquire, self._release = acquire, release
+
+    def __enter__(self):
+        self._acquire()
+
+    def __exit__(self, *exc):
+        self._release()
+
+
+class VectorStoreService:
+    """
+    Process-wide owner of the FAISS index.
+    Loaded from disk once, mutated in memory, and saved in the background after a short
+    debounce so bursts of uploads cost a single write.
+    Worker processes sharing an index folder take turns writing it (WriterLock, held from before an
+    ingestion until its changes are saved) and reload the index whenever another one has saved.
+    """
+
+    def __init__(self, path=VECTORSTORE_PATH, embeddings=None, save_delay=VECTORSTORE_SAVE_DELAY, index_spec=None,
+                 writer_wait=INDEX_WRITER_WAIT):
+        self.path = path
+        self.index_spec = index_spec or IndexSpec()  # Flat, IVF-PQ or HNSW – see app.rag.ann_index
+        self._index_mapped = False  # IVF lists served from disk; reloaded into RAM before the next write
+        self.embedding_cache = None
+        if embeddings is None:
+            # Shared by ingestion and queries – both go through this one cached client
+            self.embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_MODEL, capacity=EMBEDDING_CACHE_CAPACITY)
+            embeddings = CachedEmbeddings(OllamaEmbeddings(model=EMBEDDING_MODEL), self.embedding_cache)
+        self.embeddings = embeddings
+        self.save_delay = save_delay
+        self.registry = IngestionRegistry(path, {
+            "embedding_model": EMBEDDING_MODEL,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+        })
+        self.lock = ReadWriteLock()
+        self.ingest_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._vectorstore = None
+        self.bm25 = BM25Index()  # Keyword index over the same chunks, appended to at ingestion
+        self._loaded = False
+        self._loaded_mtime = None  # Registry file as of the last load – a newer one means the writer saved
+        self.writer = WriterLock(path)
+        self.writer_wait = writer_wait  # Seconds to wait for another process's write before IndexLocked
+        self._dirty = False
+        self._save_timer = None
+        self._id_to_position = {}  # docstore id -> FAISS row, rebuilt only when the index grows
+        self.generation = 0  # Bumped on every index change – unscoped answer caches key on it
+
+    def _index_exists(self):
+        return os.path.exists(os.path.join(self.path, "index.faiss"))
+
+    @property
+    def vectorstore(self):
+        """The live FAISS store (None until something is indexed) – deserialized once, again only when another process saved."""
+        if not self._loaded or self._stale():
+            with self.lock.write():
+                if not self._loaded or self._stale():
+                    self._load()
+        return self._vectorstore
+
+    def _stale(self):
+        # The registry is written last on save, so a newer one means a complete newer index is on disk
+        return not self._dirty and self.registry.disk_mtime() != self._loaded_mtime
+
+    def _load(self):
+        self._loaded_mtime = self.registry.disk_mtime()
+        self._vectorstore, self._index_mapped, self._id_to_position = None, False, {}
+        self.bm25 = BM25Index()
+        if self._index_exists():
+            # Same files FAISS.load_local reads, but the index goes through read_index so it can be memory-mapped
+            index = read_index(os.path.join(self.path, "index.faiss"), self.index_spec)
+            with open(os.path.join(self.path, "index.pkl"), "rb") as f:
+                docstore, index_to_docstore_id = pickle.load(f)  # Our own file – written by save_local
+            self._vectorstore = FAISS(self.embeddings, index, docstore, index_to_docstore_id)
+            self._index_mapped = self.index_spec.mmap
+            logger.info(f"Vectorstore loaded once from disk ({index.ntotal} vectors, {type(index).__name__})")
+            bm25 = BM25Index.load(self.path)
+            if bm25 is None or len(bm25) != len(index_to_docstore_id):
+                # Index saved before BM25 existed (or saved apart from it) – rebuild from the stored chunks
+                bm25 = BM25Index()
+                chunk_ids = list(index_to_docstore_id.values())
+                bm25.add(chunk_ids, [docstore.search(i).page_content for i in chunk_ids])
+                try:
+                    # Only the BM25 file – the index itself is unchanged and may be mapped. Derived from the
+                    # index and length-checked on load, so a read-only process may write it too
+                    bm25.save(self.path)
+                except OSError as e:
+                    logger.warning(f"Could not save the rebuilt BM25 index: {e}")
+            self.bm25 = bm25
+        else:
+            self.registry.reset()  # Registry without vectors is stale – start clean
+            self._loaded_mtime = None
+        if self._loaded:
+            self.generation += 1  # Reloaded with another process's chunks
+        self._loaded = True
+
+    def add_embeddings(self, splits, vectors, ids):
+        """
+        Adds pre-embedded chunks to the in-memory index – call mark_dirty() once the registry is updated too.
+        Raises IndexLocked when another process is still writing this index after `writer_wait` seconds.
+        """
+        text_embeddings = [(split.page_content, vector) for split, vector in zip(splits, vectors)]
+        metadatas = [split.metadata for split in splits]
+        while True:
+            self.claim_writer()
+            # Only the in-memory append holds the write lock – embedding happened before, searches keep running
+            with self.lock.write():
+                if self.writer.held:
+                    return self._add(text_embeddings, metadatas, ids)
+            # A save handed the writer lock back meanwhile – another process may have written; claim and reload
+
+    def claim_writer(self):
+        """Takes this folder's writer lock (waiting for another process's write), then loads whatever it saved."""
+        self.writer.acquire(self.writer_wait)
+        return self.vectorstore
+
+    def release_writer(self):
+        """Lets other processes write – only once everything here is saved and no ingestion is running."""
+        if not self.writer.held or not self.ingest_lock.acquire(blocking=False):
+            return
+        try:
+            with self.lock.write(), self._state_lock:
+                if not self._dirty:
+                    self.writer.release()
+        finally:
+            self.ingest_lock.release()
+
+    def _add(self, text_embeddings, metadatas, ids):
+        """The in-memory append (call under the write lock, holding the writer lock)."""
+        with self._state_lock:
+            self._dirty = True  # Unsaved until the next flush – keeps the writer lock and blocks reloads
+        start = len(self._vectorstore.index_to_docstore_id) if self._vectorstore is not None else 0
+        if self._vectorstore is not None:
+            if self._index_mapped:
+                self._vectorstore.index = materialize(os.path.join(self.path, "index.faiss"), self.index_spec)
+                self._index_mapped = False
+            self._vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+            logger.info("Updated existing vectorstore")
+        else:
+            self._vectorstore = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas, ids=ids)
+            logger.info("Created new vectorstore")
+        if self.index_spec.due(self._vectorstore.index):
+            # Big enough to train – swap the flat index for the configured ANN index, same row order
+            self._vectorstore.index = rebuild(self._vectorstore.index, self.index_spec)
+        index_to_id = self._vectorstore.index_to_docstore_id
+        self.bm25.add([index_to_id[i] for i in range(start, len(index_to_id))], [t for t, _ in text_embeddings])
+        self.generation += 1
+        return self._vectorstore
+
+    def _embed_query(self, query):
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        if self._vectorstore._normalize_L2:
+            query_vector /= np.linalg.norm(query_vector) or 1.0
+        return query_vector
+
+    def _dense_positions(self, query_vector, k, sources=None):
+        """FAISS rows of the top-k chunks, best first (call under the read lock)."""
+        store = self._vectorstore
+        if sources is None:
+            _, hits = store.index.search(query_vector[None, :], k)
+            hits = hits[0][hits[0] >= 0]
+        else:
+            _, hits = scoped_search(
+                store.index, query_vector, self.positions_for_sources(sources), k,
+                inner_product=store.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT
+            )
+        return [int(i) for i in hits]
+
+    def similarity_search(self, query, k=5, sources=None):
+        """Top-k chunks for a query; with `sources`, only chunks of those documents are scored."""
+        store = self.vectorstore
+        if store is None:
+            return []
+        query_vector = self._embed_query(query)
+        with self.lock.read():
+            positions = self._dense_positions(query_vector, k, sources)
+            return [store.docstore.search(store.index_to_docstore_id[i]) for i in positions]
+
+    def keyword_search(self, query, k=5, sources=None):
+        """Top-k chunks by BM25 alone – exact terms such as drug names, ICD codes and lab values."""
+        store = self.vectorstore
+        if store is None:
+            return []
+        with self.lock.read():
+            return [store.docstore.search(i) for i, _ in self.bm25.search(query, k, self._allowed_ids(sources))]
+
+    def hybrid_search(self, query, k=5, sources=None, fetch_k=HYBRID_FETCH_K, rrf_k=RRF_K):
+        """
+        Vector and BM25 candidates (`fetch_k` each) merged by reciprocal rank fusion, top-k returned.
+        Dense search finds paraphrases; BM25 finds the exact identifiers embeddings blur together.
+        """
+        store = self.vectorstore
+        if store is None:
+            return []
+        query_vector = self._embed_query(query)
+        with self.lock.read():
+            index_to_id = store.index_to_docstore_id
+            dense = [index_to_id[i] for i in self._dense_positions(query_vector, max(k, fetch_k), sources)]
+            lexical = [i for i, _ in self.bm25.search(query, max(k, fetch_k), self._allowed_ids(sources))]
+            fused = reciprocal_rank_fusion([dense, lexical], k=rrf_k)[:k]
+            return [store.docstore.search(i) for i in fused]
+
+    def _allowed_ids(self, sources):
+        """Chunk ids of `sources` for BM25 filtering; None means the whole index (call under the read lock)."""
+        if sources is None:
+            return None
+        index_to_id = self._vectorstore.index_to_docstore_id
+        return {index_to_id[p] for p in self.positions_for_sources(sources)}
+
+    def index_stats(self):
+        index = self._vectorstore.index if self._vectorstore is not None else None
+        return {
+            "type": type(index).__name__ if index is not None else None,
+            "configured": self.index_spec.kind,
+            "vectors": index.ntotal if index is not None else 0,
+            "memory_mapped": self._index_mapped,
+            "bm25_chunks": len(self.bm25),
+            "bm25_terms": len(self.bm25.postings),
+        }
+
+    def positions_for_sources(self, sources):
+        """Resolves document paths → content hashes → chunk ids → FAISS rows (call under the read lock)."""
+        store = self._vectorstore
+        if len(self._id_to_position) != len(store.index_to_docstore_id):
+            self._id_to_position = {doc_id: pos for pos, doc_id in store.index_to_docstore_id.items()}
+        positions = []
+        for path in dict.fromkeys(sources):
+            try:
+                entry = self.registry.entry(self.registry.hash_file(path))
+            except OSError:
+                continue
+            if entry:
+                positions.extend(self._id_to_position[i] for i in entry["chunk_ids"] if i in self._id_to_position)
+        return positions
+
+    def corpus_fingerprint(self, sources=None):
+        """
+        Identifies exactly what a query searches: the indexed content of `sources` (the whole index when
+        None) plus the ingestion config. None when a source is not indexed – nothing stable to key on.
+        """
+        if sources is None:
+            parts = [f"generation:{self.generation}"]
+        else:
+            parts = []
+            for path in dict.fromkeys(sources):
+                try:
+                    digest = self.registry.hash_file(path)
+                except OSError:
+                    return None
+                if not self.registry.is_indexed_hash(digest):
+                    return None
+                parts.append(digest)
+            parts.sort()
+        return hashlib.sha256("|".join([self.registry.fingerprint, *parts]).encode("utf-8")).hexdigest()
+
+    def mark_dirty(self):
+        """Registry or index changed – persist soon (or now when save_delay is 0)."""
+        with self._state_lock:
+            self._dirty = True
+            if self.save_delay > 0:
+                if self._save_timer is None:
+                    self._save_timer = threading.Timer(self.save_delay, self.flush)
+                    self._save_timer.daemon = True
+                    self._save_timer.start()
+                return
+        self.flush()
+
+    def _save_local(self):
+        """
+        FAISS.save_local's two files, each written aside and renamed into place so a crash or a reader in
+        another process never sees half an index. A memory-mapped index is left alone: every add
+        materializes it first, so while it is mapped the files on disk are exactly what is loaded – and
+        writing it out would both truncate the file under the mapping and serialize a reference to it.
+        """
+        if self._index_mapped:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        index_path = os.path.join(self.path, "index.faiss")
+        pickle_path = os.path.join(self.path, "index.pkl")
+        faiss.write_index(self._vectorstore.index, index_path + ".tmp")
+        with open(pickle_path + ".tmp", "wb") as f:
+            pickle.dump((self._vectorstore.docstore, self._vectorstore.index_to_docstore_id), f)
+        os.replace(index_path + ".tmp", index_path)
+        os.replace(pickle_path + ".tmp", pickle_path)
+
+    def flush(self):
+        """Writes index then registry – the registry never claims vectors that are not on disk."""
+        if self.embedding_cache is not None:
+            self.embedding_cache.flush()
+        with self._state_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            dirty, self._dirty = self._dirty, False
+        if not dirty:
+            self.release_writer()
+            return
+        try:
+            with self.lock.read():
+                if self._vectorstore is not None:
+                    self.writer.acquire(self.writer_wait)  # Already held whenever chunks were added
+                    self._save_local()
+                    self.bm25.save(self.path)
+                    self.registry.save()
+                    self._loaded_mtime = self.registry.disk_mtime()  # Our own save – nothing to reload
+            logger.success("Vectorstore saved to disk – persistent RAG ready!")
+        except Exception as e:
+            logger.error(f"Vectorstore save failed: {e}")
+            with self._state_lock:
+                self._dirty = True
+            return
+        self.release_writer()  # Saved – another worker may ingest now
+
+    def close(self):
+        """Saves pending changes and gives up the writer lock for good – shutdown."""
+        self.flush()
+        self.writer.release()
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_vectorstore_service(path=VECTORSTORE_PATH, embeddings=None, index_spec=None):
+    """One service per index path for the whole process."""
+    with _services_lock:
+        service = _services.get(path)
+        if service is None:
+            service = VectorStoreService(path, embeddings=embeddings, index_spec=index_spec)
+            _services[path] = service
+        return service
+
+
+@atexit.register
+def _flush_all():
+    for service in list(_services.values()):
+        service.flush()
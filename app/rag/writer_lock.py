@@ -0,0 +1,56 @@
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class IndexLocked(Exception):
+    """Another process is writing this index folder – worth retrying, nothing is wrong with the documents."""
+
+
+class WriterLock:
+    """
+    Exclusive claim on an index folder, held from before an ingestion until its changes are saved.
+    Each writer saves its whole in-memory index, so two processes writing at once would overwrite
+    each other's vectors; taking turns (and reloading the other's saves first) is safe.
+    """
+
+    FILENAME = "writer.lock"
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def acquire(self, timeout=0):
+        """Takes the lock, waiting up to `timeout` seconds for another process to finish; else raises IndexLocked."""
+        if self._file is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        f = open(os.path.join(self.directory, self.FILENAME), "a+")
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    f.close()
+                    raise IndexLocked(f"{self.directory} is being written by another process – retry shortly")
+                time.sleep(0.05)
+        self._file = f
+
+    def release(self):
+        if self._file is not None:
+            self._file.close()  # Closing drops the lock
+            self._file = None
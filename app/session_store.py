@@ -0,0 +1,314 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import SystemMessage, message_to_dict, messages_from_dict
+from loguru import logger
+from app.config import (MEMORY_BACKEND, MEMORY_COMPACT_WORKERS, MEMORY_DB_PATH, MEMORY_MAX_SESSIONS, MEMORY_MAX_TURNS,
+                        MEMORY_TTL)
+
+
+def summarize_turns(summary, messages):
+    """Default rolling summarizer – folds older turns into the running summary with the shared agent."""
+    from app.agents.summarization_agent import get_summarization_agent
+    transcript = "\n".join(f"{m.type}: {m.content}" for m in messages)
+    text = f"Earlier summary: {summary}\n\n{transcript}" if summary else transcript
+    return get_summarization_agent().summarize(text)
+
+
+class SessionStore(ABC):
+    """
+    Conversation history per session_id, shared by the orchestrator and QAAgent.
+    Sessions expire after `ttl` seconds idle and the least recently used are dropped beyond
+    `max_sessions`. Past `max_turns`, the oldest half of the turns is folded into a rolling
+    summary, returned ahead of the recent messages as a system message. Folding calls the LLM,
+    so it runs on a small background pool – never on the request that crossed the cap.
+    """
+
+    def __init__(self, max_sessions=MEMORY_MAX_SESSIONS, ttl=MEMORY_TTL, max_turns=MEMORY_MAX_TURNS,
+                 summarizer=summarize_turns, compact_workers=MEMORY_COMPACT_WORKERS):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.summarizer = summarizer
+        self._compactor = ThreadPoolExecutor(max_workers=compact_workers, thread_name_prefix="compact")
+        self._compactions = {}  # session_id -> queued or running future; one per session is enough
+        self._compactions_lock = threading.Lock()
+
+    def get_messages(self, session_id):
+        summary, messages = self._load(session_id)
+        if summary:
+            return [SystemMessage(content=f"Summary of the earlier conversation: {summary}")] + messages
+        return messages
+
+    def append(self, session_id, messages):
+        if self._append(session_id, list(messages)) > self.max_turns * 2:
+            self._schedule_compaction(session_id)
+
+    def _schedule_compaction(self, session_id):
+        with self._compactions_lock:
+            if session_id in self._compactions:
+                return  # Already queued or running – the next append past the cap schedules another
+            future = self._compactor.submit(self._compact, session_id)
+            self._compactions[session_id] = future
+        future.add_done_callback(lambda _: self._compaction_done(session_id, future))
+
+    def _compaction_done(self, session_id, future):
+        with self._compactions_lock:
+            if self._compactions.get(session_id) is future:
+                del self._compactions[session_id]
+
+    def wait_for_compactions(self, timeout=None):
+        """Blocks until the compactions queued so far have finished – for shutdown and tests."""
+        with self._compactions_lock:
+            pending = list(self._compactions.values())
+        wait(pending, timeout=timeout)
+
+    def shutdown(self):
+        self._compactor.shutdown(wait=False, cancel_futures=True)
+
+    def _compact(self, session_id):
+        """Summarizes outside any lock – the fold only applies if nobody else compacted meanwhile."""
+        summary, messages = self._load(session_id)
+        fold = len(messages) - self.max_turns  # Keep the newest max_turns / 2 turns verbatim
+        if fold <= 0:
+            return
+        try:
+            new_summary = self.summarizer(summary, messages[:fold])
+        except Exception as e:
+            logger.warning(f"Could not summarize history for session {session_id}: {e}")
+            return
+        if self._fold(session_id, summary, fold, new_summary):
+            logger.info(f"Folded {fold} message(s) of session {session_id} into its summary")
+
+    def history(self, session_id):
+        return SessionHistory(self, session_id)
+
+    @abstractmethod
+    def _load(self, session_id):
+        """(summary, messages) – touching the session for LRU/TTL purposes."""
+
+    @abstractmethod
+    def _append(self, session_id, messages):
+        """Stores messages and returns how many the session now holds."""
+
+    @abstractmethod
+    def _fold(self, session_id, expected_summary, count, new_summary):
+        """Replaces the oldest `count` messages with `new_summary` unless the summary changed since loading."""
+
+    @abstractmethod
+    def clear(self, session_id):
+        ...
+
+    @abstractmethod
+    def stats(self):
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """Single-process store – LRU order in an OrderedDict."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._sessions = OrderedDict()  # session_id -> {"summary", "messages", "touched"}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _session(self, session_id, create=True):
+        now = time.monotonic()
+        while self._sessions:  # LRU order is also touch order – expired sessions sit at the front
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest["touched"] <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+        session = self._sessions.get(session_id)
+        if session is None:
+            if not create:
+                return None
+            session = self._sessions[session_id] = {"summary": "", "messages": [], "touched": now}
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        session["touched"] = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _load(self, session_id):
+        with self._lock:
+            session = self._session(session_id, create=False)  # Reads never create (or evict for) a session
+            return (session["summary"], list(session["messages"])) if session else ("", [])
+
+    def _append(self, session_id, messages):
+        with self._lock:
+            session = self._session(session_id)
+            session["messages"].extend(messages)
+            return len(session["messages"])
+
+    def _fold(self, session_id, expected_summary, count, new_summary):
+        with self._lock:
+            session = self._session(session_id, create=False)
+            if session is None or session["summary"] != expected_summary:
+                return False
+            session["summary"] = new_summary
+            del session["messages"][:count]
+            return True
+
+    def clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "sessions": len(self._sessions), "evictions": self.evictions}
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Persistent store shared by every worker process on the host (WAL mode, one connection per thread).
+    History survives restarts; expired and excess sessions are pruned every `prune_every` writes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL DEFAULT '',
+            touched REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched);
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL REFERENCES sessions (session_id) ON DELETE CASCADE,
+            message TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+    """
+
+    def __init__(self, path=MEMORY_DB_PATH, prune_every=64, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._writes = 0
+        self.evictions = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _touch(self, conn, session_id):
+        now = time.time()
+        # An expired session starts over rather than reviving its old messages
+        conn.execute("DELETE FROM sessions WHERE session_id = ? AND touched < ?", (session_id, now - self.ttl))
+        conn.execute(
+            "INSERT INTO sessions (session_id, touched) VALUES (?, ?) "
+            "ON CONFLICT (session_id) DO UPDATE SET touched = excluded.touched",
+            (session_id, now),
+        )
+
+    def _load(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT summary FROM sessions WHERE session_id = ? AND touched >= ?",
+                (session_id, time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                return "", []
+            self._touch(conn, session_id)
+            rows = conn.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+        return row[0], messages_from_dict([json.loads(r[0]) for r in rows])
+
+    def _append(self, session_id, messages):
+        with self._connect() as conn:
+            self._touch(conn, session_id)
+            conn.executemany(
+                "INSERT INTO messages (session_id, message) VALUES (?, ?)",
+                [(session_id, json.dumps(message_to_dict(m))) for m in messages],
+            )
+            count = conn.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune()
+        return count
+
+    def _fold(self, session_id, expected_summary, count, new_summary):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")  # Serializes concurrent compactions across processes
+            row = conn.execute("SELECT summary FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None or row[0] != expected_summary:
+                return False
+            conn.execute(
+                "DELETE FROM messages WHERE id IN "
+                "(SELECT id FROM messages WHERE session_id = ? ORDER BY id LIMIT ?)",
+                (session_id, count),
+            )
+            conn.execute("UPDATE sessions SET summary = ? WHERE session_id = ?", (new_summary, session_id))
+            return True
+
+    def prune(self):
+        """Drops sessions idle longer than the TTL, then the least recently used beyond max_sessions."""
+        with self._connect() as conn:
+            expired = conn.execute("DELETE FROM sessions WHERE touched < ?", (time.time() - self.ttl,)).rowcount
+            excess = conn.execute(
+                "DELETE FROM sessions WHERE session_id IN "
+                "(SELECT session_id FROM sessions ORDER BY touched DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            ).rowcount
+        self.evictions += expired + excess
+
+    def clear(self, session_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def stats(self):
+        with self._connect() as conn:
+            sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {"backend": "sqlite", "sessions": sessions, "evictions": self.evictions}
+
+
+class SessionHistory(BaseChatMessageHistory):
+    """LangChain view of one session – what RunnableWithMessageHistory reads and appends to."""
+
+    def __init__(self, store, session_id):
+        self.store = store
+        self.session_id = session_id
+
+    @property
+    def messages(self):
+        return self.store.get_messages(self.session_id)
+
+    def add_messages(self, messages):
+        self.store.append(self.session_id, messages)
+
+    def clear(self):
+        self.store.clear(self.session_id)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Process-wide session store – SQLite unless MEMORY_BACKEND=memory."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = InMemorySessionStore() if MEMORY_BACKEND == "memory" else SQLiteSessionStore()
+        return _store
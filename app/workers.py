@@ -0,0 +1,136 @@
+import asyncio
+import contextvars
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+
+class ExecutorSaturated(Exception):
+    """Raised instead of queueing without bound – the API turns it into a 429."""
+
+
+class BoundedExecutor:
+    """
+    Runs blocking orchestrator work off the event loop.
+    Fixed worker count, a bounded wait queue, and a per-session in-flight cap – beyond that,
+    callers are rejected immediately rather than piling up behind slow reports.
+    """
+
+    def __init__(self, max_workers, max_queue, per_key_limit=None, name="worker"):
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue
+        self.per_key_limit = per_key_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._pending = 0
+        self._per_key = Counter()
+        self.rejected = 0
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def _admit(self, key):
+        # Only touched from the event loop thread – no lock needed for the counters
+        if self._pending >= self.capacity:
+            self.rejected += 1
+            raise ExecutorSaturated(f"{self._pending} requests already running or queued")
+        if key is not None and self.per_key_limit and self._per_key[key] >= self.per_key_limit:
+            self.rejected += 1
+            raise ExecutorSaturated(f"Too many concurrent requests for session {key}")
+        self._pending += 1
+        if key is not None:
+            self._per_key[key] += 1
+
+    def _release(self, key):
+        self._pending -= 1
+        if key is not None:
+            self._per_key[key] -= 1
+            if not self._per_key[key]:
+                del self._per_key[key]
+
+    def _release_when_done(self, loop, future, key):
+        # The slot belongs to the pool thread, not the awaiting coroutine – a cancelled caller (client
+        # disconnect, timeout) must not free it while the thread keeps running, or admission overshoots capacity
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(self._release, key)
+            except RuntimeError:  # Loop already closed – nothing left to admit
+                pass
+
+        future.add_done_callback(release)
+
+    async def run(self, fn, *args, key=None, **kwargs):
+        self._admit(key)
+        loop = asyncio.get_running_loop()
+        # Executor threads do not inherit contextvars – copy them so per-request spans are seen
+        context = contextvars.copy_context()
+        try:
+            future = self._executor.submit(context.run, fn, *args, **kwargs)
+        except RuntimeError:  # Pool already shut down
+            self._release(key)
+            raise
+        self._release_when_done(loop, future, key)
+        return await asyncio.wrap_future(future)
+
+    async def iterate(self, gen_fn, *args, key=None, **kwargs):
+        """
+        Async iterator over a blocking generator, each step run on the pool.
+        Admission happens on the first step (raises ExecutorSaturated); the slot is held until the stream ends
+        and its generator has been closed on the pool.
+        """
+        self._admit(key)
+        loop = asyncio.get_running_loop()
+        done = object()
+        started = []
+        context = contextvars.copy_context()  # Every step runs in it – steps are sequential, never concurrent
+
+        def start():
+            started.append(iter(gen_fn(*args, **kwargs)))
+            return started[0]
+
+        def close():
+            if started and hasattr(started[0], "close"):
+                started[0].close()  # Client went away – stop generating
+
+        def close_on_pool(_=None):
+            try:
+                closing = self._executor.submit(context.run, close)
+            except RuntimeError:  # Pool already shut down – nothing runs the generator any more
+                loop.call_soon_threadsafe(self._release, key)
+                return None
+            self._release_when_done(loop, closing, key)
+            return closing
+
+        try:
+            step = self._executor.submit(context.run, start)
+        except RuntimeError:
+            self._release(key)
+            raise
+        try:
+            iterator = await asyncio.wrap_future(step)
+            while True:
+                step = self._executor.submit(context.run, next, iterator, done)
+                item = await asyncio.wrap_future(step)
+                if item is done:
+                    break
+                yield item
+        finally:
+            if step.done():
+                closing = close_on_pool()
+                if closing is not None:
+                    await asyncio.wrap_future(closing)
+            else:
+                # Cancelled mid-step – the generator is still running; close it (and free the slot) once it returns
+                step.add_done_callback(close_on_pool)
+
+    def stats(self):
+        return {
+            "workers": self.max_workers,
+            "capacity": self.capacity,
+            "pending": self._pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        logger.info("Shutting down worker pool")
+        self._executor.shutdown(wait=False, cancel_futures=True)
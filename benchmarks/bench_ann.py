@@ -0,0 +1,86 @@
+"""
+Recall@k vs query latency (and bytes per vector) for the vector index types.
+
+Synthetic clustered vectors stand in for chunk embeddings; exact Flat search gives the ground
+truth. IVF-PQ is swept over code size (PQ_M) and nprobe, HNSW over efSearch – the sweet spots chose
+the PQ_M / IVF_NPROBE / HNSW_EF_SEARCH defaults in app/config.py.
+
+    python -m benchmarks.bench_ann [corpus size] [dim]
+"""
+import sys
+import time
+import faiss
+import numpy as np
+from app.rag.ann_index import IndexSpec, build_index, configure
+
+K = 10
+QUERIES = 200
+CLUSTERS = 500  # Topics – real chunk embeddings are far from uniform
+LATENT_DIM = 32  # Embeddings occupy a low-dimensional manifold of the full space
+
+
+def synthetic(n, dim, rng, seed=0):
+    """Clustered points in a low-rank subspace plus a little full-rank noise, unit length."""
+    basis_rng = np.random.default_rng(seed)  # Corpus and queries share topics and subspace
+    projection = basis_rng.standard_normal((LATENT_DIM, dim)).astype(np.float32)
+    centers = basis_rng.standard_normal((CLUSTERS, LATENT_DIM)).astype(np.float32)
+    latent = centers[rng.integers(0, CLUSTERS, n)] + 0.5 * rng.standard_normal((n, LATENT_DIM)).astype(np.float32)
+    vectors = latent @ projection + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)  # Embeddings are near unit length
+    return vectors
+
+
+def _measure(index, queries, truth):
+    start = time.perf_counter()
+    _, hits = index.search(queries, K)
+    latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    recall = np.mean([len(set(h) & set(t)) / K for h, t in zip(hits, truth)])
+    return recall, latency_ms
+
+
+def _bytes_per_vector(index):
+    return len(faiss.serialize_index(index)) / index.ntotal
+
+
+def run(n=100_000, dim=256, nprobes=(1, 4, 16, 64), ef_searches=(16, 32, 64, 128, 256)):
+    faiss.omp_set_num_threads(1)  # Per-query latency, as a single request sees it
+    rng = np.random.default_rng(0)
+    corpus = synthetic(n, dim, rng)
+    queries = synthetic(QUERIES, dim, rng)
+
+    flat = faiss.IndexFlatL2(dim)
+    flat.add(corpus)
+    _, truth = flat.search(queries, K)
+    rows = [{"index": "flat", "param": "-", "recall": 1.0, "latency_ms": _measure(flat, queries, truth)[1],
+             "bytes_per_vector": _bytes_per_vector(flat)}]
+
+    sample = corpus[rng.choice(n, min(n, 100_000), replace=False)]
+    for pq_m in (dim // 8, dim // 4, dim // 2):
+        start = time.perf_counter()
+        ivfpq = build_index(IndexSpec(kind="ivfpq", pq_m=pq_m), dim, sample, expected_size=n)
+        ivfpq.add(corpus)
+        build_s = time.perf_counter() - start
+        for nprobe in nprobes:
+            configure(ivfpq, IndexSpec(kind="ivfpq", nprobe=nprobe))
+            recall, latency = _measure(ivfpq, queries, truth)
+            rows.append({"index": "ivfpq", "param": f"m={pq_m},nprobe={nprobe}", "recall": recall,
+                         "latency_ms": latency, "bytes_per_vector": _bytes_per_vector(ivfpq), "build_s": build_s})
+
+    start = time.perf_counter()
+    hnsw = build_index(IndexSpec(kind="hnsw"), dim, sample)
+    hnsw.add(corpus)
+    build_s = time.perf_counter() - start
+    for ef in ef_searches:
+        configure(hnsw, IndexSpec(kind="hnsw", ef_search=ef))
+        recall, latency = _measure(hnsw, queries, truth)
+        rows.append({"index": "hnsw", "param": f"efSearch={ef}", "recall": recall, "latency_ms": latency,
+                     "bytes_per_vector": _bytes_per_vector(hnsw), "build_s": build_s})
+    return rows
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    print(f"{'index':>6} {'param':>17} {'recall@10':>10} {'ms/query':>9} {'bytes/vec':>10}")
+    for row in run(*args):
+        print(f"{row['index']:>6} {row['param']:>17} {row['recall']:>10.3f} {row['latency_ms']:>9.3f} "
+              f"{row['bytes_per_vector']:>10.0f}")
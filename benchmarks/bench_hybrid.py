@@ -0,0 +1,128 @@
+"""
+Retrieval quality (recall@k, MRR) and latency: dense vs BM25 vs hybrid (RRF) vs hybrid + rerank.
+
+Offline, so the embedding model is stood in for by hashed character-trigram vectors – like real
+embeddings they match morphological variants ("vomited" ~ "vomiting") but blur near-identical
+identifiers (E11.65 ~ E11.69). Two query sets exercise each side:
+  identifier – exact ICD code, drug and dose of one chunk;
+  paraphrase – the chunk's symptoms in other word forms, no token shared with the chunk.
+
+    python -m benchmarks.bench_hybrid [chunks]
+"""
+import sys
+import tempfile
+import time
+import zlib
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from app.rag.hybrid_retrieval import EmbeddingReranker
+from app.rag.vectorstore_service import VectorStoreService
+
+DIM = 256
+FETCH_K = 20
+TOP_N = 3  # What the reranker keeps
+QUERIES = 200
+
+CODES = [f"E11.{i}" for i in range(10)] + [f"E11.6{i}" for i in range(10)] + [f"I1{i}" for i in range(6)] + \
+        [f"J45.{i}0" for i in range(10)] + [f"N18.{i}" for i in range(1, 7)]
+DRUGS = ["metformin", "metoprolol", "lisinopril", "losartan", "atorvastatin", "amlodipine", "insulin glargine",
+         "empagliflozin", "sitagliptin", "salbutamol", "budesonide", "furosemide"]
+DOSES = [2.5, 5, 10, 20, 25, 40, 50, 80, 100, 250, 500, 850, 1000]
+# (as written in the note, as asked in a query)
+SYMPTOMS = [("vomiting", "vomited"), ("dizziness", "dizzy"), ("coughing", "coughs"), ("swelling", "swollen"),
+            ("fatigue", "fatigued"), ("wheezing", "wheezes"), ("palpitations", "palpitating"),
+            ("numbness", "numb"), ("itching", "itchy"), ("bleeding", "bled"), ("sweating", "sweaty"),
+            ("breathlessness", "breathless"), ("tingling", "tingly"), ("confusion", "confused"),
+            ("weakness", "weak"), ("nausea", "nauseated"), ("fainting", "fainted"), ("bloating", "bloated"),
+            ("stiffness", "stiff"), ("thirstiness", "thirsty")]
+
+
+class TrigramEmbeddings(Embeddings):
+    """
+    Deterministic stand-in for an embedding model: hashed character trigrams, unit length.
+    Memoized like CachedEmbeddings, so the reranker re-reads chunk vectors instead of recomputing them.
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def _embed(self, text):
+        if text not in self._cache:
+            self._cache[text] = self._compute(text)
+        return self._cache[text]
+
+    def _compute(self, text):
+        vector = np.zeros(DIM, dtype=np.float32)
+        for word in text.lower().split():
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                vector[zlib.crc32(padded[i:i + 3].encode()) % DIM] += 1.0
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def corpus(n, rng):
+    """n chunks, each with a unique (code, drug, dose) and a unique set of four symptoms (n ≤ ~4000)."""
+    chunks, identifier_queries, paraphrase_queries = [], [], []
+    seen = set()
+    while len(chunks) < n:
+        code, drug, dose = CODES[rng.integers(len(CODES))], DRUGS[rng.integers(len(DRUGS))], DOSES[rng.integers(len(DOSES))]
+        symptoms = tuple(sorted(rng.choice(len(SYMPTOMS), 4, replace=False)))
+        if (code, drug, dose) in seen or symptoms in seen:
+            continue
+        seen.update([(code, drug, dose), symptoms])
+        written = ", ".join(SYMPTOMS[s][0] for s in symptoms)
+        chunks.append(f"Assessment: {code}. Plan: continue {drug} {dose}mg daily. Reports {written} since last visit.")
+        identifier_queries.append(f"{code} on {drug} {dose}mg")
+        paraphrase_queries.append("patient " + " and ".join(SYMPTOMS[s][1] for s in symptoms))
+    return chunks, identifier_queries, paraphrase_queries
+
+
+def _evaluate(search, queries, gold, k):
+    recall, reciprocal_ranks, latencies = 0, 0.0, []
+    for query, target in zip(queries, gold):
+        start = time.perf_counter()
+        hits = [d.page_content for d in search(query)]
+        latencies.append(time.perf_counter() - start)
+        if target in hits[:k]:
+            recall += 1
+            reciprocal_ranks += 1 / (hits.index(target) + 1)
+    return recall / len(queries), reciprocal_ranks / len(queries), 1000 * float(np.mean(latencies))
+
+
+def run(n=2000, k=5):
+    rng = np.random.default_rng(0)
+    chunks, identifier_queries, paraphrase_queries = corpus(n, rng)
+    with tempfile.TemporaryDirectory() as path:
+        service = VectorStoreService(path, embeddings=TrigramEmbeddings(), save_delay=3600)
+        docs = [Document(page_content=c, metadata={"source": "bench"}) for c in chunks]
+        service.add_embeddings(docs, service.embeddings.embed_documents(chunks), [str(i) for i in range(n)])
+        reranker = EmbeddingReranker(service.embeddings)
+        methods = {
+            f"dense@{k}": (lambda q: service.similarity_search(q, k=k), k),
+            f"bm25@{k}": (lambda q: service.keyword_search(q, k=k), k),
+            f"hybrid@{k}": (lambda q: service.hybrid_search(q, k=k, fetch_k=FETCH_K), k),
+            f"hybrid@{TOP_N}": (lambda q: service.hybrid_search(q, k=TOP_N, fetch_k=FETCH_K), TOP_N),
+            f"hybrid+rerank@{TOP_N}": (lambda q: reranker.rerank(q, service.hybrid_search(q, k=FETCH_K), TOP_N), TOP_N),
+        }
+        picks = rng.choice(n, QUERIES, replace=False)
+        rows = []
+        for name, (search, cutoff) in methods.items():
+            for label, queries in (("identifier", identifier_queries), ("paraphrase", paraphrase_queries)):
+                recall, mrr, latency = _evaluate(search, [queries[i] for i in picks], [chunks[i] for i in picks], cutoff)
+                rows.append({"method": name, "queries": label, "recall": recall, "mrr": mrr, "latency_ms": latency})
+        service._dirty = False  # Nothing to persist
+    return rows
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    print(f"{'method':>18} {'queries':>11} {'recall':>7} {'MRR':>6} {'ms/query':>9}")
+    for row in run(*args):
+        print(f"{row['method']:>18} {row['queries']:>11} {row['recall']:>7.3f} {row['mrr']:>6.3f} {row['latency_ms']:>9.2f}")
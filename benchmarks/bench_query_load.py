@@ -0,0 +1,64 @@
+"""
+/query throughput under N concurrent chat sessions.
+
+The orchestrator is replaced by fixed-latency blocking work (a stand-in for an Ollama round
+trip), so the numbers isolate the API's admission control: throughput should scale with
+QUERY_WORKERS, and sessions beyond workers + queue get fast 429s instead of stalling everyone.
+
+    python -m benchmarks.bench_query_load
+"""
+import asyncio
+import statistics
+import time
+import httpx
+import app.main as main
+from app.workers import BoundedExecutor
+
+LLM_LATENCY = 0.2  # Seconds of blocking work per query
+QUERIES_PER_SESSION = 5
+
+
+class FixedLatencyOrchestrator:
+    def invoke(self, input_data):
+        time.sleep(LLM_LATENCY)
+        return {"response": "ok"}
+
+
+async def _session(client, session_id, latencies, statuses):
+    for i in range(QUERIES_PER_SESSION):
+        start = time.perf_counter()
+        response = await client.post("/query", json={"query": f"q{i}", "documents": [], "session_id": session_id})
+        statuses.append(response.status_code)
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+
+
+async def _run(sessions, workers, queue):
+    main.orchestrator = FixedLatencyOrchestrator()
+    main.query_executor = BoundedExecutor(workers, queue, per_key_limit=2)
+    latencies, statuses = [], []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(_session(client, f"s{n}", latencies, statuses) for n in range(sessions)))
+        elapsed = time.perf_counter() - start
+    ok = statuses.count(200)
+    return {
+        "sessions": sessions,
+        "workers": workers,
+        "ok": ok,
+        "rejected_429": statuses.count(429),
+        "throughput_rps": ok / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p95_ms": statistics.quantiles(latencies, n=20, method="inclusive")[-1] * 1000 if len(latencies) > 1 else None,
+    }
+
+
+def run(session_counts=(1, 4, 16, 64), workers=4, queue=16):
+    return [asyncio.run(_run(n, workers, queue)) for n in session_counts]
+
+
+if __name__ == "__main__":
+    print(f"{'sessions':>8} {'ok':>5} {'429':>5} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in run():
+        print(f"{row['sessions']:>8} {row['ok']:>5} {row['rejected_429']:>5} {row['throughput_rps']:>7.1f} "
+              f"{row['p50_ms']:>8.0f} {row['p95_ms'] or 0:>8.0f}")
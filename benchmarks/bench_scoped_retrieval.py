@@ -0,0 +1,88 @@
+"""
+Scoped retrieval latency vs total corpus size.
+
+The request's documents stay the same size (SCOPE chunks) while the global index grows;
+scoped search should stay flat, while an unscoped search and an ID-selector search over
+the full flat index grow linearly. Hybrid mode adds BM25 over the same chunks, fused with
+the dense hits by reciprocal rank fusion as VectorStoreService.hybrid_search does – the
+scoped variant should stay flat too, since BM25 only looks up the scope's postings.
+
+    python -m benchmarks.bench_scoped_retrieval
+"""
+import random
+import time
+import faiss
+import numpy as np
+from app.rag.bm25_index import BM25Index
+from app.rag.hybrid_retrieval import reciprocal_rank_fusion
+from app.rag.scoped_search import scoped_search
+from benchmarks.corpus import paragraph
+
+DIM = 768  # nomic-embed-text
+SCOPE = 400  # ~ one long clinical PDF at chunk_size=500
+K = 5
+FETCH_K = 20  # HYBRID_FETCH_K default
+REPEATS = 50
+QUERY = "metformin dose for type 2 diabetes and HbA1c"  # Common terms – long postings lists
+
+
+def _time_ms(fn):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        fn()
+    return (time.perf_counter() - start) * 1000 / REPEATS
+
+
+def _hybrid(index, bm25, query, positions=None):
+    """Dense + BM25 candidates fused – the work hybrid_search does under the read lock, minus embedding."""
+    if positions is None:
+        _, hits = index.search(query[None, :], FETCH_K)
+        hits, allowed = hits[0], None
+    else:
+        _, hits = scoped_search(index, query, positions, FETCH_K)
+        allowed = {str(p) for p in positions}
+    dense = [str(i) for i in hits]
+    lexical = [i for i, _ in bm25.search(QUERY, FETCH_K, allowed)]
+    return reciprocal_rank_fusion([dense, lexical])[:K]
+
+
+def run(corpus_sizes=(10_000, 50_000, 200_000)):
+    rng = np.random.default_rng(0)
+    text_rng = random.Random(0)
+    query = rng.standard_normal(DIM).astype(np.float32)
+    bm25 = BM25Index()  # Grown alongside each corpus – chunk id = FAISS row
+    results = []
+    for size in corpus_sizes:
+        index = faiss.IndexFlatL2(DIM)
+        index.add(rng.standard_normal((size, DIM)).astype(np.float32))
+        start = len(bm25)
+        bm25.add([str(i) for i in range(start, size)], [paragraph(text_rng) for _ in range(start, size)])
+        positions = rng.choice(size, SCOPE, replace=False)
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(positions))
+
+        row = {
+            "corpus": size,
+            "scoped_ms": _time_ms(lambda: scoped_search(index, query, positions, K)),
+            "selector_full_scan_ms": _time_ms(lambda: index.search(query[None, :], K, params=params)),
+            "global_ms": _time_ms(lambda: index.search(query[None, :], K)),
+            "hybrid_scoped_ms": _time_ms(lambda: _hybrid(index, bm25, query, positions)),
+            "hybrid_global_ms": _time_ms(lambda: _hybrid(index, bm25, query)),
+        }
+        # Same answer as the selector-restricted exhaustive search
+        _, expected = index.search(query[None, :], K, params=params)
+        _, got = scoped_search(index, query, positions, K)
+        assert list(got) == list(expected[0])
+        # Scoped BM25 ranks exactly like scoring everything and filtering afterwards
+        allowed = {str(p) for p in positions}
+        ranked = [hit for hit in bm25.search(QUERY, len(bm25)) if hit[0] in allowed]
+        assert bm25.search(QUERY, FETCH_K, allowed) == ranked[:FETCH_K]
+        results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'corpus':>10} {'scoped ms':>10} {'selector ms':>12} {'global ms':>10} "
+          f"{'hybrid scoped ms':>17} {'hybrid global ms':>17}")
+    for row in run():
+        print(f"{row['corpus']:>10} {row['scoped_ms']:>10.3f} {row['selector_full_scan_ms']:>12.3f} "
+              f"{row['global_ms']:>10.3f} {row['hybrid_scoped_ms']:>17.3f} {row['hybrid_global_ms']:>17.3f}")
@@ -0,0 +1,319 @@
+"""
+End-to-end benchmark suite: ingestion throughput, QA latency, report generation and concurrent
+/query load, run against the fake Ollama server from the test suite and a synthetic corpus
+(benchmarks.corpus) – no models, no network, no sample files.
+
+Each run starts in a fresh temporary working directory, so the index, every cache and the session
+store begin empty and ./vectorstore is never touched. Latencies are reported pytest-benchmark
+style (rounds, min/max/mean/stddev, p50/p95), along with the per-stage timings app.metrics
+collected during the run. Results are written to JSON – by default benchmarks/results/<commit>.json –
+and `compare` flags regressions between two result files.
+
+    python -m benchmarks.bench_suite [--scenarios ingest,qa,report,load] [--quick] [--out results.json]
+    python -m benchmarks.bench_suite compare <old.json> <new.json> [--threshold 0.1]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from benchmarks.corpus import CONDITIONS, DRUGS, SECTIONS, build_corpus
+from tests.fake_ollama import FakeOllamaServer
+
+SCENARIOS = ("ingest", "qa", "report", "load")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Shape of a local llama3:8b / nomic-embed-text, scaled down so a full run takes a couple of minutes
+OLLAMA = {"dim": 768, "latency": 0.0, "embed_latency": 0.002, "first_token_latency": 0.15, "token_latency": 0.01}
+FULL = {"pdfs": 8, "docx": 8, "xlsx": 4, "images": 2, "pdf_pages": 10, "qa_rounds": 20, "report_rounds": 5,
+        "sessions": (1, 4, 16), "queries_per_session": 4}
+QUICK = {"pdfs": 2, "docx": 2, "xlsx": 1, "images": 1, "pdf_pages": 3, "qa_rounds": 5, "report_rounds": 2,
+         "sessions": (1, 4), "queries_per_session": 2}
+
+
+def timings(samples):
+    """pytest-benchmark style summary of `samples` (seconds), in milliseconds."""
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "rounds": len(ms),
+        "min_ms": ms[0],
+        "max_ms": ms[-1],
+        "mean_ms": statistics.fmean(ms),
+        "stddev_ms": statistics.stdev(ms) if len(ms) > 1 else 0.0,
+        "p50_ms": statistics.median(ms),
+        "p95_ms": statistics.quantiles(ms, n=20, method="inclusive")[-1] if len(ms) > 1 else ms[0],  # Never beyond max
+    }
+
+
+def measure(fn, rounds, warmup=1):
+    """Calls fn() warmup + rounds times; timings of the measured rounds plus the first (cold) call."""
+    samples = []
+    for i in range(warmup + rounds):
+        start = time.perf_counter()
+        fn(i)
+        elapsed = time.perf_counter() - start
+        if i == 0:
+            cold = elapsed
+        if i >= warmup:
+            samples.append(elapsed)
+    return {"cold_ms": cold * 1000, **timings(samples)}
+
+
+def _question(i):
+    return f"What dose of {DRUGS[i % len(DRUGS)]} was started for {CONDITIONS[i % len(CONDITIONS)]}? ({i})"
+
+
+class Suite:
+    """Scenarios share one working directory, corpus and fake Ollama – later ones reuse the indexed corpus."""
+
+    def __init__(self, workdir, server, sizes):
+        self.workdir = workdir
+        self.server = server
+        self.sizes = sizes
+        self.corpus = None
+
+    @property
+    def documents(self):
+        return [path for paths in self.corpus.values() for path in paths]
+
+    def _ensure_corpus(self):
+        if self.corpus is None:
+            images = self.sizes["images"] if shutil.which("tesseract") else 0  # Images need the OCR binary
+            self.corpus = build_corpus(os.path.join(self.workdir, "corpus"), self.sizes["pdfs"], self.sizes["docx"],
+                                       self.sizes["xlsx"], images, pdf_pages=self.sizes["pdf_pages"])
+        return self.corpus
+
+    def ingest(self):
+        """Cold indexing of the whole corpus (parse + chunk + embed + index), then the no-op re-upload."""
+        from app.agents.document_loader import DocumentLoaderAgent
+        from app.agents.parsers import get_parse_pool
+        from app.config import PARSE_WORKERS
+        self._ensure_corpus()
+        start = time.perf_counter()
+        list(get_parse_pool().map(abs, range(PARSE_WORKERS)))  # Spawned once per process – not per upload
+        pool_start = time.perf_counter() - start
+
+        loader = DocumentLoaderAgent()
+        embedded_before = self.server.embedded_texts
+        start = time.perf_counter()
+        loader.load_documents(self.documents)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        loader.load_documents(self.documents)
+        warm = time.perf_counter() - start
+        chunks = loader.store.index_stats()["vectors"]
+        return {
+            "documents": {kind: len(paths) for kind, paths in self.corpus.items()},
+            "chunks": chunks,
+            "embedded_texts": self.server.embedded_texts - embedded_before,
+            "pool_start_seconds": pool_start,
+            "cold_seconds": cold,
+            "documents_per_second": len(self.documents) / cold,
+            "chunks_per_second": chunks / cold,
+            "reingest_ms": warm * 1000,
+        }
+
+    def _ensure_indexed(self):
+        if self.corpus is None:
+            self.ingest()
+
+    def qa(self):
+        """QAAgent directly – retrieval alone, then full answers (distinct questions, no answer cache)."""
+        from app.rag.rag_pipeline import get_qa_agent
+        self._ensure_indexed()
+        agent, rounds = get_qa_agent(), self.sizes["qa_rounds"]
+        return {
+            "retrieve": measure(lambda i: agent.retrieve(_question(i), self.documents), rounds),
+            "answer": measure(lambda i: agent.answer(_question(i), f"bench-qa-{i}", self.documents), rounds),
+        }
+
+    def report(self):
+        """The full report flow – sections extracted in parallel, a summary, a table and PDF assembly."""
+        from app.agents.orchestrator import Orchestrator
+        self._ensure_indexed()
+        orchestrator = Orchestrator()
+        documents = [self.corpus["pdf"][0], self.corpus["docx"][0]]
+        query = f"Generate a report with {SECTIONS[0]}, {SECTIONS[2]}, Table on page 2, Summary"
+        sizes = []
+
+        def generate(i):
+            report = orchestrator.invoke({"query": query, "documents": documents, "session_id": f"bench-report-{i}"})
+            response = report["response"]
+            sizes.append(len(response.read()))
+            response.close()
+
+        # Round one fills the table, summary and image caches; the rest show the warm path
+        return {**measure(generate, self.sizes["report_rounds"]), "pdf_bytes": sizes[-1]}
+
+    def load(self):
+        """Concurrent sessions against the real app (orchestrator included) through /query."""
+        import httpx
+        import app.main as main
+        self._ensure_indexed()
+        documents = self.documents
+
+        async def session(client, n, latencies, statuses):
+            for i in range(self.sizes["queries_per_session"]):
+                body = {"query": _question(n * 100 + i), "documents": documents, "session_id": f"bench-load-{n}"}
+                start = time.perf_counter()
+                response = await client.post("/query", json=body)
+                statuses.append(response.status_code)
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+
+        async def run(sessions):
+            latencies, statuses = [], []
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench",
+                                         timeout=None) as client:
+                start = time.perf_counter()
+                await asyncio.gather(*(session(client, n, latencies, statuses) for n in range(sessions)))
+                elapsed = time.perf_counter() - start
+            ok = statuses.count(200)
+            return {"sessions": sessions, "ok": ok, "rejected_429": statuses.count(429),
+                    "other_errors": len(statuses) - ok - statuses.count(429),
+                    "throughput_per_second": ok / elapsed, **(timings(latencies) if latencies else {})}
+
+        return {f"sessions_{n}": asyncio.run(run(n)) for n in self.sizes["sessions"]}
+
+
+def stage_breakdown():
+    """Per-stage count and mean from app.metrics – where the time in the scenarios went."""
+    from app.metrics import STAGE_SECONDS
+    totals = {}
+    for family in STAGE_SECONDS.collect():
+        for sample in family.samples:
+            if sample.name.endswith(("_count", "_sum")):
+                totals.setdefault(sample.labels["stage"], {})[sample.name.rsplit("_", 1)[1]] = sample.value
+    return {stage: {"count": int(t["count"]), "mean_ms": t["sum"] * 1000 / t["count"]}
+            for stage, t in sorted(totals.items()) if t.get("count")}
+
+
+def _commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+@contextmanager
+def environment(ollama):
+    """Fake Ollama plus a throwaway working directory; must be entered before anything imports app.config."""
+    cwd, workdir = os.getcwd(), tempfile.mkdtemp(prefix="bench-")
+    with FakeOllamaServer(**ollama) as server:
+        os.environ["OLLAMA_HOST"] = server.url  # Picked up by every ChatOllama / OllamaEmbeddings client
+        os.environ.setdefault("MEMORY_BACKEND", "memory")
+        os.chdir(workdir)  # Relative index, cache and session paths all land here
+        try:
+            yield workdir, server
+        finally:
+            if "app.rag.vectorstore_service" in sys.modules:
+                # Write pending index/cache state now – the exit-time flush would land in the real cwd
+                from app.rag.vectorstore_service import get_vectorstore_service
+                get_vectorstore_service().flush()
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(scenarios=SCENARIOS, sizes=FULL, ollama=OLLAMA):
+    sys.path.insert(0, os.getcwd())  # Parse workers are spawned from the temp dir – keep `app` importable
+    results = {"meta": {
+        "commit": _commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "ollama": ollama,
+        "sizes": {k: list(v) if isinstance(v, tuple) else v for k, v in sizes.items()},
+        "ocr": bool(shutil.which("tesseract")),
+    }, "scenarios": {}}
+    with environment(ollama) as (workdir, server):
+        suite = Suite(workdir, server, sizes)
+        for name in scenarios:
+            start = time.perf_counter()
+            results["scenarios"][name] = getattr(suite, name)()
+            print(f"{name}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        results["stages"] = stage_breakdown()
+    return results
+
+
+def _flatten(data, prefix=""):
+    for key, value in data.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
+
+
+def _direction(metric):
+    """+1 when bigger is better, -1 when smaller is, 0 for counts, sizes and single-sample extremes (min/max)."""
+    if metric.endswith("per_second"):
+        return 1
+    if metric.endswith(("p50_ms", "p95_ms", "mean_ms", "cold_ms", "reingest_ms", "cold_seconds")):
+        return -1
+    return 0
+
+
+def compare(old, new, threshold=0.1):
+    """Rows (metric, old, new, relative change, regressed) for every timing/throughput both runs have."""
+    old_values, new_values = dict(_flatten(old["scenarios"])), dict(_flatten(new["scenarios"]))
+    rows = []
+    for metric, before in old_values.items():
+        direction = _direction(metric)
+        if not direction or metric not in new_values or not before:
+            continue
+        after = new_values[metric]
+        change = (after - before) / before
+        rows.append((metric, before, after, change, change * direction < -threshold))
+    return rows
+
+
+def _main():
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        parser = argparse.ArgumentParser(prog="bench_suite compare")
+        parser.add_argument("old")
+        parser.add_argument("new")
+        parser.add_argument("--threshold", type=float, default=0.1, help="Relative change counted as a regression")
+        args = parser.parse_args(sys.argv[2:])
+        with open(args.old) as f_old, open(args.new) as f_new:
+            old, new = json.load(f_old), json.load(f_new)
+        print(f"{old['meta']['commit']} → {new['meta']['commit']}")
+        if old["meta"].get("sizes") != new["meta"].get("sizes") or old["meta"].get("ollama") != new["meta"].get("ollama"):
+            print("warning: the runs used different corpus sizes or Ollama latencies – timings are not comparable")
+        rows = compare(old, new, args.threshold)
+        for metric, before, after, change, regressed in rows:
+            print(f"{'REGRESSED' if regressed else '':>9} {metric:<45} {before:>12.2f} {after:>12.2f} {change:>+8.1%}")
+        sys.exit(1 if any(row[4] for row in rows) else 0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--quick", action="store_true", help="Small corpus and few rounds – a smoke run")
+    parser.add_argument("--out", help="Result file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    results = run(scenarios, QUICK if args.quick else FULL)
+    out = args.out or os.path.join(RESULTS_DIR, f"{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results["scenarios"], indent=2))
+    print(f"Results written to {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    _main()
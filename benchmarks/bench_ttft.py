@@ -0,0 +1,58 @@
+"""
+Time-to-first-token of a streamed QA answer vs total latency of the blocking answer.
+
+Ollama is replaced by the fake server from the test suite, which emits the reply word by
+word with a fixed prefill delay and per-token delay – the same shape as a local llama3:8b.
+Streaming should put the first token on screen after roughly the prefill delay, while the
+blocking call waits for the whole answer.
+
+    python -m benchmarks.bench_ttft
+"""
+import os
+import statistics
+import time
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores import FAISS
+from tests.fake_ollama import FakeOllamaServer
+
+FIRST_TOKEN_LATENCY = 0.4  # Prompt evaluation
+TOKEN_LATENCY = 0.03  # ~33 tokens/s generation
+REPLY = " ".join(["Metformin remains first-line therapy for type 2 diabetes."] * 8)
+REPEATS = 5
+
+
+def run(repeats=REPEATS):
+    with FakeOllamaServer(reply=REPLY, first_token_latency=FIRST_TOKEN_LATENCY, token_latency=TOKEN_LATENCY) as server:
+        os.environ["OLLAMA_HOST"] = server.url  # Picked up by the ollama client ChatOllama creates
+        from app.rag.rag_pipeline import QAAgent
+
+        vectorstore = FAISS.from_texts(["Metformin is first-line therapy."] * 10, FakeEmbeddings(size=16))
+        agent = QAAgent(vectorstore=vectorstore)
+
+        ttft, stream_total, blocking_total = [], [], []
+        for i in range(repeats):
+            start = time.perf_counter()
+            first = None
+            for _ in agent.stream("What is first-line therapy?", session_id=f"stream-{i}"):
+                if first is None:
+                    first = time.perf_counter() - start
+            stream_total.append(time.perf_counter() - start)
+            ttft.append(first)
+
+            start = time.perf_counter()
+            agent.answer("What is first-line therapy?", session_id=f"blocking-{i}")
+            blocking_total.append(time.perf_counter() - start)
+
+    return {
+        "tokens": len(REPLY.split(" ")),
+        "stream_ttft_ms": statistics.median(ttft) * 1000,
+        "stream_total_ms": statistics.median(stream_total) * 1000,
+        "blocking_total_ms": statistics.median(blocking_total) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    row = run()
+    print(f"{row['tokens']} tokens")
+    print(f"streamed: first token {row['stream_ttft_ms']:.0f} ms, complete {row['stream_total_ms']:.0f} ms")
+    print(f"blocking: answer after {row['blocking_total_ms']:.0f} ms")
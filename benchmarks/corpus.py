@@ -0,0 +1,143 @@
+"""
+Synthetic, seeded clinical corpus for the benchmarks – PDF, DOCX, XLSX and scanned-note images.
+
+Documents are built from a small medical vocabulary with known section headings (Introduction,
+Medications, Findings, Summary, ...) and a lab table on page 2 of every PDF, so every ingestion,
+retrieval and report path has something realistic to chew on. The same seed gives the same text,
+tables and pixels; PDFs are written with ReportLab's invariant mode so their bytes repeat too.
+
+    python -m benchmarks.corpus <directory> [pdfs] [docx] [xlsx] [images]
+"""
+import os
+import random
+import sys
+
+SECTIONS = ["Introduction", "History", "Medications", "Findings", "Assessment and Plan", "Summary"]
+DRUGS = ["metformin", "metoprolol", "lisinopril", "losartan", "atorvastatin", "amlodipine", "insulin glargine",
+         "empagliflozin", "sitagliptin", "salbutamol", "budesonide", "furosemide", "apixaban", "omeprazole"]
+DOSES = ["2.5mg", "5mg", "10mg", "20mg", "40mg", "50mg", "100mg", "250mg", "500mg", "850mg", "1000mg"]
+FREQUENCIES = ["once daily", "twice daily", "three times daily", "at night", "as needed"]
+CONDITIONS = ["type 2 diabetes", "hypertension", "chronic kidney disease", "asthma", "atrial fibrillation",
+              "heart failure", "hyperlipidemia", "COPD", "hypothyroidism", "gastroesophageal reflux"]
+SYMPTOMS = ["fatigue", "dizziness", "shortness of breath", "palpitations", "chest tightness", "nausea",
+            "peripheral edema", "polyuria", "wheezing", "headache"]
+LABS = [("HbA1c", "%", 5.0, 10.0), ("LDL", "mg/dL", 60, 190), ("eGFR", "mL/min", 25, 110),
+        ("Potassium", "mmol/L", 3.2, 5.6), ("Sodium", "mmol/L", 131, 147), ("Creatinine", "mg/dL", 0.6, 2.4),
+        ("Hemoglobin", "g/dL", 9.5, 16.5), ("TSH", "mIU/L", 0.3, 6.5)]
+
+
+def sentence(rng):
+    templates = [
+        "The patient reports {symptom} for {days} days, worse on exertion.",
+        "{drug} {dose} {frequency} was continued for {condition}.",
+        "Known history of {condition}, managed in primary care since {year}.",
+        "Examination was notable for {symptom}; vital signs were otherwise stable.",
+        "{drug} was started at {dose} {frequency} and will be reviewed in {days} days.",
+        "Laboratory review showed {lab} outside the reference range, consistent with {condition}.",
+        "No adverse events were reported after the dose of {drug} was changed to {dose}.",
+    ]
+    return rng.choice(templates).format(
+        symptom=rng.choice(SYMPTOMS), days=rng.randint(2, 30), drug=rng.choice(DRUGS).capitalize(),
+        dose=rng.choice(DOSES), frequency=rng.choice(FREQUENCIES), condition=rng.choice(CONDITIONS),
+        year=rng.randint(2005, 2023), lab=rng.choice(LABS)[0],
+    )
+
+
+def paragraph(rng, sentences=(3, 6)):
+    return " ".join(sentence(rng) for _ in range(rng.randint(*sentences)))
+
+
+def lab_rows(rng, rows=None):
+    """Header plus one row per lab – values drawn from each lab's plausible range."""
+    labs = LABS if rows is None else [LABS[i % len(LABS)] for i in range(rows)]
+    body = [[name, f"{rng.uniform(low, high):.1f}", unit, f"{low}-{high}"] for name, unit, low, high in labs]
+    return [["Test", "Result", "Units", "Reference"]] + body
+
+
+def make_pdf(path, rng, pages=5):
+    """Headed sections over `pages` pages, with the lab table opening page 2."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, PageBreak
+    styles = getSampleStyleSheet()
+    elements = []
+    for page in range(pages):
+        if page:
+            elements.append(PageBreak())
+        if page == 1:
+            elements.append(Paragraph("Laboratory results on admission:", styles["Normal"]))
+            elements.append(Table(lab_rows(rng)))
+        section = SECTIONS[page % len(SECTIONS)]
+        elements.append(Paragraph(section.upper(), styles["Heading2"]))
+        for _ in range(4):
+            elements.append(Paragraph(paragraph(rng), styles["Normal"]))
+    SimpleDocTemplate(path, pagesize=letter, invariant=True).build(elements)
+    return path
+
+
+def make_docx(path, rng, paragraphs_per_section=6):
+    from docx import Document as DocxDocument
+    doc = DocxDocument()
+    for section in SECTIONS:
+        doc.add_paragraph(section.upper())
+        for _ in range(paragraphs_per_section):
+            doc.add_paragraph(paragraph(rng))
+    doc.save(path)
+    return path
+
+
+def make_xlsx(path, rng, rows=200):
+    """A medication sheet and a lab sheet – the shapes extract_table() hands to reports."""
+    import pandas as pd
+    medications = pd.DataFrame(
+        [[rng.choice(DRUGS), rng.choice(DOSES), rng.choice(FREQUENCIES), rng.choice(CONDITIONS)] for _ in range(rows)],
+        columns=["Drug", "Dose", "Frequency", "Indication"],
+    )
+    rows_ = lab_rows(rng, rows)
+    labs = pd.DataFrame(rows_[1:], columns=rows_[0])
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        medications.to_excel(writer, sheet_name="Medications", index=False)
+        labs.to_excel(writer, sheet_name="Labs", index=False)
+    return path
+
+
+def make_image(path, rng, lines=18, size=(1700, 2200)):
+    """A 'scanned' note – dark text on a slightly uneven, noisy page, as OCR sees from a phone photo."""
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+    image = Image.new("L", size, 235)
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=36)
+    except TypeError:  # Pillow < 10.1 has a single bitmap size
+        font = ImageFont.load_default()
+    y = 120
+    for i in range(lines):
+        text = SECTIONS[i // 3 % len(SECTIONS)].upper() if i % 3 == 0 else sentence(rng)[:70]
+        draw.text((100, y), text, fill=30, font=font)
+        y += 100
+    noise = np.random.default_rng(rng.randint(0, 2 ** 31)).normal(0, 12, (size[1], size[0]))
+    pixels = np.clip(np.asarray(image, dtype=np.float32) + noise, 0, 255).astype(np.uint8)
+    Image.fromarray(pixels).save(path)
+    return path
+
+
+def build_corpus(directory, pdfs=4, docx=4, xlsx=2, images=2, seed=0, pdf_pages=5):
+    """Writes the corpus to `directory`; returns {"pdf": [paths], "docx": [...], "xlsx": [...], "image": [...]}."""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    makers = [("pdf", pdfs, ".pdf", lambda p: make_pdf(p, rng, pdf_pages)),
+              ("docx", docx, ".docx", lambda p: make_docx(p, rng)),
+              ("xlsx", xlsx, ".xlsx", lambda p: make_xlsx(p, rng)),
+              ("image", images, ".png", lambda p: make_image(p, rng))]
+    corpus = {}
+    for kind, count, extension, make in makers:
+        corpus[kind] = [make(os.path.join(directory, f"{kind}_{i:03d}{extension}")) for i in range(count)]
+    return corpus
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else "bench_corpus"
+    counts = [int(n) for n in sys.argv[2:6]]
+    for kind, paths in build_corpus(directory, *counts).items():
+        print(f"{kind:>6}: {len(paths)} file(s) in {directory}")
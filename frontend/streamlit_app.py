@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import json
 import os
 from uuid import uuid4
 
@@ -29,6 +30,8 @@ if uploaded_files:
     if response.status_code == 200:
         st.success(f"Uploaded: {', '.join([f.name for f in uploaded_files])}")
         document_paths = response.json()["files"]
+        if response.json().get("jobs"):
+            st.info("Indexing in the background – you can start asking questions.")
     else:
         st.error("Upload failed")
 
@@ -40,18 +43,48 @@ for msg in st.session_state.chat_history:
 # Input
 query = st.chat_input("Ask a question or say: Generate report with Introduction and Summary")
 
+def stream_tokens(response):
+    """Yield answer tokens from the /query/stream Server-Sent Events."""
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data = json.loads(line[len("data:"):])
+            if event == "error":
+                raise RuntimeError(data.get("detail", "Streaming failed"))
+            if event != "done":
+                yield data.get("token", "")
+        elif not line:
+            event = None
+
+
 if query and document_paths:
     payload = {"query": query, "documents": document_paths, "session_id": st.session_state.session_id}
+    st.session_state.chat_history.append({"role": "user", "content": query})
+    with st.chat_message("user"):
+        st.write(query)
+
     with st.spinner("Processing..."):
-        response = requests.post("http://localhost:8000/query", json=payload)
+        response = requests.post("http://localhost:8000/query/stream", json=payload, stream=True)
 
     if response.status_code == 200:
         if "application/pdf" in response.headers.get("content-type", ""):
             st.session_state.chat_history.append({"role": "assistant", "content": "Report ready!"})
             st.download_button("Download Report PDF", response.content, "report.pdf", "application/pdf")
         else:
-            data = response.json()
-            resp = data.get("response", "")
-            st.session_state.chat_history.append({"role": "user", "content": query})
+            with st.chat_message("assistant"):
+                resp = st.write_stream(stream_tokens(response))  # Renders tokens as they arrive
             st.session_state.chat_history.append({"role": "assistant", "content": resp})
-            st.rerun()
\ No newline at end of file
+            st.rerun()
+    elif response.status_code == 202:
+        st.info(response.json()["response"])  # Documents still indexing
+    elif response.status_code == 422:
+        body = response.json()
+        st.error(f"{body['response']} ({', '.join(os.path.basename(f) for f in body['files'])})")
+    elif response.status_code == 503:
+        st.warning(response.json()["response"])  # Indexing is retried by the next question
+    elif response.status_code == 429:
+        st.warning("The assistant is busy – please try again in a moment.")
+    else:
+        st.error("Query failed")
@@ -0,0 +1,42 @@
+import pytest
+from app import session_store
+from app.agents import ocr, section_index
+from app.agents.document_loader import DocumentLoaderAgent
+
+
+@pytest.fixture(autouse=True)
+def isolated_outlines(tmp_path, monkeypatch):
+    """Keeps section outlines written during tests out of the real vectorstore folder."""
+    monkeypatch.setattr(section_index, "_index", section_index.SectionIndex(str(tmp_path / "outlines")))
+
+
+@pytest.fixture(autouse=True)
+def isolated_sessions(monkeypatch):
+    """Conversation history stays in memory during tests instead of the shared SQLite file."""
+    monkeypatch.setattr(session_store, "_store", session_store.InMemorySessionStore())
+
+
+@pytest.fixture(autouse=True)
+def isolated_ocr_cache(tmp_path, monkeypatch):
+    """OCR results written during tests stay out of the real cache folder."""
+    monkeypatch.setattr(ocr, "_cache", ocr.OCRCache(str(tmp_path / "ocr")))
+
+
+@pytest.fixture
+def offline_loader(tmp_path):
+    """Loader backed by deterministic fake embeddings – no Ollama needed."""
+    from langchain_community.embeddings import FakeEmbeddings
+    agent = DocumentLoaderAgent(vectorstore_path=str(tmp_path / "index"), embeddings=FakeEmbeddings(size=16))
+    yield agent
+    agent.store.flush()
+
+
+@pytest.fixture
+def sample_docx(tmp_path):
+    from docx import Document as DocxDocument
+    path = tmp_path / "note.docx"
+    doc = DocxDocument()
+    for i in range(20):
+        doc.add_paragraph(f"Patient visit {i}: blood pressure stable, metformin 500mg continued.")
+    doc.save(path)
+    return str(path)
@@ -0,0 +1,153 @@
+"""Deterministic local stand-in for the Ollama HTTP API – no models, no GPU, no network."""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def fake_vector(text, dim):
+    """Stable pseudo-random unit vector per text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+DEFAULT_REPLY = "The documents indicate a stable clinical course with no adverse events reported."
+
+
+class FakeOllamaServer:
+    """
+    Serves /api/embed, /api/chat and (model loading only) /api/generate on a background thread.
+    `latency` is added to every request; the first `fail_first` requests return 503.
+    Chat replies stream word by word: `first_token_latency` before the first, `token_latency` between the rest.
+    Embedding requests additionally take `embed_latency` per input text, so batch size shows in timings.
+    """
+
+    def __init__(self, dim=64, latency=0.0, fail_first=0, reply=DEFAULT_REPLY,
+                 first_token_latency=0.0, token_latency=0.0, embed_latency=0.0, port=0):
+        self.dim = dim
+        self.latency = latency
+        self.fail_first = fail_first
+        self.reply = reply
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.embed_latency = embed_latency
+        self.requests = 0
+        self.embedded_texts = 0
+        self.loaded_models = []  # Models loaded by an empty-prompt /api/generate (a warm-up)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _chat(self, payload):
+                model = payload.get("model", "")
+                reply = server.reply(payload["messages"]) if callable(server.reply) else server.reply
+                words = reply.split(" ")
+                tokens = [w + " " for w in words[:-1]] + words[-1:]
+                final = {"model": model, "created_at": "2024-01-01T00:00:00Z", "done": True, "done_reason": "stop",
+                         "prompt_eval_count": sum(len(m.get("content", "").split()) for m in payload["messages"]),
+                         "eval_count": len(tokens), "eval_duration": int(server.token_latency * len(tokens) * 1e9)}
+                if not payload.get("stream", True):
+                    time.sleep(server.first_token_latency + server.token_latency * (len(tokens) - 1))
+                    return self._reply(200, {**final, "message": {"role": "assistant", "content": reply}})
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                for i, token in enumerate(tokens):
+                    time.sleep(server.first_token_latency if i == 0 else server.token_latency)
+                    chunk = {"model": model, "created_at": "2024-01-01T00:00:00Z",
+                             "message": {"role": "assistant", "content": token}, "done": False}
+                    self.wfile.write(json.dumps(chunk).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+                self.wfile.write(json.dumps({**final, "message": {"role": "assistant", "content": ""}}).encode("utf-8") + b"\n")
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    failing = server.requests <= server.fail_first
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    if failing:
+                        return self._reply(503, {"error": "server busy"})
+                    if self.path == "/api/embed":
+                        texts = payload.get("input", [])
+                        texts = [texts] if isinstance(texts, str) else texts
+                        with server._lock:
+                            server.embedded_texts += len(texts)
+                        if server.embed_latency:
+                            time.sleep(server.embed_latency * len(texts))
+                        return self._reply(200, {
+                            "model": payload.get("model", ""),
+                            "embeddings": [fake_vector(t, server.dim) for t in texts],
+                        })
+                    if self.path == "/api/chat":
+                        return self._chat(payload)
+                    if self.path == "/api/generate":
+                        with server._lock:
+                            server.loaded_models.append(payload.get("model", ""))
+                        return self._reply(200, {"model": payload.get("model", ""), "response": "", "done": True})
+                    return self._reply(404, {"error": f"unknown endpoint {self.path}"})
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+        return Handler
+
+
+if __name__ == "__main__":
+    # Stand-alone, for pointing a real `uvicorn app.main:app` at it: OLLAMA_HOST=http://127.0.0.1:11435
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--embed-latency", type=float, default=0.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.0)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    args = parser.parse_args()
+    with FakeOllamaServer(dim=args.dim, latency=args.latency, embed_latency=args.embed_latency, port=args.port,
+                          first_token_latency=args.first_token_latency, token_latency=args.token_latency) as server:
+        print(f"Fake Ollama listening on {server.url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
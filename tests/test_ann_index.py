@@ -0,0 +1,81 @@
+import os
+import numpy as np
+import pytest
+from langchain.schema import Document
+from langchain_community.embeddings import FakeEmbeddings
+from app.rag.ann_index import IndexSpec
+from app.rag.scoped_search import scoped_search
+from app.rag.vectorstore_service import VectorStoreService
+
+DIM = 16
+
+
+def _add(service, start, count, rng):
+    docs = [Document(page_content=f"chunk {i}", metadata={"source": "s.pdf"}) for i in range(start, start + count)]
+    vectors = rng.standard_normal((count, DIM)).astype(np.float32)
+    service.add_embeddings(docs, vectors.tolist(), [f"id-{i}" for i in range(start, start + count)])
+    return vectors
+
+def _service(path, **spec):
+    return VectorStoreService(str(path), embeddings=FakeEmbeddings(size=DIM), save_delay=0,
+                              index_spec=IndexSpec(train_size=400, **spec))
+
+@pytest.mark.parametrize("kind, index_type", [("ivfpq", "IndexIVFPQ"), ("hnsw", "IndexHNSWFlat")])
+def test_store_switches_to_configured_index_and_keeps_rows(tmp_path, kind, index_type):
+    rng = np.random.default_rng(0)
+    service = _service(tmp_path / kind, kind=kind, nprobe=64)
+    vectors = _add(service, 0, 500, rng)
+    store = service.vectorstore
+    assert type(store.index).__name__ == index_type
+
+    # Row order survives the rebuild – a stored vector still finds its own chunk
+    hit = store.similarity_search_by_vector(vectors[123].tolist(), k=1)[0]
+    assert hit.page_content == "chunk 123"
+    # Scoped search still reconstructs rows (IVF gets a direct map)
+    _, positions = scoped_search(store.index, vectors[7], np.arange(0, 50), k=1)
+    assert positions[0] == 7
+
+def test_flat_index_stays_flat_below_training_size(tmp_path):
+    service = _service(tmp_path, kind="ivfpq")
+    _add(service, 0, 100, np.random.default_rng(1))
+    assert service.index_stats()["type"] == "IndexFlatL2"
+
+def test_memory_mapped_index_reloads_for_writes(tmp_path):
+    rng = np.random.default_rng(2)
+    writer = _service(tmp_path, kind="ivfpq")
+    _add(writer, 0, 500, rng)
+    writer.mark_dirty()  # save_delay=0 – written now
+    writer.close()  # Hands writing over to the reader below
+
+    reader = _service(tmp_path, kind="ivfpq", mmap=True)
+    assert reader.vectorstore.index.ntotal == 500
+    assert reader.index_stats()["memory_mapped"]
+    _add(reader, 500, 10, rng)
+    assert reader.vectorstore.index.ntotal == 510
+    assert not reader.index_stats()["memory_mapped"]
+
+def test_memory_mapped_index_is_never_written_in_place(tmp_path):
+    rng = np.random.default_rng(3)
+    writer = _service(tmp_path, kind="ivfpq")
+    vectors = _add(writer, 0, 500, rng)
+    writer.mark_dirty()
+    writer.close()
+    os.remove(tmp_path / "bm25.pkl")  # Saved before BM25 existed – rebuilt on load
+    index_path = tmp_path / "index.faiss"
+    saved = os.stat(index_path)
+
+    reader = _service(tmp_path, kind="ivfpq", mmap=True, nprobe=64)
+    assert len(reader.vectorstore.index_to_docstore_id) == 500 and len(reader.bm25) == 500
+    assert os.path.exists(tmp_path / "bm25.pkl")
+    reader.flush()
+    assert os.stat(index_path).st_mtime_ns == saved.st_mtime_ns, "Rebuilding BM25 must not rewrite the index"
+
+    reader.mark_dirty()  # e.g. a registry change – the mapped file already holds this index
+    assert os.stat(index_path).st_mtime_ns == saved.st_mtime_ns
+    assert reader.index_stats()["memory_mapped"]
+    hit = reader.vectorstore.similarity_search_by_vector(vectors[42].tolist(), k=1)[0]
+    assert hit.page_content == "chunk 42"
+    assert _service(tmp_path, kind="ivfpq").vectorstore.index.ntotal == 500
+    _add(reader, 500, 10, rng)
+    reader.mark_dirty()
+    assert _service(tmp_path, kind="ivfpq", mmap=True).vectorstore.index.ntotal == 510
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+from app.rag.answer_cache import AnswerCache, is_follow_up
+from tests.fake_ollama import fake_vector
+
+
+class FakeStore:
+    """Fingerprint per document tuple; embeddings identical for identical normalized text."""
+
+    def __init__(self):
+        self.version = 1
+        self.embeddings = SimpleNamespace(embed_query=lambda text: fake_vector(text, 32))
+
+    def corpus_fingerprint(self, documents):
+        return f"{tuple(documents or ())}-v{self.version}"
+
+
+def _cache(**kwargs):
+    return AnswerCache(FakeStore(), threshold=0.99, **kwargs)
+
+def test_repeated_question_hits_after_normalization():
+    cache = _cache()
+    answer, key = cache.lookup("What is the dosage?", ["a.pdf"])
+    assert answer is None
+    cache.put(key, "500mg twice daily")
+    assert cache.lookup("  what is the DOSAGE ", ["a.pdf"])[0] == "500mg twice daily"
+    assert cache.lookup("What is the dosage?", ["b.pdf"])[0] is None, "Other documents must not share answers"
+    assert cache.stats()["hit_rate"] == 1 / 3
+
+def test_reindexed_documents_invalidate_answers():
+    cache = _cache()
+    _, key = cache.lookup("List adverse events", ["a.pdf"])
+    cache.put(key, "Nausea")
+    cache.store.version += 1
+    assert cache.lookup("List adverse events", ["a.pdf"])[0] is None
+
+def test_follow_ups_with_history_bypass_the_cache():
+    cache = _cache()
+    _, key = cache.lookup("What about its side effects?", ["a.pdf"])
+    cache.put(key, "Nausea")
+    assert cache.lookup("What about its side effects?", ["a.pdf"], has_history=True) == (None, None)
+    assert cache.lookup("What about its side effects?", ["a.pdf"])[0] == "Nausea"  # Fresh session – standalone
+    assert cache.stats()["bypassed"] == 1
+    assert is_follow_up("and the dosage?") and not is_follow_up("What is the metformin dosage?")
+
+def test_ttl_and_lru_eviction():
+    cache = _cache(capacity=2)
+    for question in ("q one one", "q two two", "q three three"):
+        cache.put(cache.lookup(question, ["a.pdf"])[1], question.upper())
+    assert cache.stats()["evictions"] == 1
+    assert cache.lookup("q one one", ["a.pdf"])[0] is None, "Least recently used answer was evicted"
+    assert cache.lookup("q three three", ["a.pdf"])[0] == "Q THREE THREE"
+
+    cache.ttl = 0.0
+    assert cache.lookup("q three three", ["a.pdf"])[0] is None, "Expired answers are never served"
+    assert cache.stats()["expirations"] >= 1
@@ -0,0 +1,207 @@
+import asyncio
+import time
+import httpx
+import pytest
+import app.main as main
+from app.agents.query_router import QueryRouter
+from app.rag.answer_cache import AnswerCache
+from app.workers import BoundedExecutor, ExecutorSaturated
+
+
+class SlowOrchestrator:
+    """Stands in for the LangGraph workflow – blocking work of a fixed duration."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.router = QueryRouter()
+        self.answer_cache = AnswerCache(store=None)
+
+    def invoke(self, input_data):
+        time.sleep(self.delay)
+        return {"response": f"answer to {input_data['query']}"}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    def configure(delay=0.3, workers=4, queue=0, per_session=2):
+        monkeypatch.setattr(main, "orchestrator", SlowOrchestrator(delay))
+        monkeypatch.setattr(main, "query_executor", BoundedExecutor(workers, queue, per_key_limit=per_session))
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+    return configure
+
+def _query(client, i, session=None):
+    return client.post("/query", json={"query": f"q{i}", "documents": [], "session_id": session or f"s{i}"})
+
+def test_queries_run_concurrently_off_the_event_loop(api):
+    async def scenario():
+        async with api(delay=0.3, workers=4) as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(_query(client, i) for i in range(4)))
+            return responses, time.perf_counter() - start
+
+    responses, elapsed = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [200] * 4
+    assert elapsed < 0.9, f"4 x 0.3s queries took {elapsed:.2f}s – they ran serially"
+
+def test_stats_endpoint_answers_while_queries_block(api):
+    async def scenario():
+        async with api(delay=0.5, workers=2) as client:
+            pending = asyncio.ensure_future(_query(client, 0))
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            await client.get("/stats")
+            stats_latency = time.perf_counter() - start
+            await pending
+            return stats_latency
+
+    assert asyncio.run(scenario()) < 0.2
+
+def test_saturated_pool_answers_429(api):
+    async def scenario():
+        async with api(delay=0.3, workers=1, queue=1) as client:
+            return await asyncio.gather(*(_query(client, i) for i in range(4)))
+
+    codes = sorted(r.status_code for r in asyncio.run(scenario()))
+    assert codes == [200, 200, 429, 429]
+
+def test_per_session_limit(api):
+    async def scenario():
+        async with api(delay=0.3, workers=4, per_session=1) as client:
+            return await asyncio.gather(*(_query(client, i, session="same") for i in range(2)))
+
+    assert sorted(r.status_code for r in asyncio.run(scenario())) == [200, 429]
+
+def test_cancelled_callers_keep_their_slot_until_the_thread_finishes():
+    def steps():
+        time.sleep(0.3)
+        yield "token"
+
+    async def scenario():
+        executor = BoundedExecutor(1, 0)
+        running = asyncio.ensure_future(executor.run(time.sleep, 0.3))
+        stream = executor.iterate(steps)
+        await asyncio.sleep(0.05)
+        running.cancel()  # Client went away – the pool thread is still sleeping
+        with pytest.raises(asyncio.CancelledError):
+            await running
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(time.sleep, 0)
+        await asyncio.sleep(0.35)
+        assert executor.pending == 0
+        streaming = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+        streaming.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await streaming
+        assert executor.pending == 1, "The generator step is still running on the pool"
+        await asyncio.sleep(0.35)
+        return executor.pending
+
+    assert asyncio.run(scenario()) == 0
+
+class StreamingOrchestrator(SlowOrchestrator):
+    def stream(self, input_data):
+        time.sleep(self.delay)
+        for word in ("The", " answer", "."):
+            yield {"type": "token", "content": word}
+
+
+def _stream(client, i, session=None):
+    return client.post("/query/stream", json={"query": f"q{i}", "documents": [], "session_id": session or f"s{i}"})
+
+def test_stream_emits_tokens_as_sse(api, monkeypatch):
+    async def scenario():
+        async with api(delay=0.0) as client:
+            monkeypatch.setattr(main, "orchestrator", StreamingOrchestrator(0.0))
+            return await _stream(client, 0)
+
+    response = asyncio.run(scenario())
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = response.text.strip().split("\n\n")
+    assert events[:3] == ['data: {"token": "The"}', 'data: {"token": " answer"}', 'data: {"token": "."}']
+    assert events[-1].startswith("event: done")
+    assert main.query_executor.pending == 0
+
+def test_stream_rejects_when_saturated(api, monkeypatch):
+    async def scenario():
+        async with api(delay=0.0, workers=1, queue=0) as client:
+            monkeypatch.setattr(main, "orchestrator", StreamingOrchestrator(0.3))
+            return await asyncio.gather(*(_stream(client, i) for i in range(2)))
+
+    assert sorted(r.status_code for r in asyncio.run(scenario())) == [200, 429]
+
+class PendingJob:
+    id = "job1"
+    retryable = False
+
+    async def wait(self, timeout):
+        await asyncio.sleep(min(timeout, 0.01))
+        return False
+
+    def to_dict(self):
+        return {"id": self.id, "status": "running"}
+
+
+class FailedJob(PendingJob):
+    id = "job2"
+
+    async def wait(self, timeout):
+        return True
+
+
+class LockedJob(FailedJob):
+    id = "job3"
+    retryable = True
+
+
+class StubJobs:
+    def __init__(self, jobs, unreadable=()):
+        self.jobs = {job.id: job for job in jobs}
+        self.failed = list(unreadable)
+
+    def submit(self, paths, retry_failed=True):
+        return list(self.jobs.values())
+
+    def unreadable(self, paths):
+        return [path for path in paths if path in self.failed]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+
+def test_query_answers_still_indexing_while_its_documents_are_pending(api, monkeypatch):
+    monkeypatch.setattr(main, "ingestion_jobs", StubJobs([PendingJob()]))
+
+    async def scenario():
+        async with api(delay=0.0) as client:
+            return await _query(client, 0), await client.get("/jobs/job1"), await client.get("/jobs/nope")
+
+    answer, job, missing = asyncio.run(scenario())
+    assert answer.status_code == 202 and "still being indexed" in answer.json()["response"]
+    assert job.json()["status"] == "running"
+    assert missing.status_code == 404
+
+
+def test_query_reports_documents_that_could_not_be_indexed(api, monkeypatch):
+    monkeypatch.setattr(main, "ingestion_jobs", StubJobs([FailedJob()], unreadable=["scan.pdf"]))
+
+    async def scenario():
+        async with api(delay=0.0) as client:
+            body = {"query": "q", "documents": ["notes.docx", "scan.pdf"], "session_id": "s"}
+            return await client.post("/query", json=body), await client.post("/query/stream", json=body)
+
+    for response in asyncio.run(scenario()):
+        assert response.status_code == 422
+        assert response.json()["files"] == ["scan.pdf"]
+
+
+def test_query_asks_for_a_retry_when_indexing_hit_a_busy_index(api, monkeypatch):
+    monkeypatch.setattr(main, "ingestion_jobs", StubJobs([LockedJob()]))
+
+    async def scenario():
+        async with api(delay=0.0) as client:
+            return await client.post("/query", json={"query": "q", "documents": ["notes.docx"], "session_id": "s"})
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 503 and response.headers["Retry-After"]
+    assert [job["id"] for job in response.json()["jobs"]] == ["job3"]
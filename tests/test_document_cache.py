@@ -0,0 +1,47 @@
+import os
+from docx import Document as DocxDocument
+from app.agents.document_cache import ParsedDocumentCache
+from app.agents import extraction_agent
+from app.agents.extraction_agent import ExtractionAgent
+
+
+def _make_docx(path, *paragraphs):
+    doc = DocxDocument()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    doc.save(path)
+    return str(path)
+
+def test_cache_parses_each_file_version_once(tmp_path):
+    cache = ParsedDocumentCache(spill_dir=None)
+    path = _make_docx(tmp_path / "note.docx", "INTRODUCTION", "Patient admitted with chest pain.")
+    assert cache.get(path) is cache.get(path)
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+
+    _make_docx(path, "Rewritten note")
+    os.utime(path, ns=(1, 1))  # Different mtime = different version
+    assert cache.get(path).paragraphs == ["Rewritten note"]
+    assert cache.stats()["misses"] == 2
+
+def test_cache_evicts_by_memory_and_spills_to_disk(tmp_path):
+    cache = ParsedDocumentCache(max_bytes=10, spill_dir=str(tmp_path / "spill"), hash_memo_size=1)
+    first = _make_docx(tmp_path / "a.docx", "A long enough paragraph to blow the budget")
+    second = _make_docx(tmp_path / "b.docx", "Another long paragraph over budget")
+    cache.get(first)
+    cache.get(second)  # Evicts `first` to disk
+    assert cache.stats()["entries"] == 1
+    assert os.listdir(tmp_path / "spill")
+
+    assert cache.get(first).paragraphs == ["A long enough paragraph to blow the budget"]
+    assert cache.stats()["spill_hits"] == 1 and cache.stats()["misses"] == 2
+    assert len(cache._hashes) == 1, "Content hashes are LRU-bounded too"
+
+def test_extraction_agent_reads_from_shared_cache(tmp_path, monkeypatch):
+    """Several sections over the same document parse the file once."""
+    cache = ParsedDocumentCache(spill_dir=None)
+    monkeypatch.setattr(extraction_agent, "get_document_cache", lambda: cache)
+    path = _make_docx(tmp_path / "report.docx", "INTRODUCTION", "Intro text.", "SUMMARY", "Summary text.")
+    agent = ExtractionAgent()
+    for section in ("Introduction", "Summary", None):
+        assert agent.extract_text(path, section)
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,44 @@
+import numpy as np
+from langchain_ollama import OllamaEmbeddings
+from app.rag.embedding_cache import EmbeddingCache, CachedEmbeddings, text_key
+from tests.fake_ollama import FakeOllamaServer
+
+
+def test_cache_persists_across_instances(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "fake", capacity=8)
+    key = text_key("fake", "Consent: the patient agrees to treatment.")
+    cache.put(key, [0.5, 1.5, 2.5])
+    cache.flush()
+
+    reopened = EmbeddingCache(str(tmp_path), "fake", capacity=8)
+    assert np.allclose(reopened.get(key), [0.5, 1.5, 2.5])
+    assert reopened.stats()["hits"] == 1
+
+def test_cache_key_ignores_whitespace_but_not_model():
+    assert text_key("m", "Lab panel header") == text_key("m", "  Lab panel\n header ")
+    assert text_key("m", "Lab panel header") != text_key("other", "Lab panel header")
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "fake", capacity=2)
+    a, b, c = (text_key("fake", t) for t in "abc")
+    cache.put(a, [1.0])
+    cache.put(b, [2.0])
+    cache.get(a)  # a is now most recent – b goes first
+    cache.put(c, [3.0])
+    assert cache.get(b) is None
+    assert cache.get(a) is not None and cache.get(c) is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_cached_embeddings_only_embeds_misses(tmp_path):
+    boilerplate = "This discharge summary is confidential."
+    with FakeOllamaServer(dim=16) as server:
+        embeddings = CachedEmbeddings(OllamaEmbeddings(model="fake", base_url=server.url),
+                                      EmbeddingCache(str(tmp_path), "fake"))
+        first = embeddings.embed_documents([boilerplate, "Visit 1 notes", boilerplate])
+        second = embeddings.embed_documents([boilerplate, "Visit 2 notes"])
+        query = embeddings.embed_query("Visit 2 notes")
+
+    assert server.embedded_texts == 3, "Repeated texts must hit the cache"
+    assert first[0] == first[2] == second[0]
+    assert np.allclose(query, second[1])
+    assert embeddings.cache.stats()["hits"] == 2
@@ -0,0 +1,54 @@
+import time
+import pytest
+from langchain_ollama import OllamaEmbeddings
+from app.rag.embedding_pipeline import EmbeddingPipeline
+from tests.fake_ollama import FakeOllamaServer, fake_vector
+
+
+def _texts(n):
+    return [f"Chunk {i}: hemoglobin A1c 7.{i % 10}%" for i in range(n)]
+
+def _throughput(server, texts, concurrency):
+    pipeline = EmbeddingPipeline(OllamaEmbeddings(model="fake", base_url=server.url),
+                                 batch_size=8, max_concurrency=concurrency)
+    start = time.perf_counter()
+    pipeline.embed(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+def test_embedding_pipeline_preserves_order_and_reports_progress():
+    """Vectors come back in input order even when batches finish out of order."""
+    texts = _texts(50)
+    seen = []
+    with FakeOllamaServer(dim=16, latency=0.01) as server:
+        pipeline = EmbeddingPipeline(OllamaEmbeddings(model="fake", base_url=server.url),
+                                     batch_size=8, max_concurrency=4)
+        vectors = pipeline.embed(texts, progress=lambda done, total: seen.append((done, total)))
+
+    assert vectors == [fake_vector(t, 16) for t in texts]
+    assert seen[-1] == (50, 50), "Progress should finish at the total chunk count"
+    assert server.requests == 7, "50 chunks at batch_size=8 should take 7 requests"
+    assert server.max_in_flight <= 4, "Concurrency cap exceeded"
+
+def test_embedding_pipeline_retries_transient_failures():
+    with FakeOllamaServer(dim=8, fail_first=2) as server:
+        pipeline = EmbeddingPipeline(OllamaEmbeddings(model="fake", base_url=server.url),
+                                     batch_size=4, max_concurrency=1, backoff=0.01)
+        vectors = pipeline.embed(_texts(4))
+    assert len(vectors) == 4
+    assert server.requests == 3, "Two 503s then a success"
+
+def test_embedding_pipeline_gives_up_after_max_retries():
+    with FakeOllamaServer(dim=8, fail_first=10) as server:
+        pipeline = EmbeddingPipeline(OllamaEmbeddings(model="fake", base_url=server.url),
+                                     batch_size=4, max_retries=2, backoff=0.01)
+        with pytest.raises(Exception):
+            pipeline.embed(_texts(4))
+    assert server.requests == 3
+
+def test_embedding_throughput_scales_with_concurrency():
+    """Round-trip-bound embedding: 4 requests in flight should be well over 2x one-at-a-time."""
+    texts = _texts(128)
+    with FakeOllamaServer(dim=16, latency=0.05) as server:
+        sequential = _throughput(server, texts, concurrency=1)
+        concurrent = _throughput(server, texts, concurrency=4)
+    assert concurrent > 2 * sequential, f"chunks/sec: sequential={sequential:.0f} concurrent={concurrent:.0f}"
@@ -0,0 +1,125 @@
+import os
+import pytest
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_core.documents import Document
+from app.rag.bm25_index import BM25Index, tokenize
+from app.rag.hybrid_retrieval import EmbeddingReranker, reciprocal_rank_fusion
+from app.rag.vectorstore_service import IndexLocked, VectorStoreService
+
+CHUNKS = [
+    "Diagnosis E11.9 type 2 diabetes without complications; metformin 500mg twice daily.",
+    "Diagnosis E11.65 type 2 diabetes with hyperglycemia; insulin glargine 10 units.",
+    "Hypertension I10 managed with lisinopril 10mg; blood pressure 128/82.",
+    "HbA1c 7.2% on last panel, LDL 96 mg/dL, eGFR 74.",
+]
+
+
+def _index(chunks=CHUNKS):
+    index = BM25Index()
+    index.add([f"c{i}" for i in range(len(chunks))], chunks)
+    return index
+
+
+def test_tokenizer_keeps_medical_identifiers():
+    tokens = tokenize("ICD-10 code E11.9, HbA1c 7.2%, BP 128/82 on metformin 500mg")
+    for token in ("icd-10", "e11.9", "hba1c", "7.2", "128/82", "500mg", "e11", "icd"):
+        assert token in tokens
+    assert "on" not in tokens
+
+
+def test_bm25_ranks_exact_identifier_first():
+    index = _index()
+    assert index.search("patients coded E11.9", k=1)[0][0] == "c0"
+    assert index.search("lisinopril", k=2)[0][0] == "c2"
+    assert index.search("HbA1c", k=4, allowed={"c0", "c1"}) == [], "Filter must exclude other chunks"
+
+
+def test_scoped_bm25_matches_filtering_the_full_ranking():
+    chunks = [text + " follow-up" * i for i, text in enumerate(CHUNKS * 10)]  # Distinct lengths – no ties
+    index = _index(chunks)
+    full = index.search("type 2 diabetes metformin lisinopril", k=len(chunks))
+    for allowed in ({"c0", "c6", "c13"}, {f"c{i}" for i in range(0, 40, 2)}):  # Smaller and larger than postings
+        expected = [hit for hit in full if hit[0] in allowed][:3]
+        assert index.search("type 2 diabetes metformin lisinopril", k=3, allowed=allowed) == expected
+
+
+def test_bm25_is_incremental_and_persistent(tmp_path):
+    index = _index(CHUNKS[:2])
+    index.add(["c0"], ["ignored duplicate"])
+    assert len(index) == 2
+    index.add(["c2", "c3"], CHUNKS[2:])
+    assert index.search("eGFR", k=1)[0][0] == "c3"
+
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert len(loaded) == 4 and loaded.total_length == index.total_length
+    assert loaded.search("E11.65", k=1) == index.search("E11.65", k=1)
+    assert BM25Index.load(str(tmp_path / "missing")) is None
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "c"]])
+    assert fused[0] == "b"
+    assert set(fused) == {"a", "b", "c", "d"}
+
+
+def _service(tmp_path, save_delay=0):
+    service = VectorStoreService(str(tmp_path / "index"), embeddings=FakeEmbeddings(size=16), save_delay=save_delay)
+    docs = [Document(page_content=text, metadata={"source": f"doc{i % 2}"}) for i, text in enumerate(CHUNKS)]
+    vectors = service.embeddings.embed_documents(CHUNKS)
+    service.add_embeddings(docs, vectors, [f"c{i}" for i in range(len(docs))])
+    return service
+
+
+def test_hybrid_search_surfaces_keyword_match(tmp_path):
+    """Random embeddings carry no meaning – the exact code must still come back through BM25."""
+    service = _service(tmp_path)
+    hits = service.hybrid_search("E11.65 insulin", k=2, fetch_k=4)
+    assert CHUNKS[1] in [h.page_content for h in hits]
+    assert service.keyword_search("lisinopril", k=1)[0].page_content == CHUNKS[2]
+    assert service.index_stats()["bm25_chunks"] == 4
+
+
+def test_bm25_saved_with_index_and_rebuilt_when_missing(tmp_path):
+    service = _service(tmp_path)
+    service.mark_dirty()
+    assert os.path.exists(os.path.join(service.path, BM25Index.FILENAME))
+
+    os.remove(os.path.join(service.path, BM25Index.FILENAME))  # An index saved before BM25 existed
+    reloaded = VectorStoreService(service.path, embeddings=service.embeddings, save_delay=0)
+    assert reloaded.keyword_search("eGFR", k=1)[0].page_content == CHUNKS[3]
+
+
+def test_services_sharing_a_folder_take_turns_writing(tmp_path):
+    writer = _service(tmp_path)
+    writer.mark_dirty()  # Saved – the writer lock is handed back
+    reader = VectorStoreService(writer.path, embeddings=writer.embeddings, save_delay=0, writer_wait=0.1)
+    assert len(reader.vectorstore.index_to_docstore_id) == 4
+    generation = reader.generation
+
+    note = tmp_path / "potassium.txt"
+    note.write_text("Potassium 5.9 mmol/L")
+    text = "Potassium 5.9 mmol/L – hyperkalemia, lisinopril held."
+    writer.save_delay = 60  # Unsaved changes keep the writer lock
+    writer.add_embeddings([Document(page_content=text, metadata={"source": str(note)})],
+                          writer.embeddings.embed_documents([text]), ["c4"])
+    writer.registry.record(writer.registry.hash_file(str(note)), str(note), ["c4"])
+    writer.mark_dirty()
+    with pytest.raises(IndexLocked):
+        reader.add_embeddings([Document(page_content="x")], writer.embeddings.embed_documents(["x"]), ["c5"])
+
+    writer.flush()
+    # The registry now lists c4 – the reader must reload the index that holds it, not search a stale one
+    assert [d.page_content for d in reader.keyword_search("potassium", k=1, sources=[str(note)])] == [text]
+    assert reader.generation > generation
+    reader.add_embeddings([Document(page_content="x")], writer.embeddings.embed_documents(["x"]), ["c5"])
+    reader.mark_dirty()
+    assert not reader.writer.held
+    assert len(writer.vectorstore.index_to_docstore_id) == 6, "Each saw the other's chunks before writing"
+
+
+def test_embedding_reranker_trims_to_top_n():
+    embeddings = FakeEmbeddings(size=16)
+    docs = [Document(page_content=text) for text in CHUNKS]
+    kept = EmbeddingReranker(embeddings).rerank("query", docs, top_n=2)
+    assert len(kept) == 2 and all(d in docs for d in kept)
@@ -0,0 +1,97 @@
+import asyncio
+import copy
+import threading
+import pytest
+from app.jobs import IngestionJobQueue
+
+
+class GatedLoader:
+    """Wraps a loader so a test decides when ingestion may proceed."""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.gate = threading.Event()
+        self.calls = 0
+
+    def load_documents(self, paths, progress=None, unparsed=None):
+        self.calls += 1
+        self.gate.wait(5)
+        return self.loader.load_documents(paths, progress, unparsed)
+
+
+def test_job_indexes_in_background_and_reports_progress(offline_loader, sample_docx):
+    gated = GatedLoader(offline_loader)
+    queue = IngestionJobQueue(offline_loader.registry, lambda: gated)
+
+    [job] = queue.submit([sample_docx])
+    assert queue.submit([sample_docx]) == [job], "Content already queued must not be ingested twice"
+    assert not job.done and not offline_loader.registry.is_indexed(sample_docx)
+
+    gated.gate.set()
+    assert asyncio.run(job.wait(5))
+    status = job.to_dict()
+    assert status["status"] == "done"
+    assert status["embedded_chunks"] == status["total_chunks"] > 0
+    assert offline_loader.registry.is_indexed(sample_docx)
+    assert queue.submit([sample_docx]) == [] and gated.calls == 1
+    assert queue.get(job.id) is job
+
+def test_wait_times_out_without_blocking(offline_loader, sample_docx):
+    gated = GatedLoader(offline_loader)
+    queue = IngestionJobQueue(offline_loader.registry, lambda: gated)
+    [job] = queue.submit([sample_docx])
+    assert asyncio.run(job.wait(0.05)) is False
+    gated.gate.set()
+    assert asyncio.run(job.wait(5))
+
+def test_failed_content_is_not_retried_by_queries(offline_loader, tmp_path):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    queue = IngestionJobQueue(offline_loader.registry, lambda: offline_loader)
+    [job] = queue.submit([str(broken)])
+    asyncio.run(job.wait(30))
+    assert job.status == "failed"
+    assert queue.submit([str(broken)], retry_failed=False) == [job]
+    assert queue.submit([str(broken)]) != [job], "A fresh upload retries"
+
+def test_files_that_fail_to_parse_are_reported_per_file(offline_loader, sample_docx, tmp_path):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    queue = IngestionJobQueue(offline_loader.registry, lambda: offline_loader)
+    [job] = queue.submit([sample_docx, str(broken)])
+    asyncio.run(job.wait(30))
+    assert job.status == "done" and job.to_dict()["failed_files"] == [str(broken)]
+    assert "1 of 2" in job.error
+    assert offline_loader.registry.is_indexed(sample_docx)
+    assert queue.unreadable([sample_docx, str(broken), str(tmp_path / "missing.pdf")]) == [str(broken), str(tmp_path / "missing.pdf")]
+    assert queue.submit([sample_docx, str(broken)], retry_failed=False) == [job], "Only the broken file is still pending"
+
+def test_busy_index_defers_the_job_instead_of_failing_it(offline_loader, sample_docx, tmp_path):
+    from docx import Document as DocxDocument
+    from app.rag.vectorstore_service import VectorStoreService
+    other_note = tmp_path / "other.docx"
+    doc = DocxDocument()
+    doc.add_paragraph("Follow-up: eGFR 74, lisinopril continued.")
+    doc.save(other_note)
+
+    # A second worker process on the same folder, while the first still has unsaved changes
+    worker2 = copy.copy(offline_loader)
+    worker2.store = VectorStoreService(offline_loader.store.path, embeddings=offline_loader.embeddings, save_delay=0, writer_wait=0.1)
+    worker2.registry = worker2.store.registry
+    offline_loader.store.save_delay = 60
+    offline_loader.load_documents([sample_docx])
+    assert offline_loader.store.writer.held
+
+    queue = IngestionJobQueue(worker2.registry, lambda: worker2)
+    [job] = queue.submit([str(other_note)])
+    asyncio.run(job.wait(30))
+    assert job.status == "locked" and job.retryable and job.failed_files == []
+    assert queue.unreadable([str(other_note)]) == [], "A readable file is never reported unreadable"
+
+    offline_loader.store.flush()  # Saved – the first worker hands the index over
+    [retry] = queue.submit([str(other_note)], retry_failed=False)
+    assert retry is not job
+    asyncio.run(retry.wait(30))
+    assert retry.status == "done"
+    assert worker2.registry.is_indexed(sample_docx) and worker2.registry.is_indexed(str(other_note))
+    assert len(offline_loader.store.vectorstore.index_to_docstore_id) == len(worker2.store.vectorstore.index_to_docstore_id)
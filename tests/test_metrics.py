@@ -0,0 +1,91 @@
+import asyncio
+import httpx
+import pytest
+from langchain_ollama import ChatOllama
+from prometheus_client import CollectorRegistry, generate_latest
+import app.main as main
+from app.metrics import LLM_TOKENS, STAGE_ERRORS, STAGE_SECONDS, register_stats, span, start_request, timed, token_callback
+from app.workers import BoundedExecutor
+from tests.fake_ollama import FakeOllamaServer
+from tests.test_api import SlowOrchestrator
+
+
+def _sample(metric, suffix, **labels):
+    for family in metric.collect():
+        for sample in family.samples:
+            if sample.name.endswith(suffix) and all(sample.labels.get(k) == v for k, v in labels.items()):
+                return sample.value
+    return 0.0
+
+
+def test_spans_and_timed_functions_are_recorded_per_request():
+    @timed("unit_gen")
+    def tokens():
+        yield from ("a", "b")
+
+    @timed("unit_fail")
+    def fail():
+        raise ValueError("boom")
+
+    spans = start_request()
+    before = _sample(STAGE_SECONDS, "_count", stage="unit_block")
+    with span("unit_block"):
+        pass
+    assert list(tokens()) == ["a", "b"]
+    with pytest.raises(ValueError):
+        fail()
+
+    assert [stage for stage, _ in spans] == ["unit_block", "unit_gen", "unit_fail"]
+    assert _sample(STAGE_SECONDS, "_count", stage="unit_block") == before + 1
+    assert _sample(STAGE_ERRORS, "_total", stage="unit_fail") >= 1
+
+
+def test_token_callback_counts_ollama_tokens():
+    with FakeOllamaServer(reply="one two three four", token_latency=0.001) as server:
+        llm = ChatOllama(model="fake-chat", base_url=server.url, callbacks=[token_callback])
+        before = _sample(LLM_TOKENS, "_total", model="fake-chat", kind="completion")
+        llm.invoke("hello there")
+        assert "".join(chunk.content for chunk in llm.stream("hello again")) == "one two three four"
+    assert _sample(LLM_TOKENS, "_total", model="fake-chat", kind="completion") == before + 8
+    assert _sample(LLM_TOKENS, "_total", model="fake-chat", kind="prompt") >= 4
+
+
+def test_cache_ratios_read_from_stats_at_scrape_time():
+    registry = CollectorRegistry()
+    stats = {"answer_cache": {"hits": 3, "misses": 1, "hit_rate": 0.75},
+             "router": {"decisions": 4, "cache_hit_rate": 0.5}, "ocr": None}
+    register_stats(lambda: stats, registry)
+    text = generate_latest(registry).decode()
+    assert 'assistant_cache_hits_total{cache="answer_cache"} 3.0' in text
+    assert 'assistant_cache_hit_ratio{cache="answer_cache"} 0.75' in text
+    assert 'assistant_cache_hit_ratio{cache="router"} 0.5' in text
+
+    stats["answer_cache"]["hits"] = 7
+    assert 'assistant_cache_hits_total{cache="answer_cache"} 7.0' in generate_latest(registry).decode()
+
+
+def test_metrics_endpoint_and_server_timing_header(monkeypatch):
+    class TimedOrchestrator(SlowOrchestrator):
+        def invoke(self, input_data):
+            with span("qa_flow"):  # Runs on a pool thread – the request's spans must still see it
+                return super().invoke(input_data)
+
+    monkeypatch.setattr(main, "orchestrator", TimedOrchestrator(0.0))
+    monkeypatch.setattr(main, "query_executor", BoundedExecutor(2, 0))
+    monkeypatch.setattr(main, "TIMING_HEADER", True)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            answer = await client.post("/query", json={"query": "q", "documents": [], "session_id": "s"})
+            scrape = await client.get("/metrics")
+            return answer, scrape
+
+    answer, scrape = asyncio.run(scenario())
+    assert answer.status_code == 200
+    timing = answer.headers["Server-Timing"]
+    assert timing.startswith("qa_flow;dur=") and "total;dur=" in timing
+    assert scrape.headers["content-type"].startswith("text/plain")
+    body = scrape.text
+    assert 'assistant_stage_seconds_count{stage="qa_flow"}' in body
+    assert 'assistant_request_seconds_count{method="POST",path="/query",status="200"}' in body
+    assert 'assistant_cache_hit_ratio{cache="answer_cache"}' in body
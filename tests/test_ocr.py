@@ -0,0 +1,92 @@
+import io
+import numpy as np
+from PIL import Image, ImageDraw
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from app.agents import ocr
+from app.agents.parsers import parse_image, parse_pdf
+
+
+def _scan(width=600, height=200, text="HbA1c 7.2%"):
+    image = Image.new("RGB", (width, height), (235, 230, 220))  # Off-white paper
+    ImageDraw.Draw(image).text((20, height // 2), text, fill=(60, 60, 60))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class CountingEngine:
+    def __init__(self, text="recognized text from the scanned page"):
+        self.text = text
+        self.calls = 0
+
+    def __call__(self, image):
+        self.calls += 1
+        assert set(np.unique(np.asarray(image))) <= {0, 255}, "Tesseract must get a binarized image"
+        return self.text
+
+
+def test_preprocess_downscales_and_binarizes():
+    big = Image.open(io.BytesIO(_scan(width=4000, height=1000))).convert("RGBA")
+    out = ocr.preprocess(big, max_side=1000)
+    assert max(out.size) == 1000 and out.mode == "L"
+    pixels = np.asarray(out)
+    assert set(np.unique(pixels)) == {0, 255}
+    assert (pixels == 255).mean() > 0.9, "Paper should come out white, ink black"
+
+
+def test_preprocess_handles_uniform_images():
+    for shade, expected in ((235, 255), (255, 255), (20, 0)):
+        out = ocr.preprocess(Image.new("RGB", (300, 200), (shade, shade, shade)))
+        assert set(np.unique(np.asarray(out))) == {expected}
+
+
+def test_ocr_results_cached_by_image_hash(tmp_path):
+    engine, data = CountingEngine(), _scan()
+    cache = ocr.OCRCache(str(tmp_path / "ocr"))
+    assert ocr.ocr_image(data, cache, engine) == engine.text
+    assert ocr.ocr_image(data, cache, engine) == engine.text
+    assert ocr.ocr_image(data, ocr.OCRCache(str(tmp_path / "ocr")), engine) == engine.text, "Persisted across restarts"
+    assert engine.calls == 1
+    ocr.ocr_image(_scan(text="LDL 96"), cache, engine)
+    assert engine.calls == 2, "A different image is a different key"
+
+
+def _scanned_pdf(path):
+    c = canvas.Canvas(str(path), pagesize=letter)
+    c.drawString(72, 720, "Typed page with a real text layer describing the admission.")
+    c.showPage()
+    c.drawImage(ImageReader(io.BytesIO(_scan())), 72, 400, width=300, height=100)  # Scan – no text layer
+    c.showPage()
+    c.save()
+    return str(path)
+
+
+def test_textless_pdf_pages_fall_back_to_ocr(tmp_path, monkeypatch):
+    engine = CountingEngine()
+    monkeypatch.setattr(ocr, "run_tesseract", engine)
+    parsed = parse_pdf(_scanned_pdf(tmp_path / "scan.pdf"))
+
+    assert "Typed page" in parsed.pages[0]
+    assert parsed.pages[1].strip() == engine.text
+    assert [s["ocr"] for s in parsed.page_stats] == [False, True]
+    assert all(s["seconds"] >= s["ocr_seconds"] >= 0 for s in parsed.page_stats)
+    assert engine.calls == 1
+
+    stats = ocr.OCRStats()
+    stats.record(parsed)
+    assert stats.stats()["pages"] == 2 and stats.stats()["ocr_pages"] == 1
+
+
+def test_image_upload_ocrd_once(tmp_path, monkeypatch):
+    engine = CountingEngine()
+    monkeypatch.setattr(ocr, "run_tesseract", engine)
+    path = tmp_path / "scan.png"
+    path.write_bytes(_scan())
+    copy = tmp_path / "copy.png"
+    copy.write_bytes(_scan())
+
+    assert parse_image(str(path)).text == engine.text
+    assert parse_image(str(copy)).page_stats[0]["ocr"]
+    assert engine.calls == 1, "Same image content must not be OCR'd twice"
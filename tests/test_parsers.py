@@ -0,0 +1,84 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from docx import Document as DocxDocument
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from app.agents import parsers
+from app.agents.parsers import iter_parsed, parser_for, parse_pdf, parse_docx
+
+
+def _make_pdf(path, pages):
+    c = canvas.Canvas(str(path), pagesize=letter)
+    for i in range(pages):
+        c.drawString(72, 720, f"Page {i + 1} clinical findings")
+        c.showPage()
+    c.save()
+    return str(path)
+
+def _make_docx(path, text):
+    doc = DocxDocument()
+    doc.add_paragraph(text)
+    doc.save(path)
+    return str(path)
+
+def test_parser_registry_resolves_by_extension():
+    assert parser_for("scan.PDF") is parse_pdf
+    assert parser_for("notes.docx") is parse_docx
+    assert parser_for("archive.zip") is None
+
+def test_iter_parsed_runs_on_pool_and_reassembles_pdf_pages(tmp_path):
+    """A PDF split into page ranges across workers comes back whole and in page order."""
+    pdf = _make_pdf(tmp_path / "long.pdf", pages=7)
+    note = _make_docx(tmp_path / "note.docx", "Discharge: stable")
+    sheet = str(tmp_path / "labs.xlsx")
+    pd.DataFrame({"test": ["HbA1c"], "value": [7.1]}).to_excel(sheet, index=False)
+
+    parsed = {doc.path: doc for doc in iter_parsed([pdf, note, sheet, str(tmp_path / "skip.zip")],
+                                                   pages_per_task=2, max_workers=2)}
+
+    assert set(parsed) == {pdf, note, sheet}
+    assert [p.split()[1] for p in parsed[pdf].pages] == [str(i) for i in range(1, 8)]
+    assert parsed[note].text == "Discharge: stable"
+    assert "HbA1c" in parsed[sheet].text
+
+def test_iter_parsed_skips_broken_files(tmp_path):
+    broken = tmp_path / "broken.docx"
+    broken.write_bytes(b"not a zip")
+    good = _make_docx(tmp_path / "good.docx", "ok")
+    assert [doc.path for doc in iter_parsed([str(broken), good], max_workers=2)] == [good]
+
+def _hang(path):
+    time.sleep(60)
+
+def _register_hang():
+    parsers.register_parser(".hang")(_hang)
+
+def _hanging_pool(monkeypatch):
+    pool = ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("spawn"), initializer=_register_hang)
+    list(pool.map(abs, range(2)))  # Workers spawned up front – only parse time counts
+    monkeypatch.setattr(parsers, "_pool", pool)
+    return pool
+
+def test_slow_parser_is_abandoned_within_its_timeout(tmp_path, monkeypatch):
+    """A hung parse is skipped after `timeout` – alone or in a batch – and its worker is reclaimed."""
+    monkeypatch.setitem(parsers.PARSERS, ".hang", _hang)
+    hung = tmp_path / "stuck.hang"
+    hung.write_text("")
+    good = _make_docx(tmp_path / "good.docx", "ok")
+
+    pool = _hanging_pool(monkeypatch)
+    workers = list(pool._processes.values())
+    start = time.perf_counter()
+    assert list(iter_parsed([str(hung)], timeout=1)) == []
+    assert time.perf_counter() - start < 5
+    assert parsers._pool is not pool
+    for worker in workers:
+        worker.join(5)
+        assert not worker.is_alive(), "The hung worker must be terminated, not left holding a slot"
+
+    _hanging_pool(monkeypatch)
+    start = time.perf_counter()
+    assert [doc.path for doc in iter_parsed([str(hung), good], timeout=2)] == [good]
+    assert 2 <= time.perf_counter() - start < 6
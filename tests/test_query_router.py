@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+import numpy as np
+from app.agents.query_router import QA, REPORT, QueryRouter, parse_label
+
+VOCAB = ["report", "pdf", "compile", "document", "dosage", "history", "trial", "results"]
+
+
+class BagOfWords:
+    """Deterministic embeddings – similarity follows shared vocabulary."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        words = text.lower()
+        return (np.array([words.count(w) for w in VOCAB], dtype=np.float32) + 1e-3).tolist()
+
+
+class CountingLLM:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return SimpleNamespace(content=self.reply)
+
+
+EXEMPLARS = {REPORT: ["compile a pdf document"], QA: ["dosage history trial results"]}
+
+def test_rules_decide_obvious_queries_without_models():
+    router = QueryRouter(llm=CountingLLM("Report"))
+    assert router.classify("Generate report with Introduction and Summary") == (REPORT, "rule")
+    assert router.classify("What is the recommended dosage?") == (QA, "rule")
+    assert router.llm.calls == 0
+
+def test_embedding_tier_then_llm_for_ambiguous_input():
+    llm = CountingLLM("Report.")
+    router = QueryRouter(llm=llm, embeddings=BagOfWords(), exemplars=EXEMPLARS, min_similarity=0.8)
+    assert router.classify("pdf document compile") == (REPORT, "embedding")
+    assert router.classify("Hmm, the thing") == (REPORT, "llm")  # Nothing similar – LLM decides
+    assert router.classify("  hmm, THE thing ") == (REPORT, "cache")
+    assert llm.calls == 1
+    stats = router.stats()
+    assert stats["by_tier"] == {"embedding": 1, "llm": 1, "cache": 1}
+    assert stats["cache_hit_rate"] == 1 / 3
+
+def test_llm_label_parsing_is_tolerant():
+    assert [parse_label(t) for t in ("Report", "report.", "**Report**", "QA", "qa.")] == [REPORT] * 3 + [QA] * 2
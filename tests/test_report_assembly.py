@@ -0,0 +1,66 @@
+import asyncio
+import httpx
+import pandas as pd
+from PIL import Image
+from pypdf import PdfReader
+import app.main as main
+from app.agents.report_assembly_agent import ImageCache, ReportAssemblyAgent, iter_report
+from app.workers import BoundedExecutor
+
+
+def _photo(path, size=(4000, 3000)):
+    Image.new("RGB", size, (200, 120, 80)).save(path, format="JPEG")
+    return str(path)
+
+
+def test_long_table_split_into_chunks_and_spooled_to_disk():
+    df = pd.DataFrame({"patient": [f"P{i:05d}" for i in range(3000)], "hba1c": [5 + i % 40 / 10 for i in range(3000)]})
+    agent = ReportAssemblyAgent(table_chunk_rows=250, spool_bytes=16 * 1024)
+    assert len(agent._tables([df.columns.tolist()] + df.values.tolist())) == 12
+
+    report = agent.assemble_report({"Labs": [df]})
+    assert report._rolled, "A report past spool_bytes must live on disk, not in memory"
+    reader = PdfReader(report)
+    assert len(reader.pages) > 10
+    assert "patient" in reader.pages[-1].extract_text(), "Header repeats on every page"
+
+    chunks = list(iter_report(report, chunk_size=4096))
+    assert len(chunks) > 1 and b"".join(chunks).startswith(b"%PDF")
+    assert report.closed, "Streaming must release the temp file"
+
+
+def test_images_downsampled_once_and_cached(tmp_path):
+    cache = ImageCache(dpi=72)
+    agent = ReportAssemblyAgent(image_cache=cache)
+    path = _photo(tmp_path / "scan.jpg")
+
+    first = agent.assemble_report({"Scan": {"path": path, "text": "chest x-ray"}})
+    agent.assemble_report({"Again": {"path": path}})
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+
+    [image] = PdfReader(first).pages[0].images
+    assert max(image.image.size) <= 450, "Embedded at print size, not 4000 px"
+
+
+def test_report_written_straight_to_a_file(tmp_path):
+    target = str(tmp_path / "out.pdf")
+    assert ReportAssemblyAgent().assemble_report({"Summary": "Stable."}, output=target) == target
+    assert "Stable." in PdfReader(target).pages[0].extract_text()
+
+
+class ReportOrchestrator:
+    def invoke(self, input_data):
+        return {"response": ReportAssemblyAgent().assemble_report({"Summary": "Stable."})}
+
+
+def test_query_streams_spooled_report(monkeypatch):
+    monkeypatch.setattr(main, "orchestrator", ReportOrchestrator())
+    monkeypatch.setattr(main, "query_executor", BoundedExecutor(1, 0))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return await client.post("/query", json={"query": "report", "documents": []})
+
+    response = asyncio.run(scenario())
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.content.startswith(b"%PDF")
@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import app.agents.orchestrator as orchestrator
+
+SECTION_DELAY = 0.2
+
+
+def _slow_extract(args):
+    time.sleep(SECTION_DELAY)
+    return None if args["section"] == "Missing" else f"{args['section']} text from {args['path']}"
+
+def _slow_summarize(args):
+    time.sleep(SECTION_DELAY)
+    return "summary of " + args["text"]
+
+
+def test_sections_fan_out_and_gather_in_order(monkeypatch):
+    monkeypatch.setattr(orchestrator, "extract_content", SimpleNamespace(invoke=_slow_extract))
+    monkeypatch.setattr(orchestrator, "summarize_content", SimpleNamespace(invoke=_slow_summarize))
+    sections = ["Introduction", "Summary", "Missing", "Executive Summary", "Methods"]
+
+    start = time.perf_counter()
+    result = orchestrator.collect_sections(sections, ["a.pdf"], ThreadPoolExecutor(8))
+    elapsed = time.perf_counter() - start
+
+    assert list(result) == sections
+    assert result["Summary"] == "summary of Summary text from a.pdf"
+    assert result["Missing"] == "Section 'Missing' was not found in the provided documents."
+    # Serial would be 5 extractions + 2 summaries = 1.4s; parallel is one extraction + one summary
+    assert elapsed < 0.7, f"report sections took {elapsed:.2f}s – they ran serially"
+
+def test_qa_never_ingests_on_the_query_path(monkeypatch, tmp_path):
+    from langchain_community.embeddings import FakeEmbeddings
+    from app.rag.vectorstore_service import VectorStoreService
+
+    def no_ingestion(*args, **kwargs):
+        raise AssertionError("Queries must not index documents – /upload's background job does")
+
+    store = VectorStoreService(str(tmp_path / "index"), embeddings=FakeEmbeddings(size=16), save_delay=0)
+    monkeypatch.setattr(orchestrator, "get_vectorstore_service", lambda: store)
+    monkeypatch.setattr(orchestrator, "DocumentLoaderAgent", no_ingestion)
+    note = tmp_path / "note.txt"
+    note.write_text("never uploaded")
+
+    state = {"query": "q", "documents": [str(note)], "session_id": "s", "memory": None, "response": None}
+    assert orchestrator.Orchestrator()._prepare_qa(state) is None
+    assert "upload" in state["response"]
@@ -0,0 +1,40 @@
+from app.agents.parsers import ParsedDocument
+from app.agents.section_index import SectionIndex, build_outline, document_text
+
+PAGES = [
+    "CLINICAL STUDY REPORT\nINTRODUCTION\nMetformin is first-line therapy.\n",
+    "2. Methods\nRandomised, double blind.\nResults\nHbA1c fell by 1.1%.\n",
+    "SUMMARY OF FINDINGS\nWell tolerated.\n",
+]
+
+def _pdf():
+    return ParsedDocument("study.pdf", "pdf", PAGES)
+
+def test_outline_maps_headers_to_spans_and_pages():
+    parsed = _pdf()
+    outline = build_outline(parsed)
+    text = document_text(parsed)
+
+    intro = SectionIndex.find(outline, "Introduction")
+    assert text[intro["start"]:intro["end"]].strip() == "INTRODUCTION\nMetformin is first-line therapy."
+    assert intro["page"] == 1
+    assert SectionIndex.find(outline, "methods")["page"] == 2
+    assert "HbA1c" in text[slice(*(SectionIndex.find(outline, "Results")[k] for k in ("start", "end")))]
+    # "Summary" resolves to the nearest header that starts with it
+    assert SectionIndex.find(outline, "Summary")["title"] == "SUMMARY OF FINDINGS"
+
+def test_missing_section_is_explicit():
+    assert SectionIndex.find(build_outline(_pdf()), "Adverse Events") is None
+
+def test_outline_persisted_and_reused(tmp_path):
+    SectionIndex(str(tmp_path)).build("abc123", _pdf())
+    reloaded = SectionIndex(str(tmp_path)).get("abc123", parsed=None)  # Never re-parses
+    assert "introduction" in reloaded["sections"]
+
+def test_outlines_in_memory_are_lru_bounded(tmp_path):
+    index = SectionIndex(str(tmp_path), capacity=2)
+    for digest in ("a", "b", "c"):
+        index.build(digest, _pdf())
+    assert list(index._outlines) == ["b", "c"]
+    assert "introduction" in index.get("a", parsed=None)["sections"], "Evicted outlines reload from disk"
+    assert list(index._outlines) == ["c", "a"]
@@ -0,0 +1,75 @@
+import threading
+import time
+from langchain_core.messages import AIMessage, HumanMessage
+from app.session_store import InMemorySessionStore, SQLiteSessionStore
+
+
+def _turn(i):
+    return [HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")]
+
+def _summarizer(calls):
+    def summarize(summary, messages):
+        calls.append(len(messages))
+        return (summary + " | " if summary else "") + ", ".join(m.content for m in messages)
+    return summarize
+
+def test_turn_cap_folds_oldest_turns_into_summary(tmp_path):
+    for store_cls, kwargs in ((InMemorySessionStore, {}), (SQLiteSessionStore, {"path": str(tmp_path / "s.db")})):
+        calls = []
+        store = store_cls(max_turns=4, summarizer=_summarizer(calls), **kwargs)
+        for i in range(5):
+            store.append("s", _turn(i))
+        store.wait_for_compactions()
+        messages = store.get_messages("s")
+        assert calls == [6], store_cls.__name__  # 5 turns > 4 – the oldest 3 folded, 2 kept verbatim
+        assert messages[0].type == "system" and "question 0" in messages[0].content
+        assert [m.content for m in messages[1:]] == ["question 3", "answer 3", "question 4", "answer 4"]
+
+def test_compaction_runs_off_the_request_path():
+    release, calls = threading.Event(), []
+
+    def slow_summarizer(summary, messages):
+        release.wait(5)
+        return _summarizer(calls)(summary, messages)
+
+    store = InMemorySessionStore(max_turns=2, summarizer=slow_summarizer)
+    start = time.perf_counter()
+    for i in range(4):
+        store.append("s", _turn(i))
+    assert time.perf_counter() - start < 0.5, "append waited for the summarizer"
+    assert len(store.get_messages("s")) == 8
+    release.set()
+    store.wait_for_compactions()
+    assert calls == [4], "One compaction per session at a time"
+    assert store.get_messages("s")[0].type == "system"
+
+def test_lru_and_ttl_eviction():
+    store = InMemorySessionStore(max_sessions=2, ttl=60)
+    for sid in ("a", "b", "c"):
+        store.append(sid, _turn(0))
+    assert store.get_messages("a") == [], "Least recently used session was evicted"
+    assert store.stats()["evictions"] == 1
+
+    store.ttl = 0.0
+    time.sleep(0.01)
+    assert store.get_messages("c") == []
+
+def test_sqlite_history_survives_restart_and_is_shared(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker_a, worker_b = SQLiteSessionStore(path=path), SQLiteSessionStore(path=path)
+    worker_a.history("s").add_messages(_turn(1))
+    worker_b.history("s").add_messages(_turn(2))
+
+    restarted = SQLiteSessionStore(path=path)
+    assert [m.content for m in restarted.history("s").messages] == ["question 1", "answer 1", "question 2", "answer 2"]
+
+def test_sqlite_expired_sessions_start_over(tmp_path):
+    store = SQLiteSessionStore(path=str(tmp_path / "s.db"), ttl=0.5, max_sessions=1)
+    store.append("old", _turn(0))
+    time.sleep(0.6)
+    store.append("old", _turn(1))
+    assert [m.content for m in store.get_messages("old")] == ["question 1", "answer 1"]
+
+    store.append("new", _turn(2))
+    store.prune()
+    assert store.stats()["sessions"] == 1
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import httpx
+import app.main as main
+from tests.fake_ollama import FakeOllamaServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Measured ~0.8s (FastAPI itself is ~0.6s of it); eager imports and Orchestrator() took ~2.3s
+IMPORT_BUDGET_SECONDS = 2.0
+COLD_START_BUDGET_SECONDS = 3.0  # Interpreter start → first response served
+HEAVY_MODULES = ("langchain", "langchain_core", "langchain_community", "langchain_ollama", "langgraph", "faiss",
+                 "numpy", "pandas", "reportlab", "PIL", "pypdf", "docx", "openpyxl", "pytesseract", "ollama")
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "heavy": sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules),
+    "orchestrator_built": app.main.orchestrator is not None,
+}}))
+"""
+
+COLD_START_SCRIPT = """
+import time
+start = time.perf_counter()
+import asyncio, json, httpx
+import app.main as main
+
+async def scenario():
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            first = await client.get("/jobs/unknown")  # Served while the warm-up is still running
+            serving = time.perf_counter() - start
+            ready = await client.get("/ready")
+            deadline = time.monotonic() + 60
+            while ready.status_code != 200 and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+                ready = await client.get("/ready")
+            return {"first_status": first.status_code, "serving_seconds": serving,
+                    "ready_status": ready.status_code, "steps": ready.json()["steps"]}
+
+print(json.dumps(asyncio.run(scenario())))
+"""
+
+
+def _run(script, cwd, env=None):
+    env = {**os.environ, "PYTHONPATH": ROOT, "MEMORY_BACKEND": "memory", **(env or {})}
+    result = subprocess.run([sys.executable, "-c", script], cwd=cwd, env=env, capture_output=True, text=True,
+                            timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_is_light_and_within_budget(tmp_path):
+    measured = _run(IMPORT_SCRIPT, tmp_path)
+    assert measured["heavy"] == [], f"app.main imported {measured['heavy']} eagerly"
+    assert not measured["orchestrator_built"], "Model clients must be created by the lifespan hook"
+    assert not os.listdir(tmp_path), "Importing app.main must not create files"
+    assert measured["seconds"] < IMPORT_BUDGET_SECONDS, f"import app.main took {measured['seconds']:.2f}s"
+
+
+def test_cold_start_serves_immediately_and_warms_up_in_background(tmp_path):
+    with FakeOllamaServer(dim=16) as server:
+        measured = _run(COLD_START_SCRIPT, tmp_path, {"OLLAMA_HOST": server.url})
+        loaded = list(server.loaded_models)
+    assert measured["first_status"] == 404
+    assert measured["serving_seconds"] < COLD_START_BUDGET_SECONDS, f"First response after {measured['serving_seconds']:.2f}s"
+    assert measured["ready_status"] == 200, measured["steps"]
+    assert set(measured["steps"].values()) == {"ready"}
+    assert loaded, "The chat model was not pre-loaded"
+
+
+def test_ready_reports_failures_and_retries(monkeypatch):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("ollama not running")
+
+    monkeypatch.setattr(main, "WARMUP_STEPS", {"index": lambda: None, "models": flaky})
+    monkeypatch.setattr(main, "readiness", {"index": "pending", "models": "pending"})
+    main.warm_up()
+    assert main.readiness == {"index": "ready", "models": "failed: ollama not running"}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            first = await client.get("/ready")  # Reports the failure and starts a retry
+            await main._warmup_task
+            return first, await client.get("/ready")
+
+    first, second = asyncio.run(scenario())
+    assert first.status_code == 503 and first.json()["steps"]["models"].startswith("failed")
+    assert second.status_code == 200
+    assert len(attempts) == 2
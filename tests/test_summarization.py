@@ -0,0 +1,60 @@
+import threading
+import time
+from types import SimpleNamespace
+from app.agents.summarization_agent import SummarizationAgent, SummaryCache
+
+
+class CountingLLM:
+    """Echoes a short digest of each prompt and tracks concurrent calls."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return SimpleNamespace(content=f"summary-{len(prompt)}")
+
+
+def _agent(llm, tmp_path, **kwargs):
+    return SummarizationAgent(llm=llm, chunk_chars=1000, cache=SummaryCache(str(tmp_path)), **kwargs)
+
+def _long_text(paragraphs=12):
+    return "\n\n".join(f"Paragraph {i}. " + "Patient tolerated metformin well. " * 25 for i in range(paragraphs))
+
+def test_short_text_is_one_call(tmp_path):
+    llm = CountingLLM()
+    assert _agent(llm, tmp_path).summarize("Short note.").startswith("summary-")
+    assert len(llm.prompts) == 1
+
+def test_long_text_is_mapped_in_parallel_then_reduced(tmp_path):
+    llm = CountingLLM()
+    text = _long_text()
+    _agent(llm, tmp_path, max_concurrency=3).summarize(text)
+
+    map_prompts = [p for p in llm.prompts if p.startswith("Summarize")]
+    assert len(map_prompts) > 1
+    assert "Paragraph 11." in "".join(map_prompts)  # The end of the text is covered, not truncated away
+    assert any(p.startswith("These are summaries") for p in llm.prompts)
+    assert 1 < llm.max_in_flight <= 3
+
+def test_chunk_summaries_reused_across_calls(tmp_path):
+    llm = CountingLLM(delay=0)
+    text = _long_text()
+    _agent(llm, tmp_path).summarize(text)
+    calls = len(llm.prompts)
+
+    # Same leading chunks plus new material – only the new chunk and the merges hit the LLM
+    fresh = _agent(llm, tmp_path)  # New process: served from the on-disk cache
+    fresh.summarize(text + "\n\nAddendum. " + "Follow-up in six weeks. " * 10)
+    assert fresh.cache.hits >= 1
+    assert len(llm.prompts) - calls < calls
@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+from pypdf import PdfReader
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfgen import canvas
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, PageBreak
+from app.agents.document_cache import get_document_cache
+from app.agents.extraction_agent import ExtractionAgent
+from app.agents.report_assembly_agent import markdown_rows
+from app.agents.table_extraction import TableCache, get_table_cache, page_tables
+import app.agents.orchestrator as orchestrator
+
+LABS = [["Test", "Result", "Units", "Reference"],
+        ["HbA1c", "7.2", "%", "4.0-5.6"],
+        ["LDL", "96", "mg/dL", ""],  # Ragged – blank last cell
+        ["eGFR", "74", "mL/min", "> 60"]]
+
+
+def _lab_pdf(path):
+    styles = getSampleStyleSheet()
+    doc = SimpleDocTemplate(str(path), pagesize=letter)
+    doc.build([
+        Paragraph("Discharge summary. The patient was admitted with hyperglycemia and treated.", styles["Normal"]),
+        PageBreak(),
+        Paragraph("Laboratory results on admission:", styles["Normal"]),
+        Table(LABS),
+        Paragraph("Plan: continue metformin 500mg twice daily.", styles["Normal"]),
+    ])
+    return str(path)
+
+
+def test_detects_table_as_columnar_dataframe(tmp_path):
+    path = _lab_pdf(tmp_path / "labs.pdf")
+    reader = PdfReader(path)
+    assert page_tables(reader.pages[0]) == [], "Prose is not a table"
+
+    [df] = page_tables(reader.pages[1])
+    assert df.columns.tolist() == LABS[0]
+    assert df["Test"].tolist() == ["HbA1c", "LDL", "eGFR"]
+    assert df["Result"].tolist() == [7.2, 96, 74], "Numeric columns become numbers"
+    assert df["Reference"].tolist() == ["4.0-5.6", "", "> 60"]
+
+
+def test_fixed_width_lines_split_into_cells(tmp_path):
+    path = str(tmp_path / "fixed.pdf")
+    c = canvas.Canvas(path, pagesize=letter)
+    c.setFont("Courier", 10)
+    for i, line in enumerate(["Drug        Dose     Route", "Metformin   500mg    PO", "Insulin     10u      SC"]):
+        c.drawString(72, 700 - 12 * i, line)
+    c.save()
+    [df] = page_tables(PdfReader(path).pages[0])
+    assert df.columns.tolist() == ["Drug", "Dose", "Route"]
+    assert df.iloc[1].tolist() == ["Insulin", "10u", "SC"]
+
+
+def test_tables_cached_per_page(tmp_path, monkeypatch):
+    cache = TableCache(capacity=8)
+    monkeypatch.setattr("app.agents.extraction_agent.get_table_cache", lambda: cache)
+    path = _lab_pdf(tmp_path / "labs.pdf")
+    extractor = ExtractionAgent()
+
+    assert len(extractor.extract_table(path)) == 1  # Every page, one pass
+    assert cache.stats()["misses"] == 2
+    assert len(extractor.extract_table(path, page_num=2)) == 1
+    assert extractor.extract_table(path, page_num=1) == []
+    assert extractor.extract_table(path, page_num=9) == []
+    assert cache.stats()["misses"] == 2, "Cached pages must not be re-read"
+    assert cache.stats()["hits"] == 2
+
+    get_document_cache().get(path)  # Parsed once, as at upload
+    monkeypatch.setattr("pypdf.PdfReader", lambda path: pytest.fail("Every page's tables are cached"))
+    assert len(extractor.extract_table(path)) == 1
+    assert cache.stats()["hits"] == 4
+
+
+def test_report_renders_dataframes_and_markdown_tables(tmp_path):
+    df = pd.DataFrame(LABS[1:], columns=LABS[0])
+    markdown = "| Drug | Dose |\n|---|---|\n| Metformin | 500mg |"
+    assert markdown_rows(markdown) == [["Drug", "Dose"], ["Metformin", "500mg"]]
+
+    # The tool path the orchestrator uses – DataFrames pass through untouched
+    pdf = orchestrator.assemble_report.invoke({"sections": {"Labs": [df], "Medications": markdown}})["response"]
+    text = PdfReader(pdf).pages[0].extract_text()
+    for value in ("HbA1c", "mg/dL", "Metformin", "500mg"):
+        assert value in text
+    assert "|" not in text, "Markdown table fell back to a paragraph"
+
+
+def test_shared_table_cache_is_a_singleton():
+    assert get_table_cache() is get_table_cache()